@@ -1,10 +1,19 @@
 import base64
 import json
 import secrets
+import threading
+import time
+import uuid
 
 import click
+from core.application_queue_manager import ApplicationQueueManager, PublishFrom
 from core.embedding.cached_embedding import CacheEmbedding
+from core.entities.application_entities import InvokeFrom
+from core.entities.queue_entities import QueueMessageEvent
+from core.index.index import IndexBuilder
 from core.model_manager import ModelManager
+from core.model_runtime.entities.llm_entities import LLMResultChunk, LLMResultChunkDelta
+from core.model_runtime.entities.message_entities import AssistantPromptMessage
 from core.model_runtime.entities.model_entities import ModelType
 from extensions.ext_database import db
 from flask import current_app
@@ -12,7 +21,7 @@ from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models.account import Tenant
-from models.dataset import Dataset
+from models.dataset import Dataset, DatasetKeywordTable
 from models.model import Account
 from models.provider import Provider, ProviderModel
 from werkzeug.exceptions import NotFound
@@ -191,8 +200,94 @@ def create_qdrant_indexes():
     click.echo(click.style('Congratulations! Create {} dataset indexes.'.format(create_count), fg='green'))
 
 
+@click.command('migrate-keyword-postings', help='Move the keyword tables of economy indexes into keyword postings.')
+def migrate_keyword_postings():
+    """
+    Migrate the json keyword tables of datasets indexed before keyword postings existed.
+    Until a dataset is migrated, its keyword search also matches the legacy keyword table.
+    """
+    click.echo(click.style('Start migrate keyword postings.', fg='green'))
+    migrated_count = 0
+
+    dataset_keyword_tables = db.session.query(DatasetKeywordTable.dataset_id).all()
+    for dataset_keyword_table in dataset_keyword_tables:
+        dataset = db.session.query(Dataset).filter(Dataset.id == dataset_keyword_table.dataset_id).first()
+        if not dataset:
+            continue
+
+        try:
+            click.echo('Migrate dataset keyword table: {}'.format(dataset.id))
+            segment_count = IndexBuilder.get_index(dataset, 'economy').migrate_legacy_keyword_table()
+            click.echo('Migrated {} segments.'.format(segment_count))
+            migrated_count += 1
+        except Exception as e:
+            db.session.rollback()
+            click.echo(
+                click.style('Migrate dataset keyword table error: {} {}'.format(e.__class__.__name__, str(e)),
+                            fg='red'))
+            continue
+
+    click.echo(click.style('Congratulations! Migrated {} dataset keyword tables.'.format(migrated_count), fg='green'))
+
+
+@click.command('benchmark-queue', help='Measure the streamed tokens per second through the application queue.')
+@click.option('--tokens', default=100000, help='Number of streamed chunks to publish.')
+def benchmark_queue(tokens):
+    """
+    Publish LLM chunks to an application queue from a runner thread and listen to them,
+    like a streaming generate task without model and task pipeline.
+    """
+    queue_manager = ApplicationQueueManager(
+        task_id=str(uuid.uuid4()),
+        user_id='benchmark',
+        invoke_from=InvokeFrom.DEBUGGER,
+        conversation_id=str(uuid.uuid4()),
+        app_mode='chat',
+        message_id=str(uuid.uuid4())
+    )
+
+    chunk = LLMResultChunk(
+        model='benchmark',
+        prompt_messages=[],
+        delta=LLMResultChunkDelta(
+            index=0,
+            message=AssistantPromptMessage(content='token')
+        )
+    )
+
+    publish_elapsed = 0
+
+    def publish():
+        nonlocal publish_elapsed
+        start_at = time.perf_counter()
+        for _ in range(tokens):
+            queue_manager.publish_chunk_message(chunk, PublishFrom.APPLICATION_MANAGER)
+        publish_elapsed = time.perf_counter() - start_at
+
+        queue_manager.stop_listen()
+
+    start_at = time.perf_counter()
+    publish_thread = threading.Thread(target=publish)
+    publish_thread.start()
+
+    received = 0
+    for message in queue_manager.listen():
+        if isinstance(message.event, QueueMessageEvent):
+            received += 1
+
+    publish_thread.join()
+    elapsed = time.perf_counter() - start_at
+
+    click.echo('Published {} chunks in {:.3f}s, {:.0f} tokens/sec.'.format(
+        tokens, publish_elapsed, tokens / publish_elapsed))
+    click.echo(click.style('Received {} chunks in {:.3f}s, {:.0f} tokens/sec through the queue.'.format(
+        received, elapsed, received / elapsed), fg='green'))
+
+
 def register_commands(app):
     app.cli.add_command(reset_password)
     app.cli.add_command(reset_email)
     app.cli.add_command(reset_encrypt_key_pair)
     app.cli.add_command(create_qdrant_indexes)
+    app.cli.add_command(migrate_keyword_postings)
+    app.cli.add_command(benchmark_queue)
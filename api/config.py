@@ -35,6 +35,7 @@ DEFAULTS = {
     'WEAVIATE_GRPC_ENABLED': 'True',
     'WEAVIATE_BATCH_SIZE': 100,
     'QDRANT_CLIENT_TIMEOUT': 20,
+    'LOCAL_VECTOR_STORE_PATH': 'storage/vector_index',
     'CELERY_BACKEND': 'database',
     'LOG_LEVEL': 'INFO',
     'HOSTED_OPENAI_QUOTA_LIMIT': 200,
@@ -57,6 +58,17 @@ DEFAULTS = {
     'BILLING_ENABLED': 'False',
     'CAN_REPLACE_LOGO': 'False',
     'ETL_TYPE': 'dify',
+    'EMBEDDING_QUERY_CACHE_CODEC': 'float32',
+    'EMBEDDING_MAX_WORKERS': 0,
+    'EMBEDDING_RPM': 0,
+    'EMBEDDING_TPM': 0,
+    'KEYWORD_EXTRACTION_WORKERS': 0,
+    'PDF_EXTRACTION_WORKERS': 0,
+    'PDF_EXTRACTION_PAGE_TIMEOUT': 60,
+    'TABULAR_CHUNK_MAX_TOKENS': 0,
+    'GENERATION_EVENT_BUS_TYPE': 'memory',
+    'SSE_CHUNK_FLUSH_INTERVAL': 0,
+    'SSE_CHUNK_FLUSH_SIZE': 1024,
 }
 
 
@@ -158,6 +170,9 @@ class Config:
         self.REDIS_DB = get_env('REDIS_DB')
         self.REDIS_USE_SSL = get_bool_env('REDIS_USE_SSL')
 
+        # generation event bus type, `memory` or `redis`
+        self.GENERATION_EVENT_BUS_TYPE = get_env('GENERATION_EVENT_BUS_TYPE')
+
         # ------------------------
         # Celery worker Configurations.
         # ------------------------
@@ -180,7 +195,7 @@ class Config:
 
         # ------------------------
         # Vector Store Configurations.
-        # Currently, only support: qdrant, milvus, zilliz, weaviate
+        # Currently, only support: qdrant, milvus, zilliz, weaviate, local
         # ------------------------
         self.VECTOR_STORE = get_env('VECTOR_STORE')
 
@@ -196,6 +211,9 @@ class Config:
         self.MILVUS_PASSWORD = get_env('MILVUS_PASSWORD')
         self.MILVUS_SECURE = get_env('MILVUS_SECURE')
 
+        # local embedded vector store settings
+        self.LOCAL_VECTOR_STORE_PATH = get_env('LOCAL_VECTOR_STORE_PATH')
+
         # weaviate settings
         self.WEAVIATE_ENDPOINT = get_env('WEAVIATE_ENDPOINT')
         self.WEAVIATE_API_KEY = get_env('WEAVIATE_API_KEY')
@@ -232,6 +250,18 @@ class Config:
         # Dataset Configurations.
         self.CLEAN_DAY_SETTING = get_env('CLEAN_DAY_SETTING')
 
+        # query embedding cache encoding, support float32, float16, int8, default is float32
+        self.EMBEDDING_QUERY_CACHE_CODEC = get_env('EMBEDDING_QUERY_CACHE_CODEC')
+
+        # embedding concurrency per process and rate limits per model and credentials across all processes,
+        # 0 to use the limits declared by the model schema
+        self.EMBEDDING_MAX_WORKERS = int(get_env('EMBEDDING_MAX_WORKERS'))
+        self.EMBEDDING_RPM = int(get_env('EMBEDDING_RPM'))
+        self.EMBEDDING_TPM = int(get_env('EMBEDDING_TPM'))
+
+        # economy index keyword extraction worker processes, 0 to extract in the indexing process
+        self.KEYWORD_EXTRACTION_WORKERS = int(get_env('KEYWORD_EXTRACTION_WORKERS'))
+
         # File upload Configurations.
         self.UPLOAD_FILE_SIZE_LIMIT = int(get_env('UPLOAD_FILE_SIZE_LIMIT'))
         self.UPLOAD_FILE_BATCH_LIMIT = int(get_env('UPLOAD_FILE_BATCH_LIMIT'))
@@ -240,6 +270,10 @@ class Config:
         # Moderation in app Configurations.
         self.OUTPUT_MODERATION_BUFFER_SIZE = int(get_env('OUTPUT_MODERATION_BUFFER_SIZE'))
 
+        # Streaming response Configurations.
+        self.SSE_CHUNK_FLUSH_INTERVAL = float(get_env('SSE_CHUNK_FLUSH_INTERVAL'))
+        self.SSE_CHUNK_FLUSH_SIZE = int(get_env('SSE_CHUNK_FLUSH_SIZE'))
+
         # Notion integration setting
         self.NOTION_CLIENT_ID = get_env('NOTION_CLIENT_ID')
         self.NOTION_CLIENT_SECRET = get_env('NOTION_CLIENT_SECRET')
@@ -277,6 +311,9 @@ class Config:
 
         self.ETL_TYPE = get_env('ETL_TYPE')
         self.UNSTRUCTURED_API_URL = get_env('UNSTRUCTURED_API_URL')
+        self.PDF_EXTRACTION_WORKERS = int(get_env('PDF_EXTRACTION_WORKERS'))
+        self.PDF_EXTRACTION_PAGE_TIMEOUT = float(get_env('PDF_EXTRACTION_PAGE_TIMEOUT'))
+        self.TABULAR_CHUNK_MAX_TOKENS = int(get_env('TABULAR_CHUNK_MAX_TOKENS'))
         self.BILLING_ENABLED = get_bool_env('BILLING_ENABLED')
         self.CAN_REPLACE_LOGO = get_bool_env('CAN_REPLACE_LOGO')
 
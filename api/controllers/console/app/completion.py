@@ -16,7 +16,7 @@ from core.application_queue_manager import ApplicationQueueManager
 from core.entities.application_entities import InvokeFrom
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
 from core.model_runtime.errors.invoke import InvokeError
-from flask import Response, stream_with_context
+from flask import Response, request, stream_with_context
 from flask_restful import Resource, reqparse
 from libs.helper import uuid_value
 from libs.login import login_required
@@ -100,6 +100,33 @@ class CompletionMessageStopApi(Resource):
         return {'result': 'success'}, 200
 
 
+class CompletionMessageEventsApi(Resource):
+    @setup_required
+    @login_required
+    @account_initialization_required
+    def get(self, app_id, task_id):
+        app_id = str(app_id)
+
+        # get app info
+        _get_app(app_id, 'completion')
+
+        account = flask_login.current_user
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+        try:
+            response = CompletionService.resume_stream(
+                task_id=task_id,
+                user=account,
+                invoke_from=InvokeFrom.DEBUGGER,
+                last_event_id=last_event_id
+            )
+
+            return compact_response(response)
+        except services.errors.completion.CompletionTaskNotExistsError:
+            raise NotFound("Task Not Exists.")
+
+
 class ChatMessageApi(Resource):
     @setup_required
     @login_required
@@ -158,6 +185,33 @@ class ChatMessageApi(Resource):
             raise InternalServerError()
 
 
+class ChatMessageEventsApi(Resource):
+    @setup_required
+    @login_required
+    @account_initialization_required
+    def get(self, app_id, task_id):
+        app_id = str(app_id)
+
+        # get app info
+        _get_app(app_id, 'chat')
+
+        account = flask_login.current_user
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+        try:
+            response = CompletionService.resume_stream(
+                task_id=task_id,
+                user=account,
+                invoke_from=InvokeFrom.DEBUGGER,
+                last_event_id=last_event_id
+            )
+
+            return compact_response(response)
+        except services.errors.completion.CompletionTaskNotExistsError:
+            raise NotFound("Task Not Exists.")
+
+
 def compact_response(response: Union[dict, Generator]) -> Response:
     if isinstance(response, dict):
         return Response(response=json.dumps(response), status=200, mimetype='application/json')
@@ -189,5 +243,7 @@ class ChatMessageStopApi(Resource):
 
 api.add_resource(CompletionMessageApi, '/apps/<uuid:app_id>/completion-messages')
 api.add_resource(CompletionMessageStopApi, '/apps/<uuid:app_id>/completion-messages/<string:task_id>/stop')
+api.add_resource(CompletionMessageEventsApi, '/apps/<uuid:app_id>/completion-messages/<string:task_id>/events')
 api.add_resource(ChatMessageApi, '/apps/<uuid:app_id>/chat-messages')
 api.add_resource(ChatMessageStopApi, '/apps/<uuid:app_id>/chat-messages/<string:task_id>/stop')
+api.add_resource(ChatMessageEventsApi, '/apps/<uuid:app_id>/chat-messages/<string:task_id>/events')
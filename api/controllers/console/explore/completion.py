@@ -16,7 +16,7 @@ from core.entities.application_entities import InvokeFrom
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
 from core.model_runtime.errors.invoke import InvokeError
 from extensions.ext_database import db
-from flask import Response, stream_with_context
+from flask import Response, request, stream_with_context
 from flask_login import current_user
 from flask_restful import reqparse
 from libs.helper import uuid_value
@@ -89,6 +89,27 @@ class CompletionStopApi(InstalledAppResource):
         return {'result': 'success'}, 200
 
 
+class CompletionEventsApi(InstalledAppResource):
+    def get(self, installed_app, task_id):
+        app_model = installed_app.app
+        if app_model.mode != 'completion':
+            raise NotCompletionAppError()
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+        try:
+            response = CompletionService.resume_stream(
+                task_id=task_id,
+                user=current_user,
+                invoke_from=InvokeFrom.EXPLORE,
+                last_event_id=last_event_id
+            )
+
+            return compact_response(response)
+        except services.errors.completion.CompletionTaskNotExistsError:
+            raise NotFound("Task Not Exists.")
+
+
 class ChatApi(InstalledAppResource):
     def post(self, installed_app):
         app_model = installed_app.app
@@ -153,6 +174,27 @@ class ChatStopApi(InstalledAppResource):
         return {'result': 'success'}, 200
 
 
+class ChatEventsApi(InstalledAppResource):
+    def get(self, installed_app, task_id):
+        app_model = installed_app.app
+        if app_model.mode != 'chat':
+            raise NotChatAppError()
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+        try:
+            response = CompletionService.resume_stream(
+                task_id=task_id,
+                user=current_user,
+                invoke_from=InvokeFrom.EXPLORE,
+                last_event_id=last_event_id
+            )
+
+            return compact_response(response)
+        except services.errors.completion.CompletionTaskNotExistsError:
+            raise NotFound("Task Not Exists.")
+
+
 def compact_response(response: Union[dict, Generator]) -> Response:
     if isinstance(response, dict):
         return Response(response=json.dumps(response), status=200, mimetype='application/json')
@@ -167,5 +209,7 @@ def compact_response(response: Union[dict, Generator]) -> Response:
 
 api.add_resource(CompletionApi, '/installed-apps/<uuid:installed_app_id>/completion-messages', endpoint='installed_app_completion')
 api.add_resource(CompletionStopApi, '/installed-apps/<uuid:installed_app_id>/completion-messages/<string:task_id>/stop', endpoint='installed_app_stop_completion')
+api.add_resource(CompletionEventsApi, '/installed-apps/<uuid:installed_app_id>/completion-messages/<string:task_id>/events', endpoint='installed_app_completion_events')
 api.add_resource(ChatApi, '/installed-apps/<uuid:installed_app_id>/chat-messages', endpoint='installed_app_chat_completion')
 api.add_resource(ChatStopApi, '/installed-apps/<uuid:installed_app_id>/chat-messages/<string:task_id>/stop', endpoint='installed_app_stop_chat_completion')
+api.add_resource(ChatEventsApi, '/installed-apps/<uuid:installed_app_id>/chat-messages/<string:task_id>/events', endpoint='installed_app_chat_completion_events')
@@ -13,7 +13,7 @@ from core.application_queue_manager import ApplicationQueueManager
 from core.entities.application_entities import InvokeFrom
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
 from core.model_runtime.errors.invoke import InvokeError
-from flask import Response, stream_with_context
+from flask import Response, request, stream_with_context
 from flask_restful import reqparse
 from libs.helper import uuid_value
 from services.completion_service import CompletionService
@@ -81,6 +81,26 @@ class CompletionStopApi(WebApiResource):
         return {'result': 'success'}, 200
 
 
+class CompletionEventsApi(WebApiResource):
+    def get(self, app_model, end_user, task_id):
+        if app_model.mode != 'completion':
+            raise NotCompletionAppError()
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+        try:
+            response = CompletionService.resume_stream(
+                task_id=task_id,
+                user=end_user,
+                invoke_from=InvokeFrom.WEB_APP,
+                last_event_id=last_event_id
+            )
+
+            return compact_response(response)
+        except services.errors.completion.CompletionTaskNotExistsError:
+            raise NotFound("Task Not Exists.")
+
+
 class ChatApi(WebApiResource):
     def post(self, app_model, end_user):
         if app_model.mode != 'chat':
@@ -141,6 +161,26 @@ class ChatStopApi(WebApiResource):
         return {'result': 'success'}, 200
 
 
+class ChatEventsApi(WebApiResource):
+    def get(self, app_model, end_user, task_id):
+        if app_model.mode != 'chat':
+            raise NotChatAppError()
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+        try:
+            response = CompletionService.resume_stream(
+                task_id=task_id,
+                user=end_user,
+                invoke_from=InvokeFrom.WEB_APP,
+                last_event_id=last_event_id
+            )
+
+            return compact_response(response)
+        except services.errors.completion.CompletionTaskNotExistsError:
+            raise NotFound("Task Not Exists.")
+
+
 def compact_response(response: Union[dict, Generator]) -> Response:
     if isinstance(response, dict):
         return Response(response=json.dumps(response), status=200, mimetype='application/json')
@@ -155,5 +195,7 @@ def compact_response(response: Union[dict, Generator]) -> Response:
 
 api.add_resource(CompletionApi, '/completion-messages')
 api.add_resource(CompletionStopApi, '/completion-messages/<string:task_id>/stop')
+api.add_resource(CompletionEventsApi, '/completion-messages/<string:task_id>/events')
 api.add_resource(ChatApi, '/chat-messages')
 api.add_resource(ChatStopApi, '/chat-messages/<string:task_id>/stop')
+api.add_resource(ChatEventsApi, '/chat-messages/<string:task_id>/events')
@@ -1,5 +1,5 @@
 import time
-from typing import Generator, List, Optional, Tuple, Union, cast
+from typing import Generator, List, Optional, Tuple, Union
 
 from core.application_queue_manager import ApplicationQueueManager, PublishFrom
 from core.entities.application_entities import (ApplicationGenerateEntity, AppOrchestrationConfigEntity,
@@ -15,12 +15,14 @@ from core.model_runtime.entities.llm_entities import LLMResult, LLMResultChunk,
 from core.model_runtime.entities.message_entities import AssistantPromptMessage, PromptMessage
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.errors.invoke import InvokeBadRequestError
-from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
 from core.prompt.prompt_transform import PromptTransform
 from models.model import App, Message, MessageAnnotation
 
 
 class AppRunner:
+    # prompt transform of the turn, it memoizes the parsed templates and token counts of the prompts
+    _prompt_transform: Optional[PromptTransform] = None
+
     def get_pre_calculate_rest_tokens(self, app_record: App,
                                       model_config: ModelConfigEntity,
                                       prompt_template_entity: PromptTemplateEntity,
@@ -37,9 +39,6 @@ class AppRunner:
         :param query: query
         :return:
         """
-        model_type_instance = model_config.provider_model_bundle.model_type_instance
-        model_type_instance = cast(LargeLanguageModel, model_type_instance)
-
         model_context_tokens = model_config.model_schema.model_properties.get(ModelPropertyKey.CONTEXT_SIZE)
 
         max_tokens = 0
@@ -65,11 +64,7 @@ class AppRunner:
             query=query
         )
 
-        prompt_tokens = model_type_instance.get_num_tokens(
-            model_config.model,
-            model_config.credentials,
-            prompt_messages
-        )
+        prompt_tokens = self.get_prompt_transform().get_num_tokens(prompt_messages, model_config)
 
         rest_tokens = model_context_tokens - max_tokens - prompt_tokens
         if rest_tokens < 0:
@@ -81,9 +76,6 @@ class AppRunner:
     def recale_llm_max_tokens(self, model_config: ModelConfigEntity,
                               prompt_messages: List[PromptMessage]):
         # recalc max_tokens if sum(prompt_token +  max_tokens) over model token limit
-        model_type_instance = model_config.provider_model_bundle.model_type_instance
-        model_type_instance = cast(LargeLanguageModel, model_type_instance)
-
         model_context_tokens = model_config.model_schema.model_properties.get(ModelPropertyKey.CONTEXT_SIZE)
 
         max_tokens = 0
@@ -99,11 +91,7 @@ class AppRunner:
         if max_tokens is None:
             max_tokens = 0
 
-        prompt_tokens = model_type_instance.get_num_tokens(
-            model_config.model,
-            model_config.credentials,
-            prompt_messages
-        )
+        prompt_tokens = self.get_prompt_transform().get_num_tokens(prompt_messages, model_config)
 
         if prompt_tokens + max_tokens > model_context_tokens:
             max_tokens = max(model_context_tokens - prompt_tokens, 16)
@@ -134,7 +122,7 @@ class AppRunner:
         :param memory: memory
         :return:
         """
-        prompt_transform = PromptTransform()
+        prompt_transform = self.get_prompt_transform()
 
         # get prompt without memory and context
         if prompt_template_entity.prompt_type == PromptTemplateEntity.PromptType.SIMPLE:
@@ -163,6 +151,16 @@ class AppRunner:
 
         return prompt_messages, stop
 
+    def get_prompt_transform(self) -> PromptTransform:
+        """
+        Get the prompt transform shared by all the prompts organized by the runner in a turn
+        :return:
+        """
+        if not self._prompt_transform:
+            self._prompt_transform = PromptTransform()
+
+        return self._prompt_transform
+
     def direct_output(self, queue_manager: ApplicationQueueManager,
                       app_orchestration_config: AppOrchestrationConfigEntity,
                       prompt_messages: list,
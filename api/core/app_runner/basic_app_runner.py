@@ -70,19 +70,6 @@ class BasicApplicationRunner(AppRunner):
                 model_instance=model_instance
             )
 
-        # organize all inputs and template to prompt messages
-        # Include: prompt template, inputs, query(optional), files(optional)
-        #          memory(optional)
-        prompt_messages, stop = self.organize_prompt_messages(
-            app_record=app_record,
-            model_config=app_orchestration_config.model_config,
-            prompt_template_entity=app_orchestration_config.prompt_template,
-            inputs=inputs,
-            files=files,
-            query=query,
-            memory=memory
-        )
-
         # moderation
         try:
             # process sensitive_word_avoidance
@@ -94,6 +81,19 @@ class BasicApplicationRunner(AppRunner):
                 query=query,
             )
         except ModerationException as e:
+            # organize all inputs and template to prompt messages, only needed when outputting directly
+            # Include: prompt template, inputs, query(optional), files(optional)
+            #          memory(optional)
+            prompt_messages, _ = self.organize_prompt_messages(
+                app_record=app_record,
+                model_config=app_orchestration_config.model_config,
+                prompt_template_entity=app_orchestration_config.prompt_template,
+                inputs=inputs,
+                files=files,
+                query=query,
+                memory=memory
+            )
+
             self.direct_output(
                 queue_manager=queue_manager,
                 app_orchestration_config=app_orchestration_config,
@@ -118,6 +118,17 @@ class BasicApplicationRunner(AppRunner):
                     message_annotation_id=annotation_reply.id,
                     pub_from=PublishFrom.APPLICATION_MANAGER
                 )
+
+                prompt_messages, _ = self.organize_prompt_messages(
+                    app_record=app_record,
+                    model_config=app_orchestration_config.model_config,
+                    prompt_template_entity=app_orchestration_config.prompt_template,
+                    inputs=inputs,
+                    files=files,
+                    query=query,
+                    memory=memory
+                )
+
                 self.direct_output(
                     queue_manager=queue_manager,
                     app_orchestration_config=app_orchestration_config,
@@ -156,7 +167,7 @@ class BasicApplicationRunner(AppRunner):
                 memory=memory
             )
 
-        # reorganize all inputs and template to prompt messages
+        # organize all inputs and template to prompt messages
         # Include: prompt template, inputs, query(optional), files(optional)
         #          memory(optional), external data, dataset context(optional)
         prompt_messages, stop = self.organize_prompt_messages(
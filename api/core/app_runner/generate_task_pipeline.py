@@ -1,6 +1,7 @@
 import json
 import logging
 import time
+from json.encoder import encode_basestring_ascii
 from typing import Generator, Optional, Union, cast
 
 from core.app_runner.moderation_handler import ModerationRule, OutputModerationHandler
@@ -23,6 +24,7 @@ from core.tools.tool_file_manager import ToolFileManager
 from core.tools.tool_manager import ToolManager
 from events.message_event import message_was_created
 from extensions.ext_database import db
+from flask import current_app
 from models.model import Conversation, Message, MessageAgentThought, MessageFile
 from pydantic import BaseModel
 from services.annotation_service import AppAnnotationService
@@ -69,6 +71,16 @@ class GenerateTaskPipeline:
         self._start_at = time.perf_counter()
         self._output_moderation_handler = self._init_output_moderation()
 
+        # consecutive chunks are coalesced into one frame until the interval or size is reached, 0 to disable
+        self._chunk_flush_interval = current_app.config.get('SSE_CHUNK_FLUSH_INTERVAL', 0)
+        self._chunk_flush_size = current_app.config.get('SSE_CHUNK_FLUSH_SIZE', 0)
+        self._chunk_buffer = []
+        self._chunk_buffer_size = 0
+        self._chunk_buffer_agent = False
+        self._chunk_buffer_started_at = 0
+        # frame prefix and suffix around the answer of chunk frames, by agent or not
+        self._chunk_frame_affixes = {}
+
     def process(self, stream: bool) -> Union[dict, Generator]:
         """
         Process generate task pipeline.
@@ -180,9 +192,19 @@ class GenerateTaskPipeline:
         Process stream response.
         :return:
         """
-        for message in self._queue_manager.listen():
+        for message in self._queue_manager.listen(idle_interval=self._chunk_flush_interval or None):
+            if message is None:
+                # queue idle
+                if self._chunk_buffer \
+                        and time.perf_counter() - self._chunk_buffer_started_at >= self._chunk_flush_interval:
+                    yield self._flush_chunk_buffer()
+                continue
+
             event = message.event
 
+            if self._chunk_buffer and not isinstance(event, (QueueMessageEvent, QueueAgentMessageEvent)):
+                yield self._flush_chunk_buffer()
+
             if isinstance(event, QueueErrorEvent):
                 data = self._error_to_stream_response_data(self._handle_error(event))
                 yield self._yield_response(data)
@@ -369,8 +391,23 @@ class GenerateTaskPipeline:
                         self._output_moderation_handler.append_new_token(delta_text)
 
                 self._task_state.llm_result.message.content += delta_text
-                response = self._handle_chunk(delta_text, agent=isinstance(event, QueueAgentMessageEvent))
-                yield self._yield_response(response)
+                agent = isinstance(event, QueueAgentMessageEvent)
+                if not self._chunk_flush_interval:
+                    yield self._yield_chunk(delta_text, agent=agent)
+                    continue
+
+                if self._chunk_buffer and self._chunk_buffer_agent != agent:
+                    yield self._flush_chunk_buffer()
+
+                if not self._chunk_buffer:
+                    self._chunk_buffer_agent = agent
+                    self._chunk_buffer_started_at = time.perf_counter()
+
+                self._chunk_buffer.append(delta_text)
+                self._chunk_buffer_size += len(delta_text)
+                if (self._chunk_flush_size and self._chunk_buffer_size >= self._chunk_flush_size) \
+                        or time.perf_counter() - self._chunk_buffer_started_at >= self._chunk_flush_interval:
+                    yield self._flush_chunk_buffer()
             elif isinstance(event, QueueMessageReplaceEvent):
                 response = {
                     'event': 'message_replace',
@@ -389,6 +426,9 @@ class GenerateTaskPipeline:
             else:
                 continue
 
+        if self._chunk_buffer:
+            yield self._flush_chunk_buffer()
+
     def _save_message(self, llm_result: LLMResult) -> None:
         """
         Save message.
@@ -441,6 +481,33 @@ class GenerateTaskPipeline:
 
         return response
 
+    def _yield_chunk(self, text: str, agent: bool = False) -> str:
+        """
+        Yield chunk response, same as `_yield_response` of `_handle_chunk`
+        with the frame around the answer encoded once per task.
+        :param text: text
+        :param agent: is agent message
+        :return:
+        """
+        if agent not in self._chunk_frame_affixes:
+            frame = self._yield_response(self._handle_chunk('', agent=agent))
+            prefix, suffix = frame.split('"answer": ""', 1)
+            self._chunk_frame_affixes[agent] = (prefix + '"answer": ', suffix)
+
+        prefix, suffix = self._chunk_frame_affixes[agent]
+        return prefix + encode_basestring_ascii(text) + suffix
+
+    def _flush_chunk_buffer(self) -> str:
+        """
+        Yield the coalesced chunks as one chunk response.
+        :return:
+        """
+        text = ''.join(self._chunk_buffer)
+        self._chunk_buffer = []
+        self._chunk_buffer_size = 0
+
+        return self._yield_chunk(text, agent=self._chunk_buffer_agent)
+
     def _handle_error(self, event: QueueErrorEvent) -> Exception:
         """
         Handle error event.
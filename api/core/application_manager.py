@@ -18,6 +18,7 @@ from core.entities.application_entities import (AdvancedChatPromptTemplateEntity
 from core.entities.model_entities import ModelStatus
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
 from core.file.file_obj import FileObj
+from core.generation_event_bus import GenerationEventBus, get_generation_event_bus
 from core.model_runtime.entities.message_entities import PromptMessageRole
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.errors.invoke import InvokeAuthorizationError, InvokeError
@@ -125,7 +126,26 @@ class ApplicationManager:
 
         worker_thread.start()
 
-        # return response or stream generator
+        if stream:
+            # the stream is produced in a thread of its own and read from the event bus,
+            # so the client can reconnect to it after a disconnect
+            event_bus = get_generation_event_bus()
+            event_bus.start(task_id)
+
+            stream_thread = threading.Thread(target=self._stream_worker, kwargs={
+                'flask_app': current_app._get_current_object(),
+                'application_generate_entity': application_generate_entity,
+                'queue_manager': queue_manager,
+                'event_bus': event_bus,
+                'conversation_id': conversation.id,
+                'message_id': message.id,
+            })
+
+            stream_thread.start()
+
+            return self._subscribe_stream_events(event_bus, task_id)
+
+        # return response
         return self._handle_response(
             application_generate_entity=application_generate_entity,
             queue_manager=queue_manager,
@@ -134,6 +154,28 @@ class ApplicationManager:
             stream=stream
         )
 
+    def resume_stream(self, task_id: str,
+                      user: Union[Account, EndUser],
+                      invoke_from: InvokeFrom,
+                      last_event_id: Optional[str] = None) -> Optional[Generator]:
+        """
+        Resume the stream response of a generate task of the user.
+
+        :param task_id: task id
+        :param user: account or end user
+        :param invoke_from: invoke from source
+        :param last_event_id: resume after this event id, None to start from the first event
+        :return: stream generator, None if the task does not exist or its events after the last event id were dropped
+        """
+        if not ApplicationQueueManager.is_task_owner(task_id, invoke_from, user.id):
+            return None
+
+        event_bus = get_generation_event_bus()
+        if not event_bus.is_resumable(task_id, last_event_id):
+            return None
+
+        return self._subscribe_stream_events(event_bus, task_id, last_event_id)
+
     def _generate_worker(self, flask_app: Flask,
                          application_generate_entity: ApplicationGenerateEntity,
                          queue_manager: ApplicationQueueManager,
@@ -190,6 +232,99 @@ class ApplicationManager:
             finally:
                 db.session.remove()
 
+    def _stream_worker(self, flask_app: Flask,
+                       application_generate_entity: ApplicationGenerateEntity,
+                       queue_manager: ApplicationQueueManager,
+                       event_bus: GenerationEventBus,
+                       conversation_id: str,
+                       message_id: str) -> None:
+        """
+        Publish the stream response to the event bus in a new thread.
+        :param flask_app: Flask app
+        :param application_generate_entity: application generate entity
+        :param queue_manager: queue manager
+        :param event_bus: generation event bus
+        :param conversation_id: conversation ID
+        :param message_id: message ID
+        :return:
+        """
+        task_id = application_generate_entity.task_id
+        with flask_app.app_context():
+            try:
+                # get conversation and message
+                conversation = self._get_conversation(conversation_id)
+                message = self._get_message(message_id)
+
+                response = self._handle_response(
+                    application_generate_entity=application_generate_entity,
+                    queue_manager=queue_manager,
+                    conversation=conversation,
+                    message=message,
+                    stream=True
+                )
+
+                for data in response:
+                    event_bus.publish(task_id, data)
+            except ConversationTaskStoppedException:
+                pass
+            except Exception as e:
+                logger.exception("Unknown Error when streaming")
+                # the client only reads the event bus, so it learns about the error from an error event
+                try:
+                    event_bus.publish(task_id, self._error_to_stream_event(task_id, message_id, e))
+                except Exception:
+                    logger.exception("Failed to publish stream error")
+            finally:
+                event_bus.end(task_id)
+                db.session.remove()
+
+    def _error_to_stream_event(self, task_id: str, message_id: str, e: Exception) -> str:
+        """
+        Convert an error raised while streaming to an error event, like the generate task pipeline does.
+        :param task_id: task id
+        :param message_id: message ID
+        :param e: exception
+        :return:
+        """
+        if isinstance(e, ValueError):
+            data = {
+                'code': 'invalid_param',
+                'message': str(e),
+                'status': 400
+            }
+        elif isinstance(e, InvokeError):
+            data = {
+                'code': 'completion_request_error',
+                'message': e.description,
+                'status': 400
+            }
+        else:
+            data = {
+                'code': 'internal_server_error',
+                'message': 'Internal Server Error, please contact support.',
+                'status': 500
+            }
+
+        return "data: " + json.dumps({
+            'event': 'error',
+            'task_id': task_id,
+            'message_id': message_id,
+            **data
+        }) + "\n\n"
+
+    def _subscribe_stream_events(self, event_bus: GenerationEventBus,
+                                 task_id: str,
+                                 last_event_id: Optional[str] = None) -> Generator:
+        """
+        Subscribe to the stream response on the event bus.
+        :param event_bus: generation event bus
+        :param task_id: task id
+        :param last_event_id: resume after this event id
+        :return:
+        """
+        for event_id, data in event_bus.subscribe(task_id, last_event_id):
+            yield f"id: {event_id}\n" + data
+
     def _handle_response(self, application_generate_entity: ApplicationGenerateEntity,
                          queue_manager: ApplicationQueueManager,
                          conversation: Conversation,
@@ -1,7 +1,9 @@
+import logging
 import queue
+import threading
 import time
 from enum import Enum
-from typing import Any, Generator
+from typing import Any, Generator, Optional
 
 from core.entities.application_entities import InvokeFrom
 from core.entities.queue_entities import (AnnotationReplyEvent, AppQueueEvent, QueueAgentMessageEvent,
@@ -10,9 +12,13 @@ from core.entities.queue_entities import (AnnotationReplyEvent, AppQueueEvent, Q
                                           QueuePingEvent, QueueRetrieverResourcesEvent, QueueStopEvent)
 from core.model_runtime.entities.llm_entities import LLMResult, LLMResultChunk
 from extensions.ext_redis import redis_client
+from libs.redis_subscriber import RedisSubscriber
 from models.model import MessageAgentThought, MessageFile
+from pydantic import BaseModel
 from sqlalchemy.orm import DeclarativeMeta
 
+logger = logging.getLogger(__name__)
+
 
 class PublishFrom(Enum):
     APPLICATION_MANAGER = 1
@@ -20,6 +26,13 @@ class PublishFrom(Enum):
 
 
 class ApplicationQueueManager:
+    # stop flags are also published to all workers, so running tasks do not have to poll redis for them
+    STOP_CHANNEL = 'generate_task_stopped'
+
+    # task id -> stop event of the tasks running in this process
+    _stop_events: dict[str, threading.Event] = {}
+    _lock = threading.Lock()
+
     def __init__(self, task_id: str,
                  user_id: str,
                  invoke_from: InvokeFrom,
@@ -43,9 +56,16 @@ class ApplicationQueueManager:
 
         self._q = q
 
-    def listen(self) -> Generator:
+        self._stop_event = threading.Event()
+        with ApplicationQueueManager._lock:
+            ApplicationQueueManager._stop_events[self._task_id] = self._stop_event
+        ApplicationQueueManager._ensure_subscriber()
+
+    def listen(self, idle_interval: Optional[float] = None) -> Generator:
         """
         Listen to queue
+        :param idle_interval: yield None after the queue is idle for this many seconds,
+                              so that the listener can flush buffered output
         :return:
         """
         # wait for 10 minutes to stop listen
@@ -53,29 +73,35 @@ class ApplicationQueueManager:
         start_time = time.time()
         last_ping_time = 0
 
-        while True:
-            try:
-                message = self._q.get(timeout=1)
-                if message is None:
-                    break
-
-                yield message
-            except queue.Empty:
-                continue
-            finally:
-                elapsed_time = time.time() - start_time
-                if elapsed_time >= listen_timeout or self._is_stopped():
-                    # publish two messages to make sure the client can receive the stop signal
-                    # and stop listening after the stop signal processed
-                    self.publish(
-                        QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL),
-                        PublishFrom.TASK_PIPELINE
-                    )
-                    self.stop_listen()
-
-                if elapsed_time // 10 > last_ping_time:
-                    self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
-                    last_ping_time = elapsed_time // 10
+        try:
+            while True:
+                try:
+                    message = self._q.get(timeout=idle_interval or 1)
+                    if message is None:
+                        break
+
+                    yield message
+                except queue.Empty:
+                    if idle_interval:
+                        yield None
+                    continue
+                finally:
+                    elapsed_time = time.time() - start_time
+                    if elapsed_time >= listen_timeout or self._is_stopped():
+                        # publish two messages to make sure the client can receive the stop signal
+                        # and stop listening after the stop signal processed
+                        self.publish(
+                            QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL),
+                            PublishFrom.TASK_PIPELINE
+                        )
+                        self.stop_listen()
+
+                    if elapsed_time // 10 > last_ping_time:
+                        self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
+                        last_ping_time = elapsed_time // 10
+        finally:
+            with ApplicationQueueManager._lock:
+                ApplicationQueueManager._stop_events.pop(self._task_id, None)
 
     def stop_listen(self) -> None:
         """
@@ -186,7 +212,8 @@ class ApplicationQueueManager:
         :param pub_from:
         :return:
         """
-        self._check_for_sqlalchemy_models(event.dict())
+        for field in event.unchecked_fields:
+            self._check_for_sqlalchemy_models(getattr(event, field))
 
         message = QueueMessage(
             task_id=self._task_id,
@@ -205,34 +232,80 @@ class ApplicationQueueManager:
             raise ConversationTaskStoppedException()
 
     @classmethod
-    def set_stop_flag(cls, task_id: str, invoke_from: InvokeFrom, user_id: str) -> None:
+    def is_task_owner(cls, task_id: str, invoke_from: InvokeFrom, user_id: str) -> bool:
         """
-        Set task stop flag
+        Check if the task belongs to the user
         :return:
         """
         result = redis_client.get(cls._generate_task_belong_cache_key(task_id))
         if result is None:
-            return
+            return False
 
         user_prefix = 'account' if invoke_from in [InvokeFrom.EXPLORE, InvokeFrom.DEBUGGER] else 'end-user'
-        if result.decode('utf-8') != f"{user_prefix}-{user_id}":
+        return result.decode('utf-8') == f"{user_prefix}-{user_id}"
+
+    @classmethod
+    def set_stop_flag(cls, task_id: str, invoke_from: InvokeFrom, user_id: str) -> None:
+        """
+        Set task stop flag
+        :return:
+        """
+        if not cls.is_task_owner(task_id, invoke_from, user_id):
             return
 
+        # the flag is kept for the workers that are not subscribed to the stop channel
         stopped_cache_key = cls._generate_stopped_cache_key(task_id)
         redis_client.setex(stopped_cache_key, 600, 1)
 
+        try:
+            redis_client.publish(cls.STOP_CHANNEL, task_id)
+        except Exception:
+            logger.exception('Failed to publish generate task stop signal')
+
     def _is_stopped(self) -> bool:
         """
         Check if task is stopped
         :return:
         """
+        if self._stop_event.is_set():
+            return True
+
+        if RedisSubscriber.is_subscribed(ApplicationQueueManager.STOP_CHANNEL):
+            return False
+
         stopped_cache_key = ApplicationQueueManager._generate_stopped_cache_key(self._task_id)
         result = redis_client.get(stopped_cache_key)
         if result is not None:
+            self._stop_event.set()
             return True
 
         return False
 
+    @classmethod
+    def _ensure_subscriber(cls) -> None:
+        RedisSubscriber.subscribe(cls.STOP_CHANNEL, cls._on_stop_signal, cls._on_resync)
+
+    @classmethod
+    def _on_stop_signal(cls, data: bytes) -> None:
+        cls._set_stop_event(data.decode('utf-8'))
+
+    @classmethod
+    def _on_resync(cls) -> None:
+        # stop signals may have been missed while not subscribed
+        with cls._lock:
+            task_ids = list(cls._stop_events.keys())
+        for task_id in task_ids:
+            if redis_client.get(cls._generate_stopped_cache_key(task_id)) is not None:
+                cls._set_stop_event(task_id)
+
+    @classmethod
+    def _set_stop_event(cls, task_id: str) -> None:
+        with cls._lock:
+            stop_event = cls._stop_events.get(task_id)
+
+        if stop_event:
+            stop_event.set()
+
     @classmethod
     def _generate_task_belong_cache_key(cls, task_id: str) -> str:
         """
@@ -253,7 +326,9 @@ class ApplicationQueueManager:
 
     def _check_for_sqlalchemy_models(self, data: Any):
         # from entity to dict or list
-        if isinstance(data, dict):
+        if isinstance(data, BaseModel):
+            self._check_for_sqlalchemy_models(data.dict())
+        elif isinstance(data, dict):
             for key, value in data.items():
                 self._check_for_sqlalchemy_models(value)
         elif isinstance(data, list):
@@ -1,6 +1,10 @@
+import hashlib
+import io
+import json
+import logging
 import tempfile
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Iterable, Iterator, List, Optional, Union
 
 import requests
 from core.data_loader.loader.csv_loader import CSVLoader
@@ -18,22 +22,142 @@ from core.data_loader.loader.unstructured.unstructured_xml import UnstructuredXm
 from extensions.ext_storage import storage
 from flask import current_app
 from langchain.document_loaders import Docx2txtLoader, TextLoader
+from langchain.document_loaders.base import BaseLoader
 from langchain.schema import Document
 from models.model import UploadFile
 
 SUPPORT_URL_CONTENT_TYPES = ['application/pdf', 'text/plain']
+# bump when the extracted documents of any loader change, to invalidate the parse cache
+PARSE_CACHE_VERSION = 1
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
 
+class ParseCacheVersionError(Exception):
+    pass
+
+
+class _ChunksReader(io.RawIOBase):
+    """Read only binary file over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._chunk = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk:
+            self._chunk = next(self._chunks, None)
+            if self._chunk is None:
+                self._chunk = b''
+                return 0
+
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+
+        return size
+
+
 class FileExtractor:
     @classmethod
     def load(cls, upload_file: UploadFile, return_text: bool = False, is_automatic: bool = False) -> Union[List[Document], str]:
+        documents = list(cls.lazy_load(upload_file, is_automatic))
+
+        return '\n'.join([document.page_content for document in documents]) if return_text else documents
+
+    @classmethod
+    def lazy_load(cls, upload_file: UploadFile, is_automatic: bool = False) -> Iterator[Document]:
+        """
+        Yield the documents of the file one by one while the loader parses it,
+        so that large files are never held in memory as a whole.
+
+        The extracted documents are cached by the content hash of the file,
+        so that estimating, indexing and retrying the same upload only parses it once.
+        """
+        cache_key = cls._get_parse_cache_key(upload_file, is_automatic)
+        if cache_key:
+            try:
+                if storage.exists(cache_key):
+                    yield from cls._load_parse_cache(cache_key)
+                    return
+            except ParseCacheVersionError:
+                pass
+
         with tempfile.TemporaryDirectory() as temp_dir:
             suffix = Path(upload_file.key).suffix
             file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{suffix}"
             storage.download(upload_file.key, file_path)
 
-            return cls.load_from_file(file_path, return_text, upload_file, is_automatic)
+            loader = cls._get_loader(file_path, upload_file, is_automatic)
+            try:
+                documents = loader.lazy_load()
+            except NotImplementedError:
+                # loader can only load the whole file at once
+                documents = loader.load()
+
+            if cache_key:
+                documents = cls._save_parse_cache(cache_key, documents, temp_dir)
+
+            yield from documents
+
+    @classmethod
+    def _get_parse_cache_key(cls, upload_file: UploadFile, is_automatic: bool) -> Optional[str]:
+        """
+        The cache key is addressed by the content hash of the file and everything that selects its loader.
+        """
+        if not upload_file.hash:
+            return None
+
+        loader_options = json.dumps([
+            current_app.config['ETL_TYPE'],
+            Path(upload_file.key).suffix.lower(),
+            is_automatic,
+            int(current_app.config.get('TABULAR_CHUNK_MAX_TOKENS') or 0)
+        ])
+        loader_options_hash = hashlib.sha256(loader_options.encode()).hexdigest()[:16]
+
+        return f'upload_files/{upload_file.tenant_id}/{upload_file.hash}.{loader_options_hash}' \
+               f'.v{PARSE_CACHE_VERSION}.documents.jsonl'
+
+    @classmethod
+    def _load_parse_cache(cls, cache_key: str) -> Iterator[Document]:
+        """
+        Cache file is json lines, a header line with the serialization version followed by one line per document.
+        The file is streamed from the storage and parsed line by line.
+        """
+        with io.TextIOWrapper(io.BufferedReader(_ChunksReader(storage.load_stream(cache_key))),
+                              encoding='utf-8') as cache_file:
+            header = json.loads(cache_file.readline() or '{}')
+            if header.get('version') != PARSE_CACHE_VERSION:
+                raise ParseCacheVersionError()
+
+            for line in cache_file:
+                data = json.loads(line)
+                yield Document(page_content=data['page_content'], metadata=data['metadata'])
+
+    @classmethod
+    def _save_parse_cache(cls, cache_key: str, documents: Iterable[Document], temp_dir: str) -> Iterator[Document]:
+        """
+        Pass the documents through while writing them to the cache,
+        the cache is only saved once all documents have been extracted.
+        """
+        cache_file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}.jsonl"
+        with open(cache_file_path, 'w', encoding='utf-8') as cache_file:
+            cache_file.write(json.dumps({'version': PARSE_CACHE_VERSION}) + '\n')
+            for document in documents:
+                cache_file.write(json.dumps({
+                    'page_content': document.page_content,
+                    'metadata': document.metadata
+                }, ensure_ascii=False, default=str) + '\n')
+
+                yield document
+
+        try:
+            storage.upload(cache_key, cache_file_path)
+        except Exception:
+            logging.exception("save parse cache failed")
 
     @classmethod
     def load_from_url(cls, url: str, return_text: bool = False) -> Union[List[Document], str]:
@@ -53,16 +177,31 @@ class FileExtractor:
     def load_from_file(cls, file_path: str, return_text: bool = False,
                        upload_file: Optional[UploadFile] = None,
                        is_automatic: bool = False) -> Union[List[Document], str]:
-        input_file = Path(file_path)
         delimiter = '\n'
+        loader = cls._get_loader(file_path, upload_file, is_automatic)
+
+        return delimiter.join([document.page_content for document in loader.load()]) if return_text else loader.load()
+
+    @classmethod
+    def _get_loader(cls, file_path: str, upload_file: Optional[UploadFile] = None,
+                    is_automatic: bool = False) -> BaseLoader:
+        input_file = Path(file_path)
         file_extension = input_file.suffix.lower()
         etl_type = current_app.config['ETL_TYPE']
         unstructured_api_url = current_app.config['UNSTRUCTURED_API_URL']
         if etl_type == 'Unstructured':
             if file_extension == '.xlsx':
-                loader = ExcelLoader(file_path)
+                loader = ExcelLoader(
+                    file_path,
+                    max_tokens=int(current_app.config.get('TABULAR_CHUNK_MAX_TOKENS') or 0)
+                )
             elif file_extension == '.pdf':
-                loader = PdfLoader(file_path, upload_file=upload_file)
+                loader = PdfLoader(
+                    file_path,
+                    upload_file=upload_file,
+                    max_workers=int(current_app.config.get('PDF_EXTRACTION_WORKERS') or 0),
+                    page_timeout=float(current_app.config.get('PDF_EXTRACTION_PAGE_TIMEOUT') or 0) or None
+                )
             elif file_extension in ['.md', '.markdown']:
                 loader = UnstructuredMarkdownLoader(file_path, unstructured_api_url) if is_automatic \
                     else MarkdownLoader(file_path, autodetect_encoding=True)
@@ -71,7 +210,11 @@ class FileExtractor:
             elif file_extension in ['.docx', '.doc']:
                 loader = Docx2txtLoader(file_path)
             elif file_extension == '.csv':
-                loader = CSVLoader(file_path, autodetect_encoding=True)
+                loader = CSVLoader(
+                    file_path,
+                    autodetect_encoding=True,
+                    max_tokens=int(current_app.config.get('TABULAR_CHUNK_MAX_TOKENS') or 0)
+                )
             elif file_extension == '.msg':
                 loader = UnstructuredMsgLoader(file_path, unstructured_api_url)
             elif file_extension == '.eml':
@@ -88,9 +231,17 @@ class FileExtractor:
                     else TextLoader(file_path, autodetect_encoding=True)
         else:
             if file_extension == '.xlsx':
-                loader = ExcelLoader(file_path)
+                loader = ExcelLoader(
+                    file_path,
+                    max_tokens=int(current_app.config.get('TABULAR_CHUNK_MAX_TOKENS') or 0)
+                )
             elif file_extension == '.pdf':
-                loader = PdfLoader(file_path, upload_file=upload_file)
+                loader = PdfLoader(
+                    file_path,
+                    upload_file=upload_file,
+                    max_workers=int(current_app.config.get('PDF_EXTRACTION_WORKERS') or 0),
+                    page_timeout=float(current_app.config.get('PDF_EXTRACTION_PAGE_TIMEOUT') or 0) or None
+                )
             elif file_extension in ['.md', '.markdown']:
                 loader = MarkdownLoader(file_path, autodetect_encoding=True)
             elif file_extension in ['.htm', '.html']:
@@ -98,9 +249,13 @@ class FileExtractor:
             elif file_extension in ['.docx', '.doc']:
                 loader = Docx2txtLoader(file_path)
             elif file_extension == '.csv':
-                loader = CSVLoader(file_path, autodetect_encoding=True)
+                loader = CSVLoader(
+                    file_path,
+                    autodetect_encoding=True,
+                    max_tokens=int(current_app.config.get('TABULAR_CHUNK_MAX_TOKENS') or 0)
+                )
             else:
                 # txt
                 loader = TextLoader(file_path, autodetect_encoding=True)
 
-        return delimiter.join([document.page_content for document in loader.load()]) if return_text else loader.load()
+        return loader
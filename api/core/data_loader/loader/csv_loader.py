@@ -1,13 +1,17 @@
-import csv
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 
+import pandas as pd
+from core.data_loader.loader.tabular import ROWS_PER_BLOCK, TabularRowGrouper, format_rows
 from langchain.document_loaders import CSVLoader as LCCSVLoader
 from langchain.document_loaders.helpers import detect_file_encodings
 from langchain.schema import Document
+from pandas.errors import EmptyDataError
 
 logger = logging.getLogger(__name__)
 
+READ_BLOCK_SIZE = 1024 * 1024
+
 
 class CSVLoader(LCCSVLoader):
     def __init__(
@@ -17,51 +21,89 @@ class CSVLoader(LCCSVLoader):
             csv_args: Optional[Dict] = None,
             encoding: Optional[str] = None,
             autodetect_encoding: bool = True,
+            max_tokens: int = 0,
     ):
+        """
+        :param max_tokens: token budget of a document of consecutive rows, 0 for one document per row
+        """
         self.file_path = file_path
         self.source_column = source_column
         self.encoding = encoding
         self.csv_args = csv_args or {}
         self.autodetect_encoding = autodetect_encoding
+        self.max_tokens = max_tokens
 
     def load(self) -> List[Document]:
         """Load data into document objects."""
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        """Load data into document objects, reading the file in blocks of rows."""
+        encoding = self._detect_encoding()
+        try:
+            blocks = pd.read_csv(
+                self.file_path,
+                encoding=encoding,
+                dtype=str,
+                keep_default_na=False,
+                chunksize=ROWS_PER_BLOCK,
+                **self.csv_args
+            )
+        except EmptyDataError:
+            return
+
+        row_grouper = TabularRowGrouper(self.max_tokens, metadata={})
+        first_row = 0
+        with blocks:
+            for block in blocks:
+                yield from row_grouper.add_rows(
+                    self._format_rows(block),
+                    list(range(first_row, first_row + len(block))),
+                    row_metadata=[{"source": source} for source in self._get_sources(block)]
+                )
+                first_row += len(block)
+
+        yield from row_grouper.flush()
+
+    def _detect_encoding(self) -> Optional[str]:
+        """Find an encoding that decodes the whole file, reading it in blocks instead of at once."""
         try:
-            with open(self.file_path, newline="", encoding=self.encoding) as csvfile:
-                docs = self._read_from_file(csvfile)
+            self._check_encoding(self.encoding)
+            return self.encoding
         except UnicodeDecodeError as e:
-            if self.autodetect_encoding:
-                detected_encodings = detect_file_encodings(self.file_path)
-                for encoding in detected_encodings:
-                    logger.debug("Trying encoding: ", encoding.encoding)
-                    try:
-                        with open(self.file_path, newline="", encoding=encoding.encoding) as csvfile:
-                            docs = self._read_from_file(csvfile)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-            else:
+            if not self.autodetect_encoding:
                 raise RuntimeError(f"Error loading {self.file_path}") from e
 
-        return docs
-
-    def _read_from_file(self, csvfile):
-        docs = []
-        csv_reader = csv.DictReader(csvfile, **self.csv_args)  # type: ignore
-        for i, row in enumerate(csv_reader):
-            content = "\n".join(f"{k.strip()}: {v.strip()}" for k, v in row.items())
+        detected_encodings = detect_file_encodings(self.file_path)
+        for encoding in detected_encodings:
+            logger.debug("Trying encoding: ", encoding.encoding)
             try:
-                source = (
-                    row[self.source_column]
-                    if self.source_column is not None
-                    else ''
-                )
-            except KeyError:
-                raise ValueError(
-                    f"Source column '{self.source_column}' not found in CSV file."
-                )
-            metadata = {"source": source, "row": i}
-            doc = Document(page_content=content, metadata=metadata)
-            docs.append(doc)
+                self._check_encoding(encoding.encoding)
+                return encoding.encoding
+            except UnicodeDecodeError:
+                continue
+
+        raise RuntimeError(f"Error loading {self.file_path}")
+
+    def _check_encoding(self, encoding: Optional[str]) -> None:
+        with open(self.file_path, newline="", encoding=encoding) as csvfile:
+            while csvfile.read(READ_BLOCK_SIZE):
+                pass
+
+    @staticmethod
+    def _format_rows(block: pd.DataFrame) -> List[str]:
+        block = block.apply(lambda values: values.str.strip())
+        block.columns = [str(column).strip() for column in block.columns]
+
+        return format_rows(block, key_value_separator=": ", pair_separator="\n")
+
+    def _get_sources(self, block: pd.DataFrame) -> List[str]:
+        if self.source_column is None:
+            return [''] * len(block)
+
+        if self.source_column not in block.columns:
+            raise ValueError(
+                f"Source column '{self.source_column}' not found in CSV file."
+            )
 
-        return docs
+        return block[self.source_column].tolist()
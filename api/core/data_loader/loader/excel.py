@@ -1,7 +1,9 @@
-import json
 import logging
-from typing import List
+from itertools import islice
+from typing import Iterator, List
 
+import pandas as pd
+from core.data_loader.loader.tabular import ROWS_PER_BLOCK, TabularRowGrouper, format_rows
 from langchain.document_loaders.base import BaseLoader
 from langchain.schema import Document
 from openpyxl.reader.excel import load_workbook
@@ -19,29 +21,67 @@ class ExcelLoader(BaseLoader):
 
     def __init__(
         self,
-        file_path: str
+        file_path: str,
+        max_tokens: int = 0
     ):
-        """Initialize with file path."""
+        """
+        Initialize with file path.
+
+        :param max_tokens: token budget of a document of consecutive rows, 0 for one document per row
+        """
         self._file_path = file_path
+        self._max_tokens = max_tokens
 
     def load(self) -> List[Document]:
-        data = []
-        keys = []
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        """Load every sheet in blocks of rows, the first non-empty row of a sheet is its header."""
         wb = load_workbook(filename=self._file_path, read_only=True)
-        # loop over all sheets
-        for sheet in wb:
-            if 'A1:A1' == sheet.calculate_dimension():
-                sheet.reset_dimensions()
-            for row in sheet.iter_rows(values_only=True):
-                if all(v is None for v in row):
-                    continue
-                if keys == []:
-                    keys = list(map(str, row))
-                else:
-                    row_dict = dict(zip(keys, list(map(str, row))))
-                    row_dict = {k: v for k, v in row_dict.items() if v}
-                    item = ''.join(f'{k}:{v};' for k, v in row_dict.items())
-                    document = Document(page_content=item, metadata={'source': self._file_path})
-                    data.append(document)
-
-        return data
+        try:
+            for sheet in wb:
+                if 'A1:A1' == sheet.calculate_dimension():
+                    sheet.reset_dimensions()
+
+                yield from self._load_sheet(sheet)
+        finally:
+            wb.close()
+
+    def _load_sheet(self, sheet) -> Iterator[Document]:
+        rows = (
+            (row_number, row) for row_number, row in enumerate(sheet.iter_rows(values_only=True), 1)
+            if not all(v is None for v in row)
+        )
+
+        header = next(rows, None)
+        if header is None:
+            return
+
+        # cells without a column name are left out
+        columns = [i for i, key in enumerate(header[1]) if key is not None]
+        keys = [str(header[1][i]) for i in columns]
+        row_grouper = TabularRowGrouper(
+            self._max_tokens,
+            metadata={'source': self._file_path, 'sheet': sheet.title}
+        )
+        while True:
+            block = list(islice(rows, ROWS_PER_BLOCK))
+            if not block:
+                break
+
+            frame = pd.DataFrame(
+                [[row[i] if i < len(row) else None for i in columns] for _, row in block],
+                columns=keys,
+                dtype=object
+            )
+            frame = frame.where(frame.notna(), '').astype(str)
+
+            yield from row_grouper.add_rows(
+                format_rows(frame, key_value_separator=':', pair_separator='', pair_suffix=';',
+                            skip_empty_values=True),
+                # row numbers in the sheet, 1 based like excel
+                [row_number for row_number, _ in block]
+            )
+
+        yield from row_grouper.flush()
+
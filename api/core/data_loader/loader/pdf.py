@@ -1,8 +1,7 @@
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from extensions.ext_storage import storage
-from langchain.document_loaders import PyPDFium2Loader
+from core.data_loader.loader.pdf_extractor import PdfPageExtractor
 from langchain.document_loaders.base import BaseLoader
 from langchain.schema import Document
 from models.model import UploadFile
@@ -21,34 +20,26 @@ class PdfLoader(BaseLoader):
     def __init__(
         self,
         file_path: str,
-        upload_file: Optional[UploadFile] = None
+        upload_file: Optional[UploadFile] = None,
+        max_workers: int = 0,
+        page_timeout: Optional[float] = None
     ):
         """Initialize with file path."""
         self._file_path = file_path
         self._upload_file = upload_file
+        self._max_workers = max_workers
+        self._page_timeout = page_timeout
 
     def load(self) -> List[Document]:
-        plaintext_file_key = ''
-        plaintext_file_exists = False
-        if self._upload_file:
-            if self._upload_file.hash:
-                plaintext_file_key = 'upload_files/' + self._upload_file.tenant_id + '/' \
-                                     + self._upload_file.hash + '.0625.plaintext'
-                try:
-                    text = storage.load(plaintext_file_key).decode('utf-8')
-                    plaintext_file_exists = True
-                    return [Document(page_content=text)]
-                except FileNotFoundError:
-                    pass
-        documents = PyPDFium2Loader(file_path=self._file_path).load()
-        text_list = []
-        for document in documents:
-            text_list.append(document.page_content)
-        text = "\n\n".join(text_list)
-
-        # save plaintext file for caching
-        if not plaintext_file_exists and plaintext_file_key:
-            storage.save(plaintext_file_key, text.encode('utf-8'))
-
-        return documents
-
+        # extracted documents are cached by FileExtractor
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[Document]:
+        extractor = PdfPageExtractor(
+            file_path=self._file_path,
+            max_workers=self._max_workers,
+            page_timeout=self._page_timeout
+        )
+
+        for page_number, text in extractor.extract():
+            yield Document(page_content=text, metadata={"source": self._file_path, "page": page_number})
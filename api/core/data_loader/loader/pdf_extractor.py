@@ -0,0 +1,127 @@
+import logging
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.pool import Pool
+from typing import Iterator, List, Optional, Tuple
+
+import pypdfium2
+
+logger = logging.getLogger(__name__)
+
+# pages extracted by a worker process at once
+PAGES_PER_TASK = 8
+
+# pdf document opened by the pool initializer of each worker process
+_pdf_document: Optional[pypdfium2.PdfDocument] = None
+
+
+def _init_worker(file_path: str) -> None:
+    global _pdf_document
+    _pdf_document = pypdfium2.PdfDocument(file_path)
+
+
+def _extract_page_text(pdf_document: pypdfium2.PdfDocument, page_number: int) -> str:
+    page = pdf_document.get_page(page_number)
+    text_page = page.get_textpage()
+    try:
+        return text_page.get_text_range()
+    finally:
+        text_page.close()
+        page.close()
+
+
+def _extract_page_range(start: int, end: int) -> List[str]:
+    return [_extract_page_text(_pdf_document, page_number) for page_number in range(start, end)]
+
+
+class PdfPageExtractor:
+    """
+    Extract the text of the pages of a pdf file, in page order.
+
+    Text extraction is CPU bound, so with max_workers > 1 page ranges are sharded over a pool of
+    worker processes, each with its own handle of the file. A page range that exceeds its page timeout
+    is retried page by page in a fresh pool, and a single page that still times out is skipped,
+    so one pathological page cannot stall the whole document.
+    """
+
+    def __init__(self, file_path: str, max_workers: int = 0, page_timeout: Optional[float] = None):
+        """
+        :param file_path: pdf file path
+        :param max_workers: extraction worker processes, 0 or 1 to extract in this process
+        :param page_timeout: max seconds to extract one page in a worker process, None for no limit
+        """
+        self._file_path = file_path
+        self._max_workers = max_workers
+        self._page_timeout = page_timeout
+
+    def extract(self) -> Iterator[Tuple[int, str]]:
+        """
+        :return: page number and text of every page
+        """
+        pdf_document = pypdfium2.PdfDocument(self._file_path)
+        try:
+            page_count = len(pdf_document)
+            if self._max_workers <= 1 or page_count <= PAGES_PER_TASK:
+                for page_number in range(page_count):
+                    yield page_number, _extract_page_text(pdf_document, page_number)
+                return
+
+            try:
+                pool = self._create_pool()
+            except Exception:
+                logger.exception('Failed to start pdf extraction pool, fallback to current process')
+                for page_number in range(page_count):
+                    yield page_number, _extract_page_text(pdf_document, page_number)
+                return
+        finally:
+            pdf_document.close()
+
+        yield from self._extract_in_pool(pool, page_count)
+
+    def _create_pool(self) -> Pool:
+        return multiprocessing.Pool(
+            processes=self._max_workers,
+            initializer=_init_worker,
+            initargs=(self._file_path,)
+        )
+
+    def _extract_in_pool(self, pool: Pool, page_count: int) -> Iterator[Tuple[int, str]]:
+        page_ranges = deque(
+            (start, min(start + PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PAGES_PER_TASK)
+        )
+        # only as many ranges as workers are in flight, so they start running when submitted
+        # and extracted pages do not pile up in memory
+        pending = deque()
+        try:
+            while page_ranges or pending:
+                while page_ranges and len(pending) < self._max_workers:
+                    start, end = page_ranges.popleft()
+                    deadline = time.monotonic() + self._page_timeout * (end - start) \
+                        if self._page_timeout else None
+                    pending.append((start, end, pool.apply_async(_extract_page_range, (start, end)), deadline))
+
+                start, end, result, deadline = pending.popleft()
+                try:
+                    texts = result.get(timeout=max(deadline - time.monotonic(), 0) if deadline else None)
+                except multiprocessing.TimeoutError:
+                    # the stuck worker can only be stopped by terminating the pool
+                    pool.terminate()
+                    pool = self._create_pool()
+
+                    retry_ranges = [(pending_start, pending_end) for pending_start, pending_end, _, _ in pending]
+                    pending.clear()
+                    if end - start > 1:
+                        retry_ranges = [(page_number, page_number + 1) for page_number in range(start, end)] \
+                                       + retry_ranges
+                    else:
+                        logger.warning(f'Extracting page {start} of {self._file_path} timed out, skipped.')
+
+                    page_ranges.extendleft(reversed(retry_ranges))
+                    continue
+
+                for page_number, text in enumerate(texts, start):
+                    yield page_number, text
+        finally:
+            pool.terminate()
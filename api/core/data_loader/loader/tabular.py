@@ -0,0 +1,105 @@
+from typing import Iterator, List, Optional
+
+import pandas as pd
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+from langchain.schema import Document
+
+# rows read from a table at once
+ROWS_PER_BLOCK = 10000
+# rows grouped into one document are separated by a blank line, the first separator of the splitters
+ROW_SEPARATOR = '\n\n'
+
+
+def format_rows(frame: pd.DataFrame, key_value_separator: str, pair_separator: str,
+                pair_suffix: str = '', skip_empty_values: bool = False) -> List[str]:
+    """
+    Format every row of a block of string cells as `<column><key_value_separator><value>` pairs,
+    column by column instead of cell by cell.
+
+    :param frame: block of rows, all cells are strings
+    :param key_value_separator: separator between the column name and the value
+    :param pair_separator: separator between the pairs of a row
+    :param pair_suffix: appended to every pair
+    :param skip_empty_values: leave out the pairs of empty cells
+    :return: text of every row
+    """
+    if frame.empty:
+        return []
+
+    pairs = []
+    for i, column in enumerate(frame.columns):
+        values = frame.iloc[:, i]
+        column_pairs = f'{column}{key_value_separator}' + values + pair_suffix
+        if skip_empty_values:
+            column_pairs = column_pairs.where(values != '', '')
+        pairs.append(column_pairs)
+
+    return pairs[0].str.cat(pairs[1:], sep=pair_separator).tolist()
+
+
+class TabularRowGrouper:
+    """
+    Group consecutive rows of a table into documents of up to `max_tokens` tokens,
+    so that a large table does not turn into one tiny segment and embedding per row.
+    A row longer than `max_tokens` is a document of its own, and `max_tokens` 0 keeps one document per row.
+    """
+
+    def __init__(self, max_tokens: int, metadata: dict):
+        """
+        :param max_tokens: token budget of a document
+        :param metadata: metadata of every document, e.g. source and sheet
+        """
+        self._max_tokens = max_tokens
+        self._metadata = metadata
+        self._texts = []
+        self._tokens = 0
+        self._first_row = 0
+        self._first_row_metadata = {}
+
+    def add_rows(self, texts: List[str], row_numbers: List[int],
+                 row_metadata: Optional[List[dict]] = None) -> Iterator[Document]:
+        """
+        Add a block of consecutive rows, yield the documents that are full.
+
+        :param texts: text of every row
+        :param row_numbers: row number of every row
+        :param row_metadata: metadata of every row, the metadata of the first row of a document is kept
+        """
+        if self._max_tokens <= 0:
+            for i, text in enumerate(texts):
+                yield self._build_document([text], row_numbers[i], row_metadata[i] if row_metadata else {})
+            return
+
+        # whitespace tokenizes differently before text than at the end of a text, count it between two rows
+        separator_tokens = GPT2Tokenizer.get_num_tokens(f'a{ROW_SEPARATOR}a') - 2 * GPT2Tokenizer.get_num_tokens('a')
+        for i, tokens in enumerate(GPT2Tokenizer.get_num_tokens_batch(texts)):
+            if self._texts and self._tokens + separator_tokens + tokens > self._max_tokens:
+                yield from self.flush()
+
+            if not self._texts:
+                self._first_row = row_numbers[i]
+                self._first_row_metadata = row_metadata[i] if row_metadata else {}
+                self._tokens = tokens
+            else:
+                self._tokens += separator_tokens + tokens
+            self._texts.append(texts[i])
+
+    def flush(self) -> Iterator[Document]:
+        """
+        Yield the document of the remaining rows.
+        """
+        if self._texts:
+            yield self._build_document(self._texts, self._first_row, self._first_row_metadata)
+
+        self._texts = []
+        self._tokens = 0
+
+    def _build_document(self, texts: List[str], first_row: int, row_metadata: dict) -> Document:
+        metadata = {
+            **self._metadata,
+            **row_metadata,
+            'row': first_row,
+            'row_count': len(texts)
+        }
+
+        return Document(page_content=ROW_SEPARATOR.join(texts), metadata=metadata)
@@ -1,6 +1,6 @@
 from typing import Any, Dict, Optional, Sequence, cast
 
-from core.model_manager import ModelManager
+from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from extensions.ext_database import db
@@ -8,6 +8,9 @@ from langchain.schema import Document
 from models.dataset import Dataset, DocumentSegment
 from sqlalchemy import func
 
+# segments written by a single statement and commit
+SEGMENT_BATCH_SIZE = 500
+
 
 class DatasetDocumentStore:
     def __init__(
@@ -82,56 +85,85 @@ class DatasetDocumentStore:
             if not isinstance(doc, Document):
                 raise ValueError("doc must be a Document")
 
-            segment_document = self.get_document(doc_id=doc.metadata['doc_id'], raise_error=False)
+        for i in range(0, len(docs), SEGMENT_BATCH_SIZE):
+            max_position = self._add_document_batch(
+                docs[i:i + SEGMENT_BATCH_SIZE], allow_update, embedding_model, max_position
+            )
+
+    def _add_document_batch(self, docs: Sequence[Document], allow_update: bool,
+                            embedding_model: Optional[ModelInstance], max_position: int) -> int:
+        """
+        Insert or update the segments of a batch of docs with one query, one statement each and one commit.
+
+        :return: max position after the batch
+        """
+        doc_ids = [doc.metadata['doc_id'] for doc in docs]
+        document_segments = db.session.query(DocumentSegment.id, DocumentSegment.index_node_id).filter(
+            DocumentSegment.dataset_id == self._dataset.id,
+            DocumentSegment.index_node_id.in_(doc_ids)
+        ).all()
+        segment_ids = {index_node_id: segment_id for segment_id, index_node_id in document_segments}
+
+        # calc embedding use tokens
+        if embedding_model:
+            model_type_instance = embedding_model.model_type_instance
+            model_type_instance = cast(TextEmbeddingModel, model_type_instance)
+            tokens = model_type_instance.get_num_tokens_batch(
+                model=embedding_model.model,
+                credentials=embedding_model.credentials,
+                texts=[doc.page_content for doc in docs]
+            )
+        else:
+            tokens = [0] * len(docs)
+
+        insert_mappings = {}
+        update_mappings = []
+        for doc, doc_tokens in zip(docs, tokens):
+            doc_id = doc.metadata['doc_id']
+            segment_id = segment_ids.get(doc_id)
 
             # NOTE: doc could already exist in the store, but we overwrite it
-            if not allow_update and segment_document:
+            if not allow_update and (segment_id or doc_id in insert_mappings):
                 raise ValueError(
-                    f"doc_id {doc.metadata['doc_id']} already exists. "
+                    f"doc_id {doc_id} already exists. "
                     "Set allow_update to True to overwrite."
                 )
 
-            # calc embedding use tokens
-            if embedding_model:
-                model_type_instance = embedding_model.model_type_instance
-                model_type_instance = cast(TextEmbeddingModel, model_type_instance)
-                tokens = model_type_instance.get_num_tokens(
-                    model=embedding_model.model,
-                    credentials=embedding_model.credentials,
-                    texts=[doc.page_content]
-                )
+            mapping = {
+                'content': doc.page_content,
+                'index_node_hash': doc.metadata['doc_hash'],
+                'word_count': len(doc.page_content),
+                'tokens': doc_tokens
+            }
+            if 'answer' in doc.metadata and doc.metadata['answer']:
+                mapping['answer'] = doc.metadata.pop('answer', '')
+
+            if segment_id:
+                mapping['id'] = segment_id
+                update_mappings.append(mapping)
+            elif doc_id in insert_mappings:
+                # a doc id repeated within the batch overwrites the segment inserted for it
+                insert_mappings[doc_id].update(mapping)
             else:
-                tokens = 0
-
-            if not segment_document:
                 max_position += 1
+                mapping.update({
+                    'tenant_id': self._dataset.tenant_id,
+                    'dataset_id': self._dataset.id,
+                    'document_id': self._document_id,
+                    'index_node_id': doc_id,
+                    'position': max_position,
+                    'enabled': False,
+                    'created_by': self._user_id,
+                })
+                insert_mappings[doc_id] = mapping
+
+        if insert_mappings:
+            db.session.bulk_insert_mappings(DocumentSegment, list(insert_mappings.values()))
+        if update_mappings:
+            db.session.bulk_update_mappings(DocumentSegment, update_mappings)
+        db.session.commit()
 
-                segment_document = DocumentSegment(
-                    tenant_id=self._dataset.tenant_id,
-                    dataset_id=self._dataset.id,
-                    document_id=self._document_id,
-                    index_node_id=doc.metadata['doc_id'],
-                    index_node_hash=doc.metadata['doc_hash'],
-                    position=max_position,
-                    content=doc.page_content,
-                    word_count=len(doc.page_content),
-                    tokens=tokens,
-                    enabled=False,
-                    created_by=self._user_id,
-                )
-                if 'answer' in doc.metadata and doc.metadata['answer']:
-                    segment_document.answer = doc.metadata.pop('answer', '')
-
-                db.session.add(segment_document)
-            else:
-                segment_document.content = doc.page_content
-                if 'answer' in doc.metadata and doc.metadata['answer']:
-                    segment_document.answer = doc.metadata.pop('answer', '')
-                segment_document.index_node_hash = doc.metadata['doc_hash']
-                segment_document.word_count = len(doc.page_content)
-                segment_document.tokens = tokens
-
-            db.session.commit()
+        return max_position
 
     def document_exists(self, doc_id: str) -> bool:
         """Check if document exists."""
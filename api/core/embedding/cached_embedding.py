@@ -1,21 +1,30 @@
-import base64
-import json
 import logging
-from typing import List, Optional, cast
+import threading
+from typing import Dict, List, Optional
 
 import numpy as np
+from core.embedding.embedding_codec import EmbeddingCodec
+from core.embedding.embedding_executor import EmbeddingExecutor
+from core.helper.lru_cache import LRUCache
 from core.model_manager import ModelInstance
-from core.model_runtime.entities.model_entities import ModelPropertyKey
-from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
+from flask import current_app
 from langchain.embeddings.base import Embeddings
 from libs import helper
 from models.dataset import Embedding
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
 logger = logging.getLogger(__name__)
 
+# max number of hashes sent in a single `IN` lookup against the embeddings table
+EMBEDDING_LOOKUP_BATCH_SIZE = 500
+
+# in-process tier in front of the embeddings table, keyed by (provider, model, text hash)
+_document_embedding_lru = LRUCache(capacity=2048)
+_document_embedding_lru_lock = threading.Lock()
+
 
 class CacheEmbedding(Embeddings):
     def __init__(self, model_instance: ModelInstance, user: Optional[str] = None) -> None:
@@ -23,46 +32,125 @@ class CacheEmbedding(Embeddings):
         self._user = user
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed search docs in batches of 10."""
-        text_embeddings = []
+        """Embed search docs in batches, only texts without a cached embedding are sent to the model."""
+        text_hashes = [helper.generate_text_hash(text) for text in texts]
+        text_embeddings = self._get_cached_document_embeddings(set(text_hashes))
+
+        # identical texts in the same call are embedded only once
+        embedding_queue = {}
+        for text, hash in zip(texts, text_hashes):
+            if hash not in text_embeddings and hash not in embedding_queue:
+                embedding_queue[hash] = text
+        queue_hashes = list(embedding_queue.keys())
+        queue_texts = list(embedding_queue.values())
+
+        if queue_texts:
+            try:
+                embedding_executor = EmbeddingExecutor(self._model_instance, user=self._user)
+                new_embeddings = dict(zip(queue_hashes, embedding_executor.embed(queue_texts)))
+            except Exception as ex:
+                logger.error('Failed to embed documents: ', ex)
+                raise ex
+
+            text_embeddings.update(new_embeddings)
+            self._store_document_embeddings(new_embeddings)
+
+        return [text_embeddings[hash] for hash in text_hashes]
+
+    def _get_cached_document_embeddings(self, hashes: set[str]) -> Dict[str, List[float]]:
+        """
+        Look up document embeddings in the process-local LRU first and then in bulk in the embeddings table.
+
+        :param hashes: text hashes
+        :return: embeddings of the hashes found, by hash
+        """
+        provider = self._model_instance.provider
+        model = self._model_instance.model
+
+        embeddings = {}
+        missing_hashes = []
+        with _document_embedding_lru_lock:
+            for hash in hashes:
+                vector = _document_embedding_lru.get((provider, model, hash))
+                if vector is not None:
+                    embeddings[hash] = vector.tolist()
+                else:
+                    missing_hashes.append(hash)
+
         try:
-            model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
-            model_schema = model_type_instance.get_model_schema(self._model_instance.model, self._model_instance.credentials)
-            max_chunks = model_schema.model_properties[ModelPropertyKey.MAX_CHUNKS] \
-                if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties else 1
-            for i in range(0, len(texts), max_chunks):
-                batch_texts = texts[i:i + max_chunks]
-
-                embedding_result = self._model_instance.invoke_text_embedding(
-                    texts=batch_texts,
-                    user=self._user
-                )
+            for i in range(0, len(missing_hashes), EMBEDDING_LOOKUP_BATCH_SIZE):
+                batch_hashes = missing_hashes[i:i + EMBEDDING_LOOKUP_BATCH_SIZE]
+                records = db.session.query(Embedding).filter(
+                    Embedding.provider_name == provider,
+                    Embedding.model_name == model,
+                    Embedding.hash.in_(batch_hashes)
+                ).all()
 
-                for vector in embedding_result.embeddings:
-                    try:
-                        normalized_embedding = (vector / np.linalg.norm(vector)).tolist()
-                        text_embeddings.append(normalized_embedding)
-                    except IntegrityError:
-                        db.session.rollback()
-                    except Exception as e:
-                        logging.exception('Failed to add embedding to redis')
+                for record in records:
+                    embeddings[record.hash] = record.get_embedding()
+        except Exception:
+            logging.exception('Failed to load embeddings from db')
 
-        except Exception as ex:
-            logger.error('Failed to embed documents: ', ex)
-            raise ex
+        self._put_lru(embeddings)
+
+        return embeddings
+
+    def _store_document_embeddings(self, embeddings: Dict[str, List[float]]) -> None:
+        """
+        Persist freshly computed document embeddings, rows already stored by a concurrent run are kept.
 
-        return text_embeddings
+        :param embeddings: embeddings by text hash
+        """
+        if not embeddings:
+            return
 
-    def embed_query(self, text: str) -> List[float]:
-        """Embed query text."""
-        # use doc embedding cache or store if not exists
+        self._put_lru(embeddings)
+
+        try:
+            rows = []
+            for hash, vector in embeddings.items():
+                embedding_cache = Embedding(
+                    provider_name=self._model_instance.provider,
+                    model_name=self._model_instance.model,
+                    hash=hash
+                )
+                embedding_cache.set_embedding(vector)
+                rows.append({
+                    'provider_name': embedding_cache.provider_name,
+                    'model_name': embedding_cache.model_name,
+                    'hash': embedding_cache.hash,
+                    'embedding': embedding_cache.embedding
+                })
+
+            for i in range(0, len(rows), EMBEDDING_LOOKUP_BATCH_SIZE):
+                db.session.execute(
+                    insert(Embedding).values(rows[i:i + EMBEDDING_LOOKUP_BATCH_SIZE])
+                    .on_conflict_do_nothing(index_elements=['model_name', 'hash', 'provider_name'])
+                )
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            logging.exception('Failed to add embeddings to db')
+
+    def _put_lru(self, embeddings: Dict[str, List[float]]) -> None:
+        provider = self._model_instance.provider
+        model = self._model_instance.model
+        with _document_embedding_lru_lock:
+            for hash, vector in embeddings.items():
+                _document_embedding_lru.put((provider, model, hash), np.asarray(vector))
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed query text, cache hits are returned as an array view over the cached bytes."""
+        # use query embedding cache or store if not exists
+        codec = EmbeddingCodec.value_of(current_app.config.get('EMBEDDING_QUERY_CACHE_CODEC') or 'float32')
         hash = helper.generate_text_hash(text)
-        embedding_cache_key = f'{self._model_instance.provider}_{self._model_instance.model}_{hash}'
+        embedding_cache_key = f'{self._model_instance.provider}_{self._model_instance.model}_{codec.value}_{hash}'
         embedding = redis_client.get(embedding_cache_key)
         if embedding:
             redis_client.expire(embedding_cache_key, 600)
-            return list(np.frombuffer(base64.b64decode(embedding), dtype="float"))
-
+            return codec.decode(embedding)
 
         try:
             embedding_result = self._model_instance.invoke_text_embedding(
@@ -70,24 +158,14 @@ class CacheEmbedding(Embeddings):
                 user=self._user
             )
 
-            embedding_results = embedding_result.embeddings[0]
-            embedding_results = (embedding_results / np.linalg.norm(embedding_results)).tolist()
+            embedding_results = np.asarray(embedding_result.embeddings[0], dtype=np.float32)
+            embedding_results = embedding_results / np.linalg.norm(embedding_results)
         except Exception as ex:
             raise ex
 
         try:
-            # encode embedding to base64
-            embedding_vector = np.array(embedding_results)
-            vector_bytes = embedding_vector.tobytes()
-            # Transform to Base64
-            encoded_vector = base64.b64encode(vector_bytes)
-            # Transform to string
-            encoded_str = encoded_vector.decode("utf-8")
-            redis_client.setex(embedding_cache_key, 600, encoded_str)
-
-        except IntegrityError:
-            db.session.rollback()
-        except:
+            redis_client.setex(embedding_cache_key, 600, codec.encode(embedding_results))
+        except Exception:
             logging.exception('Failed to add embedding to redis')
 
         return embedding_results
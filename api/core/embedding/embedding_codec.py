@@ -0,0 +1,72 @@
+from enum import Enum
+from typing import List, Sequence, Union
+
+import numpy as np
+
+
+class EmbeddingCodec(Enum):
+    """
+    Binary encodings of normalized embedding vectors used by the query embedding cache.
+    """
+    FLOAT32 = 'float32'
+    FLOAT16 = 'float16'
+    INT8 = 'int8'
+
+    @classmethod
+    def value_of(cls, value: str) -> 'EmbeddingCodec':
+        """
+        Get value of given codec.
+
+        :param value: codec value
+        :return: codec
+        """
+        for codec in cls:
+            if codec.value == value:
+                return codec
+        raise ValueError(f'invalid embedding codec value {value}')
+
+    def encode(self, embedding: np.ndarray) -> bytes:
+        """
+        Encode embedding into raw bytes.
+
+        int8 stores a float32 scale followed by the scalar-quantized components.
+
+        :param embedding: embedding vector
+        :return: encoded bytes
+        """
+        if self == EmbeddingCodec.INT8:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            max_abs = float(np.abs(embedding).max()) if embedding.size else 0.0
+            scale = np.float32(max_abs / 127 if max_abs > 0 else 1.0)
+            quantized = np.clip(np.rint(embedding / scale), -127, 127).astype(np.int8)
+            return scale.tobytes() + quantized.tobytes()
+
+        return np.asarray(embedding, dtype=self.value).tobytes()
+
+    def decode(self, data: bytes) -> np.ndarray:
+        """
+        Decode raw bytes into an embedding vector.
+
+        float32 and float16 return a read-only view over the given bytes without copying.
+
+        :param data: encoded bytes
+        :return: embedding vector
+        """
+        if self == EmbeddingCodec.INT8:
+            scale = np.frombuffer(data, dtype=np.float32, count=1)[0]
+            return np.frombuffer(data, dtype=np.int8, offset=4) * scale
+
+        return np.frombuffer(data, dtype=self.value)
+
+
+def to_float_list(embedding: Union[np.ndarray, Sequence[float]]) -> List[float]:
+    """
+    Convert an embedding vector into a list of floats, for vector database clients which do not take numpy arrays.
+
+    :param embedding: embedding vector, e.g. a query embedding array returned by `CacheEmbedding.embed_query`
+    :return: embedding vector as list
+    """
+    if isinstance(embedding, np.ndarray):
+        return embedding.tolist()
+
+    return embedding if isinstance(embedding, list) else list(embedding)
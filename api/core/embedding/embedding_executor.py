@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, cast
+
+import numpy as np
+from core.model_manager import ModelInstance
+from core.model_runtime.entities.model_entities import ModelPropertyKey
+from core.model_runtime.errors.invoke import (InvokeConnectionError, InvokeRateLimitError,
+                                              InvokeServerUnavailableError)
+from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
+from extensions.ext_redis import redis_client
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# retries of a throttled or temporarily unavailable batch
+MAX_RETRIES = 5
+# base delay in seconds of the exponential backoff between retries
+RETRY_BACKOFF_BASE = 1.0
+
+
+class EmbeddingRateLimiter:
+    """
+    Limiter of the requests and tokens sent to one embedding model per minute with the same credentials.
+
+    Counters live in redis in one minute windows, so the limits are shared by all api and worker processes.
+    Requests are sent unthrottled while redis is unavailable.
+    """
+
+    def __init__(self, scope: str, rpm: Optional[int] = None, tpm: Optional[int] = None) -> None:
+        self._scope = scope
+        self._rpm = rpm
+        self._tpm = tpm
+
+    @classmethod
+    def get_limiter(cls, provider: str, model: str, credentials: dict,
+                    rpm: Optional[int] = None, tpm: Optional[int] = None) -> 'EmbeddingRateLimiter':
+        """
+        Get the limiter of the given model, shared by every request made with the same credentials.
+
+        :param provider: provider name
+        :param model: model name
+        :param credentials: model credentials
+        :param rpm: max requests per minute
+        :param tpm: max tokens per minute
+        :return:
+        """
+        credentials_hash = hashlib.sha256(
+            json.dumps(credentials, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+
+        return cls(scope=f'{provider}:{model}:{credentials_hash}', rpm=rpm, tpm=tpm)
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Block until a request of the given tokens fits in the current window.
+
+        :param tokens: estimated tokens of the request
+        """
+        while True:
+            now = time.time()
+            window_key = f'embedding_rate_limit:{self._scope}:{int(now // 60)}'
+            try:
+                pipeline = redis_client.pipeline()
+                pipeline.hincrby(window_key, 'requests', 1)
+                pipeline.hincrby(window_key, 'tokens', tokens)
+                pipeline.expire(window_key, 120)
+                requests, window_tokens, _ = pipeline.execute()
+            except Exception:
+                logger.exception('Failed to check embedding rate limit, sending request unthrottled')
+                return
+
+            within_rpm = not self._rpm or requests <= self._rpm
+            # a single request larger than the tpm can only be sent into an empty window
+            within_tpm = not self._tpm or window_tokens == tokens or window_tokens <= self._tpm
+            if within_rpm and within_tpm:
+                return
+
+            try:
+                pipeline = redis_client.pipeline()
+                pipeline.hincrby(window_key, 'requests', -1)
+                pipeline.hincrby(window_key, 'tokens', -tokens)
+                pipeline.execute()
+            except Exception:
+                logger.exception('Failed to release embedding rate limit')
+
+            time.sleep(60 - now % 60 + random.uniform(0, 1))
+
+
+class EmbeddingExecutor:
+    """
+    Embed texts in `max_chunks` sized batches on a bounded thread pool, in input order.
+
+    Concurrency and rate limits come from the `EMBEDDING_MAX_WORKERS`, `EMBEDDING_RPM` and `EMBEDDING_TPM`
+    settings of the deployment, or else from the `max_workers`, `rpm` and `tpm` properties of the model schema.
+    Concurrency applies per process, rate limits are shared by all processes. Without either, batches are
+    embedded one at a time and unthrottled.
+    """
+
+    def __init__(self, model_instance: ModelInstance, user: Optional[str] = None) -> None:
+        self._model_instance = model_instance
+        self._user = user
+
+        model_type_instance = cast(TextEmbeddingModel, model_instance.model_type_instance)
+        model_schema = model_type_instance.get_model_schema(model_instance.model, model_instance.credentials)
+        model_properties = model_schema.model_properties if model_schema else {}
+
+        self._max_chunks = model_properties.get(ModelPropertyKey.MAX_CHUNKS) or 1
+        self._max_workers = current_app.config.get('EMBEDDING_MAX_WORKERS') \
+            or model_properties.get(ModelPropertyKey.MAX_WORKERS) or 1
+
+        rpm = current_app.config.get('EMBEDDING_RPM') or model_properties.get(ModelPropertyKey.RPM)
+        tpm = current_app.config.get('EMBEDDING_TPM') or model_properties.get(ModelPropertyKey.TPM)
+        self._rate_limiter = EmbeddingRateLimiter.get_limiter(
+            provider=model_instance.provider,
+            model=model_instance.model,
+            credentials=model_instance.credentials,
+            rpm=rpm,
+            tpm=tpm
+        ) if rpm or tpm else None
+
+        # latency in seconds of every batch embedded by this executor, in completion order
+        self.batch_latencies: List[float] = []
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts and normalize the vectors.
+
+        :param texts: texts to embed
+        :return: normalized embeddings, in the order of texts
+        """
+        batches = [texts[i:i + self._max_chunks] for i in range(0, len(texts), self._max_chunks)]
+        if not batches:
+            return []
+
+        if len(batches) == 1 or self._max_workers <= 1:
+            results = [self._embed_batch(index, batch) for index, batch in enumerate(batches)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self._max_workers, len(batches))) as executor:
+                futures = [executor.submit(self._embed_batch, index, batch) for index, batch in enumerate(batches)]
+                results = [future.result() for future in futures]
+
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    def _embed_batch(self, index: int, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a single batch, throttled batches are retried with exponential backoff.
+
+        :param index: batch index
+        :param texts: batch texts
+        :return: normalized embeddings
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            if self._rate_limiter:
+                self._rate_limiter.acquire(sum(self._estimate_tokens(text) for text in texts))
+
+            started_at = time.perf_counter()
+            try:
+                embedding_result = self._model_instance.invoke_text_embedding(
+                    texts=texts,
+                    user=self._user
+                )
+            except (InvokeRateLimitError, InvokeConnectionError, InvokeServerUnavailableError) as e:
+                if attempt == MAX_RETRIES:
+                    raise e
+
+                delay = RETRY_BACKOFF_BASE * (2 ** attempt) + random.uniform(0, RETRY_BACKOFF_BASE)
+                logger.warning(f'Embedding batch {index} failed with {e.__class__.__name__}, '
+                               f'retry {attempt + 1} in {delay:.1f}s')
+                time.sleep(delay)
+                continue
+
+            latency = time.perf_counter() - started_at
+            self.batch_latencies.append(latency)
+            logger.info(f'Embedded batch {index} of {len(texts)} texts with '
+                        f'{self._model_instance.provider}/{self._model_instance.model} in {latency:.3f}s')
+
+            return [(vector / np.linalg.norm(vector)).tolist() for vector in embedding_result.embeddings]
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """
+        Cheap token estimate used for tpm accounting, roughly 4 bytes per token for latin and CJK text.
+
+        :param text: text
+        :return: estimated tokens
+        """
+        return len(text.encode('utf-8')) // 4 + 1
@@ -7,7 +7,8 @@ from typing import Dict, Iterator, List, Optional, Tuple
 from core.entities.model_entities import ModelStatus, ModelWithProviderEntity, SimpleModelProviderEntity
 from core.entities.provider_entities import CustomConfiguration, SystemConfiguration, SystemConfigurationStatus
 from core.helper import encrypter
-from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
+from core.helper.model_provider_cache import (ProviderConfigurationsCache, ProviderCredentialsCache,
+                                              ProviderCredentialsCacheType)
 from core.model_runtime.entities.model_entities import FetchFrom, ModelType
 from core.model_runtime.entities.provider_entities import (ConfigurateMethod, CredentialFormSchema, FormType,
                                                            ProviderEntity)
@@ -219,6 +220,8 @@ class ProviderConfiguration(BaseModel):
 
         provider_model_credentials_cache.delete()
 
+        ProviderConfigurationsCache(self.tenant_id).delete()
+
         self.switch_preferred_provider_type(ProviderType.CUSTOM)
 
     def delete_custom_credentials(self) -> None:
@@ -249,6 +252,8 @@ class ProviderConfiguration(BaseModel):
 
             provider_model_credentials_cache.delete()
 
+            ProviderConfigurationsCache(self.tenant_id).delete()
+
     def get_custom_model_credentials(self, model_type: ModelType, model: str, obfuscated: bool = False) \
             -> Optional[dict]:
         """
@@ -368,6 +373,8 @@ class ProviderConfiguration(BaseModel):
 
         provider_model_credentials_cache.delete()
 
+        ProviderConfigurationsCache(self.tenant_id).delete()
+
     def delete_custom_model_credentials(self, model_type: ModelType, model: str) -> None:
         """
         Delete custom model credentials.
@@ -397,6 +404,8 @@ class ProviderConfiguration(BaseModel):
 
             provider_model_credentials_cache.delete()
 
+            ProviderConfigurationsCache(self.tenant_id).delete()
+
     def get_provider_instance(self) -> ModelProvider:
         """
         Get provider instance.
@@ -448,6 +457,8 @@ class ProviderConfiguration(BaseModel):
 
         db.session.commit()
 
+        ProviderConfigurationsCache(self.tenant_id).delete()
+
     def _extract_secret_variables(self, credential_form_schemas: list[CredentialFormSchema]) -> list[str]:
         """
         Extract secret input form variables.
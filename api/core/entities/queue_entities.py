@@ -1,8 +1,9 @@
 from enum import Enum
-from typing import Any
+from typing import Any, ClassVar, Union, get_args, get_origin
 
 from core.model_runtime.entities.llm_entities import LLMResult, LLMResultChunk
 from pydantic import BaseModel
+from sqlalchemy.orm import DeclarativeMeta
 
 
 class QueueEvent(Enum):
@@ -22,12 +23,60 @@ class QueueEvent(Enum):
     STOP = "stop"
 
 
+def _is_type_checked(type_: Any, checked_models: set) -> bool:
+    """
+    Whether the values of the type can never contain SQLAlchemy model instances.
+
+    :param type_: field type
+    :param checked_models: pydantic models already checked or being checked
+    :raises TypeError: the type is a SQLAlchemy model
+    :return: False if the type can hold values of any type, e.g. Any or dict
+    """
+    if isinstance(type_, DeclarativeMeta):
+        raise TypeError("Critical Error: Passing SQLAlchemy Model instances "
+                        "that cause thread safety issues is not allowed.")
+
+    if type_ is Any or type_ is object:
+        return False
+
+    origin = get_origin(type_)
+    if origin is not None:
+        args = get_args(type_)
+        if not args and origin is not Union:
+            return False
+
+        return all([_is_type_checked(arg, checked_models) for arg in args])
+
+    if type_ in (dict, list, tuple, set):
+        return False
+
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        if type_ in checked_models:
+            return True
+
+        checked_models.add(type_)
+        return all([_is_type_checked(field.outer_type_, checked_models) for field in type_.__fields__.values()])
+
+    return isinstance(type_, type)
+
+
 class AppQueueEvent(BaseModel):
     """
     QueueEvent entity
     """
     event: QueueEvent
 
+    # fields that can hold values of any type, their values are checked on publish,
+    # the types of all other fields are checked once when the event class is defined
+    unchecked_fields: ClassVar[tuple[str, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.unchecked_fields = tuple(
+            name for name, field in cls.__fields__.items()
+            if not _is_type_checked(field.outer_type_, set())
+        )
+
 
 class QueueMessageEvent(AppQueueEvent):
     """
@@ -0,0 +1,353 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Generator, Optional
+
+from extensions.ext_redis import redis_client
+from flask import current_app
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationEventBus(ABC):
+    """
+    Carries the stream response events of generate tasks from the task pipeline to the clients.
+
+    The events of a task are kept until `RETENTION` seconds after it ends, so a client can reconnect
+    to a task by its task id and resume after the last event id it received.
+    """
+    # seconds the events of a task are kept after it ends
+    RETENTION = 600
+    # seconds a subscriber waits for the next event before giving up
+    LISTEN_TIMEOUT = 600
+
+    @abstractmethod
+    def start(self, task_id: str) -> None:
+        """
+        Register the task before its first event, so subscribers wait for its events.
+
+        :param task_id: task id
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def publish(self, task_id: str, data: str) -> str:
+        """
+        Publish a stream response event of the task.
+
+        :param task_id: task id
+        :param data: stream response event
+        :return: event id
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def end(self, task_id: str) -> None:
+        """
+        Mark the task as ended, subscribers stop after the last event.
+
+        :param task_id: task id
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, task_id: str) -> bool:
+        """
+        Whether the events of the task are available.
+
+        :param task_id: task id
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def is_resumable(self, task_id: str, last_event_id: Optional[str] = None) -> bool:
+        """
+        Whether all events of the task after the last event id are still available.
+
+        :param task_id: task id
+        :param last_event_id: resume after this event id, None to start from the first event
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def subscribe(self, task_id: str, last_event_id: Optional[str] = None) -> Generator[tuple[str, str], None, None]:
+        """
+        Yield the events of the task until it ends, or until events not read yet have been dropped.
+
+        :param task_id: task id
+        :param last_event_id: resume after this event id, None to start from the first event
+        :return: event id and stream response event
+        """
+        raise NotImplementedError
+
+
+class _TaskEvents:
+    def __init__(self):
+        self.events: list[str] = []
+        # number of events dropped from the start to stay within the size limit
+        self.dropped = 0
+        self.size = 0
+        self.updated_at = time.monotonic()
+        self.ended_at: Optional[float] = None
+        self.condition = threading.Condition()
+
+
+class InProcessGenerationEventBus(GenerationEventBus):
+    """
+    Keeps the events in this process, clients can only reconnect to tasks running in the same worker.
+    Event ids are the 1 based positions of the events.
+
+    At most `MAX_TASK_SIZE` characters of events are kept per task, the oldest are dropped first.
+    Tasks are swept every `SWEEP_INTERVAL` seconds once ended for `RETENTION` seconds, or once
+    without new events for `LISTEN_TIMEOUT` seconds, e.g. when their stream thread died.
+    """
+    RETENTION = 60
+    MAX_TASK_SIZE = 1024 * 1024
+    SWEEP_INTERVAL = 10
+
+    def __init__(self):
+        self._tasks: dict[str, _TaskEvents] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def start(self, task_id: str) -> None:
+        self._get_task_events(task_id)
+        self._ensure_sweeper()
+
+    def publish(self, task_id: str, data: str) -> str:
+        task_events = self._get_task_events(task_id)
+        with task_events.condition:
+            task_events.events.append(data)
+            task_events.size += len(data)
+            task_events.updated_at = time.monotonic()
+
+            # keep the last event even if it is larger than the limit
+            dropped = 0
+            while task_events.size > self.MAX_TASK_SIZE and dropped < len(task_events.events) - 1:
+                task_events.size -= len(task_events.events[dropped])
+                dropped += 1
+            if dropped:
+                del task_events.events[:dropped]
+                task_events.dropped += dropped
+
+            task_events.condition.notify_all()
+
+            return str(task_events.dropped + len(task_events.events))
+
+    def end(self, task_id: str) -> None:
+        task_events = self._get_task_events(task_id)
+        with task_events.condition:
+            task_events.ended_at = time.monotonic()
+            task_events.condition.notify_all()
+
+    def exists(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._tasks
+
+    def is_resumable(self, task_id: str, last_event_id: Optional[str] = None) -> bool:
+        with self._lock:
+            task_events = self._tasks.get(task_id)
+
+        if not task_events:
+            return False
+
+        with task_events.condition:
+            return self._get_position(last_event_id) >= task_events.dropped
+
+    def subscribe(self, task_id: str, last_event_id: Optional[str] = None) -> Generator[tuple[str, str], None, None]:
+        with self._lock:
+            task_events = self._tasks.get(task_id)
+
+        if not task_events:
+            return
+
+        position = self._get_position(last_event_id)
+        while True:
+            with task_events.condition:
+                if position >= task_events.dropped + len(task_events.events) and task_events.ended_at is None:
+                    task_events.condition.wait(timeout=self.LISTEN_TIMEOUT)
+
+                if position < task_events.dropped:
+                    logger.warning(f"Events of generate task {task_id} were dropped before read, stop listening.")
+                    return
+
+                events = task_events.events[position - task_events.dropped:]
+                ended = task_events.ended_at is not None
+                total = task_events.dropped + len(task_events.events)
+
+            if not events and not ended:
+                logger.warning(f"Generate task {task_id} has no events for {self.LISTEN_TIMEOUT}s, stop listening.")
+                return
+
+            for data in events:
+                position += 1
+                yield str(position), data
+
+            if ended and position >= total:
+                return
+
+    @staticmethod
+    def _get_position(last_event_id: Optional[str]) -> int:
+        return int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    def _get_task_events(self, task_id: str) -> _TaskEvents:
+        with self._lock:
+            task_events = self._tasks.get(task_id)
+            if not task_events:
+                task_events = self._tasks[task_id] = _TaskEvents()
+
+            return task_events
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper and self._sweeper.is_alive():
+            return
+
+        with self._lock:
+            if self._sweeper and self._sweeper.is_alive():
+                return
+
+            self._sweeper = threading.Thread(target=self._sweep_periodically, daemon=True)
+            self._sweeper.start()
+
+    def _sweep_periodically(self) -> None:
+        while True:
+            time.sleep(self.SWEEP_INTERVAL)
+            try:
+                self._remove_expired_tasks()
+            except Exception:
+                logger.exception('Failed to remove expired generate task events')
+
+    def _remove_expired_tasks(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired_task_ids = [
+                task_id for task_id, task_events in self._tasks.items()
+                if (task_events.ended_at is not None and now - task_events.ended_at > self.RETENTION)
+                or (task_events.ended_at is None and now - task_events.updated_at > self.LISTEN_TIMEOUT)
+            ]
+            for task_id in expired_task_ids:
+                del self._tasks[task_id]
+
+
+class RedisStreamGenerationEventBus(GenerationEventBus):
+    """
+    Keeps the events in a redis stream per task, clients can reconnect to tasks running in any worker.
+    Event ids are the redis stream entry ids.
+
+    Streams are trimmed to about `MAX_EVENTS` events, a subscriber whose next events were trimmed
+    stops instead of skipping them.
+    """
+    # max events kept per task
+    MAX_EVENTS = 10000
+    # seconds the events of a task are kept while it is running
+    RUNNING_RETENTION = 1800
+    # milliseconds a read blocks waiting for new events
+    READ_BLOCK = 5000
+    # max events per read
+    READ_COUNT = 100
+
+    def start(self, task_id: str) -> None:
+        key = self._generate_stream_key(task_id)
+
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.xadd(key, {'start': 1})
+        pipeline.expire(key, self.RUNNING_RETENTION)
+        pipeline.execute()
+
+    def publish(self, task_id: str, data: str) -> str:
+        key = self._generate_stream_key(task_id)
+
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.xadd(key, {'data': data}, maxlen=self.MAX_EVENTS, approximate=True)
+        pipeline.expire(key, self.RUNNING_RETENTION)
+        event_id, _ = pipeline.execute()
+
+        return event_id.decode('utf-8')
+
+    def end(self, task_id: str) -> None:
+        key = self._generate_stream_key(task_id)
+
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.xadd(key, {'end': 1}, maxlen=self.MAX_EVENTS, approximate=True)
+        pipeline.expire(key, self.RETENTION)
+        pipeline.execute()
+
+    def exists(self, task_id: str) -> bool:
+        return redis_client.exists(self._generate_stream_key(task_id)) > 0
+
+    def is_resumable(self, task_id: str, last_event_id: Optional[str] = None) -> bool:
+        """
+        The stream is only trimmed from the start, so no event after the last event id was trimmed
+        if the last event, or the start entry when there is none, still exists.
+        """
+        key = self._generate_stream_key(task_id)
+        if last_event_id:
+            try:
+                return len(redis_client.xrange(key, min=last_event_id, max=last_event_id, count=1)) > 0
+            except ResponseError:
+                # not a stream entry id
+                return False
+
+        entries = redis_client.xrange(key, count=1)
+        return len(entries) > 0 and b'start' in entries[0][1]
+
+    def subscribe(self, task_id: str, last_event_id: Optional[str] = None) -> Generator[tuple[str, str], None, None]:
+        key = self._generate_stream_key(task_id)
+        if not self.is_resumable(task_id, last_event_id):
+            logger.warning(f"Events of generate task {task_id} were trimmed before read, stop listening.")
+            return
+
+        last_event_id = last_event_id or '0-0'
+        last_event_at = time.monotonic()
+
+        while True:
+            result = redis_client.xread({key: last_event_id}, count=self.READ_COUNT, block=self.READ_BLOCK)
+            if not result:
+                if time.monotonic() - last_event_at > self.LISTEN_TIMEOUT or not self.exists(task_id):
+                    logger.warning(f"Generate task {task_id} has no events, stop listening.")
+                    return
+
+                continue
+
+            last_event_at = time.monotonic()
+            entries = result[0][1]
+            for event_id, fields in entries:
+                if b'end' in fields:
+                    return
+
+                last_event_id = event_id.decode('utf-8')
+                if b'data' in fields:
+                    yield last_event_id, fields[b'data'].decode('utf-8')
+
+            # a full read means the subscriber lags behind, the next events may have been trimmed meanwhile
+            if len(entries) >= self.READ_COUNT and not self.is_resumable(task_id, last_event_id):
+                logger.warning(f"Events of generate task {task_id} were trimmed before read, stop listening.")
+                return
+
+    @classmethod
+    def _generate_stream_key(cls, task_id: str) -> str:
+        """
+        Generate stream key
+        :param task_id: task id
+        :return:
+        """
+        return f"generate_task_events:{task_id}"
+
+
+_in_process_event_bus = InProcessGenerationEventBus()
+_redis_stream_event_bus = RedisStreamGenerationEventBus()
+
+
+def get_generation_event_bus() -> GenerationEventBus:
+    """
+    Get the generation event bus configured by GENERATION_EVENT_BUS_TYPE.
+    """
+    event_bus_type = current_app.config.get('GENERATION_EVENT_BUS_TYPE')
+    if event_bus_type == 'redis':
+        return _redis_stream_event_bus
+    elif event_bus_type == 'memory':
+        return _in_process_event_bus
+    else:
+        raise ValueError(f"Unknown generation event bus type: {event_bus_type}")
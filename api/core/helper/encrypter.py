@@ -1,9 +1,16 @@
 import base64
+import hashlib
+import threading
 
+from cachetools import TTLCache
 from extensions.ext_database import db
 from libs import rsa
 from models.account import Tenant
 
+# decrypted tokens by (tenant id, token hash), a new token is encrypted with a new aes key on every update
+_decrypted_token_cache = TTLCache(maxsize=10000, ttl=600)
+_decrypted_token_cache_lock = threading.Lock()
+
 
 def obfuscated_token(token: str):
     return token[:6] + '*' * (len(token) - 8) + token[-2:]
@@ -16,13 +23,28 @@ def encrypt_token(tenant_id: str, token: str):
 
 
 def decrypt_token(tenant_id: str, token: str):
-    return rsa.decrypt(base64.b64decode(token), tenant_id)
+    cache_key = (tenant_id, hashlib.sha256(token.encode()).hexdigest())
+    with _decrypted_token_cache_lock:
+        decrypted_token = _decrypted_token_cache.get(cache_key)
+    if decrypted_token is not None:
+        return decrypted_token
+
+    decrypted_token = rsa.decrypt(base64.b64decode(token), tenant_id)
+
+    with _decrypted_token_cache_lock:
+        _decrypted_token_cache[cache_key] = decrypted_token
+
+    return decrypted_token
 
 
 def batch_decrypt_token(tenant_id: str, tokens: list[str]):
-    rsa_key, cipher_rsa = rsa.get_decrypt_decoding(tenant_id)
+    return [decrypt_token(tenant_id, token) for token in tokens]
+
 
-    return [rsa.decrypt_token_with_decoding(base64.b64decode(token), rsa_key, cipher_rsa) for token in tokens]
+def invalidate_decrypted_tokens(tenant_id: str):
+    with _decrypted_token_cache_lock:
+        for cache_key in [cache_key for cache_key in _decrypted_token_cache.keys() if cache_key[0] == tenant_id]:
+            _decrypted_token_cache.pop(cache_key, None)
 
 
 def get_decrypt_decoding(tenant_id: str):
@@ -1,9 +1,17 @@
 import json
+import logging
+import threading
+import time
+from collections import OrderedDict
 from enum import Enum
 from json import JSONDecodeError
-from typing import Optional
+from typing import Any, Optional
 
+from core.helper import encrypter
 from extensions.ext_redis import redis_client
+from libs.redis_subscriber import RedisSubscriber
+
+logger = logging.getLogger(__name__)
 
 
 class ProviderCredentialsCacheType(Enum):
@@ -13,6 +21,7 @@ class ProviderCredentialsCacheType(Enum):
 
 class ProviderCredentialsCache:
     def __init__(self, tenant_id: str, identity_id: str, cache_type: ProviderCredentialsCacheType):
+        self.tenant_id = tenant_id
         self.cache_key = f"{cache_type.value}_credentials:tenant_id:{tenant_id}:id:{identity_id}"
 
     def get(self) -> Optional[dict]:
@@ -49,3 +58,176 @@ class ProviderCredentialsCache:
         :return:
         """
         redis_client.delete(self.cache_key)
+        encrypter.invalidate_decrypted_tokens(self.tenant_id)
+
+
+class _ProviderConfigurationsEntry:
+    def __init__(self, provider_configurations: Any, version: int, expires_at: float):
+        self.provider_configurations = provider_configurations
+        self.version = version
+        self.expires_at = expires_at
+        # (provider name, quota type) -> quota used since the provider configurations were built
+        self.used_quotas: dict[tuple[str, str], int] = {}
+
+
+class ProviderConfigurationsCache:
+    """
+    Process-local cache of the provider configurations of a tenant.
+
+    Every invalidation increments the tenant version counter in redis and publishes the new version,
+    so that all workers drop their entry. While the subscriber is not listening, the version counter
+    is checked on every hit instead. Entries expire after a short TTL, and at most `MAX_ENTRIES`
+    tenants are kept, least recently used first out.
+
+    The cached provider configurations are shared by all threads and must not be modified,
+    the quota used since they were built is accounted with `add_used_quota` instead.
+    """
+    TTL = 60
+    MAX_ENTRIES = 1000
+    CHANNEL = 'provider_configurations_invalidated'
+
+    # tenant id -> entry, in least recently used order
+    _entries: OrderedDict[str, _ProviderConfigurationsEntry] = OrderedDict()
+    # tenant id -> (latest version published by any worker, published at)
+    _published_versions: dict[str, tuple[int, float]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.version_key = f"provider_configurations_version:tenant_id:{tenant_id}"
+
+    def get(self) -> Optional[Any]:
+        """
+        Get cached provider configurations, shared by all threads and read only.
+
+        :return:
+        """
+        self._ensure_subscriber()
+
+        # checked before the entry is read, entries kept while not subscribed are cleared on resubscribe
+        subscribed = RedisSubscriber.is_subscribed(self.CHANNEL)
+        with self._lock:
+            entry = self._entries.get(self.tenant_id)
+            if entry:
+                self._entries.move_to_end(self.tenant_id)
+            published_version = self._get_published_version(self.tenant_id)
+
+        if not entry:
+            return None
+
+        if time.monotonic() > entry.expires_at \
+                or entry.version < published_version \
+                or (not subscribed and entry.version != self.get_version()):
+            with self._lock:
+                if self._entries.get(self.tenant_id) is entry:
+                    del self._entries[self.tenant_id]
+            return None
+
+        return entry.provider_configurations
+
+    def set(self, provider_configurations: Any, version: int) -> None:
+        """
+        Cache provider configurations.
+
+        :param provider_configurations: provider configurations
+        :param version: tenant version read before the provider configurations were built
+        :return:
+        """
+        with self._lock:
+            self._remove_expired()
+
+            if version < self._get_published_version(self.tenant_id):
+                return
+
+            self._entries[self.tenant_id] = _ProviderConfigurationsEntry(
+                provider_configurations, version, time.monotonic() + self.TTL
+            )
+            self._entries.move_to_end(self.tenant_id)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def add_used_quota(self, provider_name: str, quota_type: str, used_quota: int) -> int:
+        """
+        Account quota used since the cached provider configurations were built.
+
+        :param provider_name: provider name
+        :param quota_type: quota type
+        :param used_quota: used quota
+        :return: quota used since the provider configurations were built, used_quota if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(self.tenant_id)
+            if not entry:
+                return used_quota
+
+            key = (provider_name, quota_type)
+            entry.used_quotas[key] = entry.used_quotas.get(key, 0) + used_quota
+
+            return entry.used_quotas[key]
+
+    def get_version(self) -> int:
+        """
+        Get the tenant version counter.
+
+        :return:
+        """
+        version = redis_client.get(self.version_key)
+        return int(version) if version else 0
+
+    def delete(self) -> None:
+        """
+        Invalidate cached provider configurations of the tenant in all workers.
+
+        :return:
+        """
+        version = redis_client.incr(self.version_key)
+        with self._lock:
+            self._entries.pop(self.tenant_id, None)
+            self._set_published_version(self.tenant_id, version)
+
+        try:
+            redis_client.publish(self.CHANNEL, json.dumps({'tenant_id': self.tenant_id, 'version': version}))
+        except Exception:
+            logger.exception('Failed to publish provider configurations invalidation')
+
+    @classmethod
+    def _get_published_version(cls, tenant_id: str) -> int:
+        published_version = cls._published_versions.get(tenant_id)
+        return published_version[0] if published_version else 0
+
+    @classmethod
+    def _set_published_version(cls, tenant_id: str, version: int) -> None:
+        cls._published_versions[tenant_id] = (max(cls._get_published_version(tenant_id), version),
+                                              time.monotonic())
+
+    @classmethod
+    def _remove_expired(cls) -> None:
+        """
+        Remove expired entries, and published versions older than the TTL, which no build
+        of provider configurations still running can predate. Called with the lock held.
+        """
+        now = time.monotonic()
+        for tenant_id in [tenant_id for tenant_id, entry in cls._entries.items() if now > entry.expires_at]:
+            del cls._entries[tenant_id]
+
+        for tenant_id in [tenant_id for tenant_id, (_, published_at) in cls._published_versions.items()
+                          if now - published_at > cls.TTL]:
+            del cls._published_versions[tenant_id]
+
+    @classmethod
+    def _ensure_subscriber(cls) -> None:
+        RedisSubscriber.subscribe(cls.CHANNEL, cls._on_invalidated, cls._on_resync)
+
+    @classmethod
+    def _on_invalidated(cls, data: bytes) -> None:
+        data = json.loads(data)
+        with cls._lock:
+            tenant_id = data['tenant_id']
+            cls._set_published_version(tenant_id, data['version'])
+            cls._entries.pop(tenant_id, None)
+
+    @classmethod
+    def _on_resync(cls) -> None:
+        # invalidations may have been missed while not subscribed
+        with cls._lock:
+            cls._entries.clear()
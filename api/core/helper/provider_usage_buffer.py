@@ -0,0 +1,139 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from extensions.ext_database import db
+from flask import Flask, current_app
+from models.provider import Provider, ProviderType
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUsageBuffer:
+    """
+    Process-local buffer of the provider usage recorded for every created message.
+
+    The used quota and the last used time are accumulated per provider, and a daemon thread writes them
+    every `FLUSH_INTERVAL` seconds in one transaction, instead of an UPDATE and commit per message
+    on the response path. Buffered usage not yet written is lost if the process is killed.
+    """
+    FLUSH_INTERVAL = 5
+
+    # (tenant id, provider name, quota type) -> used quota of the system provider
+    _used_quotas: dict[tuple[str, str, str], int] = {}
+    # (tenant id, provider name) -> last used time
+    _last_used: dict[tuple[str, str], datetime] = {}
+    _lock = threading.Lock()
+    _flusher: Optional[threading.Thread] = None
+
+    @classmethod
+    def add_used_quota(cls, tenant_id: str, provider_name: str, quota_type: str, used_quota: int) -> None:
+        """
+        Add used quota of the system provider.
+
+        :param tenant_id: workspace id
+        :param provider_name: provider name
+        :param quota_type: quota type
+        :param used_quota: used quota
+        :return:
+        """
+        key = (tenant_id, provider_name, quota_type)
+        with cls._lock:
+            cls._used_quotas[key] = cls._used_quotas.get(key, 0) + used_quota
+
+        cls._ensure_flusher()
+
+    @classmethod
+    def set_last_used(cls, tenant_id: str, provider_name: str, last_used: datetime) -> None:
+        """
+        Set last used time of the provider.
+
+        :param tenant_id: workspace id
+        :param provider_name: provider name
+        :param last_used: last used time
+        :return:
+        """
+        with cls._lock:
+            cls._last_used[(tenant_id, provider_name)] = last_used
+
+        cls._ensure_flusher()
+
+    @classmethod
+    def flush(cls) -> None:
+        """
+        Write the buffered usage.
+
+        :return:
+        """
+        with cls._lock:
+            used_quotas = cls._used_quotas
+            last_used = cls._last_used
+            cls._used_quotas = {}
+            cls._last_used = {}
+
+        if not used_quotas and not last_used:
+            return
+
+        try:
+            for (tenant_id, provider_name, quota_type), used_quota in used_quotas.items():
+                db.session.query(Provider).filter(
+                    Provider.tenant_id == tenant_id,
+                    Provider.provider_name == provider_name,
+                    Provider.provider_type == ProviderType.SYSTEM.value,
+                    Provider.quota_type == quota_type,
+                    Provider.quota_limit > Provider.quota_used
+                ).update({'quota_used': Provider.quota_used + used_quota})
+
+            for (tenant_id, provider_name), used_at in last_used.items():
+                db.session.query(Provider).filter(
+                    Provider.tenant_id == tenant_id,
+                    Provider.provider_name == provider_name
+                ).update({'last_used': used_at})
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+            # keep the usage for the next flush
+            with cls._lock:
+                for key, used_quota in used_quotas.items():
+                    cls._used_quotas[key] = cls._used_quotas.get(key, 0) + used_quota
+                for key, used_at in last_used.items():
+                    cls._last_used[key] = max(cls._last_used.get(key, used_at), used_at)
+
+            raise
+
+    @classmethod
+    def _ensure_flusher(cls) -> None:
+        if cls._flusher and cls._flusher.is_alive():
+            return
+
+        flask_app = current_app._get_current_object()
+        with cls._lock:
+            if cls._flusher and cls._flusher.is_alive():
+                return
+
+            if cls._flusher is None:
+                atexit.register(cls._flush_with_app, flask_app)
+
+            cls._flusher = threading.Thread(target=cls._flush_periodically, args=(flask_app,), daemon=True)
+            cls._flusher.start()
+
+    @classmethod
+    def _flush_periodically(cls, flask_app: Flask) -> None:
+        while True:
+            time.sleep(cls.FLUSH_INTERVAL)
+            cls._flush_with_app(flask_app)
+
+    @classmethod
+    def _flush_with_app(cls, flask_app: Flask) -> None:
+        with flask_app.app_context():
+            try:
+                cls.flush()
+            except Exception:
+                logger.exception('Failed to write provider usage')
+            finally:
+                db.session.remove()
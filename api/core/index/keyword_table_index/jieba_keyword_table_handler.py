@@ -1,10 +1,51 @@
+import logging
 import re
-from typing import Set
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Set, Tuple
 
 import jieba
 from core.index.keyword_table_index.stopwords import STOPWORDS
 from jieba.analyse import default_tfidf
 
+SUB_TOKEN_PATTERN = re.compile(r"\w+")
+
+# texts handed to a keyword extraction worker process at once
+PROCESS_POOL_CHUNK_SIZE = 64
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool._max_workers != max_workers:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers)
+
+        return _process_pool
+
+
+def _reset_process_pool(process_pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool, so the next batch starts a new one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is process_pool:
+            _process_pool = None
+
+    process_pool.shutdown(wait=False)
+
+
+def _extract_keywords_with_term_frequencies(texts: List[str], max_keywords_per_chunk: int) \
+        -> List[Tuple[dict[str, int], int]]:
+    keyword_table_handler = JiebaKeywordTableHandler()
+    return [keyword_table_handler.extract_keywords_with_term_frequencies(text, max_keywords_per_chunk)
+            for text in texts]
+
 
 class JiebaKeywordTableHandler:
 
@@ -20,13 +61,82 @@ class JiebaKeywordTableHandler:
 
         return set(self._expand_tokens_with_subtokens(keywords))
 
+    def extract_keywords_with_term_frequencies(self, text: str, max_keywords_per_chunk: int = 10) \
+            -> Tuple[dict[str, int], int]:
+        """
+        Extract keywords with JIEBA tfidf from a single tokenization of the text, along with the
+        term frequency of every keyword and the length of the text in tokens.
+
+        :param text: text
+        :param max_keywords_per_chunk: max keywords before sub token expansion
+        :return: term frequencies by keyword, document length
+        """
+        term_frequencies, document_length = self.count_terms(text)
+
+        # same weighting as jieba.analyse.extract_tags
+        weights = {}
+        for word, frequency in term_frequencies.items():
+            if len(word.strip()) < 2 or word.lower() in default_tfidf.stop_words:
+                continue
+            weights[word] = frequency * default_tfidf.idf_freq.get(word, default_tfidf.median_idf)
+        keywords = sorted(weights, key=weights.__getitem__, reverse=True)[:max_keywords_per_chunk]
+
+        keyword_term_frequencies = {}
+        for keyword in self._expand_tokens_with_subtokens(keywords):
+            keyword_term_frequencies[keyword] = max(term_frequencies.get(keyword, 0), 1)
+
+        return keyword_term_frequencies, document_length
+
+    def batch_extract_keywords_with_term_frequencies(self, texts: List[str], max_keywords_per_chunk: int = 10,
+                                                     max_workers: int = 0) -> List[Tuple[dict[str, int], int]]:
+        """
+        Extract keywords with term frequencies for many texts, in input order.
+
+        jieba is CPU bound and holds the GIL, so with max_workers > 1 large batches are spread over a
+        process pool. Falls back to this process when a pool cannot be started, e.g. in daemonic workers,
+        and a broken pool is replaced on the next batch.
+
+        :param texts: texts
+        :param max_keywords_per_chunk: max keywords per text before sub token expansion
+        :param max_workers: keyword extraction worker processes, 0 or 1 to extract in this process
+        :return: term frequencies by keyword and document length of every text
+        """
+        if max_workers > 1 and len(texts) > PROCESS_POOL_CHUNK_SIZE:
+            process_pool = None
+            try:
+                process_pool = _get_process_pool(max_workers)
+                futures = [
+                    process_pool.submit(_extract_keywords_with_term_frequencies,
+                                        texts[i:i + PROCESS_POOL_CHUNK_SIZE], max_keywords_per_chunk)
+                    for i in range(0, len(texts), PROCESS_POOL_CHUNK_SIZE)
+                ]
+                return [result for future in futures for result in future.result()]
+            except BrokenProcessPool:
+                logging.exception('Keyword extraction process pool broken, fallback to current process')
+                _reset_process_pool(process_pool)
+            except Exception:
+                logging.exception('Failed to extract keywords in process pool, fallback to current process')
+
+        return [self.extract_keywords_with_term_frequencies(text, max_keywords_per_chunk) for text in texts]
+
+    def count_terms(self, text: str) -> Tuple[Counter, int]:
+        """
+        Count the occurrences of every JIEBA token of the text.
+
+        :param text: text
+        :return: term frequencies by token, document length
+        """
+        words = [word for word in default_tfidf.tokenizer.cut(text) if word.strip()]
+
+        return Counter(words), len(words)
+
     def _expand_tokens_with_subtokens(self, tokens: Set[str]) -> Set[str]:
         """Get subtokens from a list of tokens., filtering for stopwords."""
         results = set()
         for token in tokens:
             results.add(token)
-            sub_tokens = re.findall(r"\w+", token)
+            sub_tokens = SUB_TOKEN_PATTERN.findall(token)
             if len(sub_tokens) > 1:
-                results.update({w for w in sub_tokens if w not in list(STOPWORDS)})
+                results.update({w for w in sub_tokens if w not in STOPWORDS})
 
         return results
\ No newline at end of file
@@ -1,17 +1,31 @@
-import json
-from collections import defaultdict
-from typing import Any, Dict, List, Optional
+import math
+from collections import Counter, defaultdict
+from typing import Any, List, Optional
 
 from core.index.base import BaseIndex
 from core.index.keyword_table_index.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from extensions.ext_database import db
 from langchain.schema import BaseRetriever, Document
-from models.dataset import Dataset, DatasetKeywordTable, DocumentSegment
+from models.dataset import (Dataset, DatasetKeywordPosting, DatasetKeywordStatistics, DatasetKeywordTable,
+                            DocumentSegment)
 from pydantic import BaseModel, Extra, Field
+from sqlalchemy import Float, case, cast, func, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import ColumnElement
+
+# max rows written or ids matched by a single postings statement
+POSTINGS_BATCH_SIZE = 1000
+# keywords longer than the postings column are not indexed
+MAX_KEYWORD_LENGTH = 255
+
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
 
 
 class KeywordTableConfig(BaseModel):
     max_keywords_per_chunk: int = 10
+    max_workers: int = 0
 
 
 class KeywordTableIndex(BaseIndex):
@@ -20,91 +34,65 @@ class KeywordTableIndex(BaseIndex):
         self._config = config
 
     def create(self, texts: list[Document], **kwargs) -> BaseIndex:
-        keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = {}
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
-
-        dataset_keyword_table = DatasetKeywordTable(
-            dataset_id=self.dataset.id,
-            keyword_table=json.dumps({
-                '__type__': 'keyword_table',
-                '__data__': {
-                    "index_id": self.dataset.id,
-                    "summary": None,
-                    "table": {}
-                }
-            }, cls=SetEncoder)
-        )
-        db.session.add(dataset_keyword_table)
-        db.session.commit()
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.add_texts(texts)
 
         return self
 
     def create_with_collection_name(self, texts: list[Document], collection_name: str, **kwargs) -> BaseIndex:
-        keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = {}
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
-
-        dataset_keyword_table = DatasetKeywordTable(
-            dataset_id=self.dataset.id,
-            keyword_table=json.dumps({
-                '__type__': 'keyword_table',
-                '__data__': {
-                    "index_id": self.dataset.id,
-                    "summary": None,
-                    "table": {}
-                }
-            }, cls=SetEncoder)
-        )
-        db.session.add(dataset_keyword_table)
-        db.session.commit()
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.add_texts(texts)
 
         return self
 
     def add_texts(self, texts: list[Document], **kwargs):
         keyword_table_handler = JiebaKeywordTableHandler()
 
-        keyword_table = self._get_dataset_keyword_table()
-        for text in texts:
-            keywords = keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
-            self._update_segment_keywords(self.dataset.id, text.metadata['doc_id'], list(keywords))
-            keyword_table = self._add_text_to_keyword_table(keyword_table, text.metadata['doc_id'], list(keywords))
+        keyword_terms = keyword_table_handler.batch_extract_keywords_with_term_frequencies(
+            [text.page_content for text in texts],
+            self._config.max_keywords_per_chunk,
+            self._config.max_workers
+        )
+        keyword_table = {text.metadata['doc_id']: terms for text, terms in zip(texts, keyword_terms)}
 
-        self._save_dataset_keyword_table(keyword_table)
+        self._batch_update_segment_keywords(self.dataset.id, {
+            node_id: list(term_frequencies.keys()) for node_id, (term_frequencies, _) in keyword_table.items()
+        })
+        self._add_postings(keyword_table)
 
     def text_exists(self, id: str) -> bool:
-        keyword_table = self._get_dataset_keyword_table()
-        return id in set.union(*keyword_table.values())
+        return db.session.query(DatasetKeywordPosting.id).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id,
+            DatasetKeywordPosting.index_node_id == id
+        ).first() is not None
 
     def delete_by_ids(self, ids: list[str]) -> None:
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
-
-        self._save_dataset_keyword_table(keyword_table)
+        for i in range(0, len(ids), POSTINGS_BATCH_SIZE):
+            batch_ids = ids[i:i + POSTINGS_BATCH_SIZE]
+            nodes = db.session.query(
+                DatasetKeywordPosting.index_node_id,
+                func.max(DatasetKeywordPosting.document_length).label('document_length')
+            ).filter(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.index_node_id.in_(batch_ids)
+            ).group_by(DatasetKeywordPosting.index_node_id).all()
+
+            db.session.query(DatasetKeywordPosting).filter(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.index_node_id.in_(batch_ids)
+            ).delete(synchronize_session=False)
+
+            self._update_statistics(-len(nodes), -sum(node.document_length for node in nodes))
+        db.session.commit()
 
     def delete_by_document_id(self, document_id: str):
         # get segment ids by document_id
-        segments = db.session.query(DocumentSegment).filter(
+        segments = db.session.query(DocumentSegment.index_node_id).filter(
             DocumentSegment.dataset_id == self.dataset.id,
             DocumentSegment.document_id == document_id
         ).all()
 
         ids = [segment.index_node_id for segment in segments]
 
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._delete_ids_from_keyword_table(keyword_table, ids)
-
-        self._save_dataset_keyword_table(keyword_table)
+        self.delete_by_ids(ids)
 
     def delete_by_metadata_field(self, key: str, value: str):
         pass
@@ -116,19 +104,23 @@ class KeywordTableIndex(BaseIndex):
             self, query: str,
             **kwargs: Any
     ) -> List[Document]:
-        keyword_table = self._get_dataset_keyword_table()
-
         search_kwargs = kwargs.get('search_kwargs') if kwargs.get('search_kwargs') else {}
         k = search_kwargs.get('k') if search_kwargs.get('k') else 4
 
-        sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table, query, k)
+        sorted_chunk_indices = self._retrieve_ids_by_query(query, k)
+        if not sorted_chunk_indices:
+            return []
+
+        segments = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id.in_(sorted_chunk_indices),
+            DocumentSegment.enabled == True
+        ).all()
+        segments = {segment.index_node_id: segment for segment in segments}
 
         documents = []
         for chunk_index in sorted_chunk_indices:
-            segment = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset.id,
-                DocumentSegment.index_node_id == chunk_index
-            ).first()
+            segment = segments.get(chunk_index)
 
             if segment:
                 documents.append(Document(
@@ -144,95 +136,283 @@ class KeywordTableIndex(BaseIndex):
         return documents
 
     def delete(self) -> None:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            db.session.delete(dataset_keyword_table)
-            db.session.commit()
+        db.session.query(DatasetKeywordPosting).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+        db.session.query(DatasetKeywordStatistics).filter(
+            DatasetKeywordStatistics.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+        db.session.query(DatasetKeywordTable).filter(
+            DatasetKeywordTable.dataset_id == self.dataset.id
+        ).delete(synchronize_session=False)
+        db.session.commit()
 
     def delete_by_group_id(self, group_id: str) -> None:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            db.session.delete(dataset_keyword_table)
-            db.session.commit()
+        self.delete()
+
+    def _add_postings(self, keyword_table: dict[str, tuple[dict[str, int], int]]) -> None:
+        """
+        Add the keyword postings of segments, postings that already exist are kept.
 
-    def _save_dataset_keyword_table(self, keyword_table):
-        keyword_table_dict = {
-            '__type__': 'keyword_table',
-            '__data__': {
-                "index_id": self.dataset.id,
-                "summary": None,
-                "table": keyword_table
+        :param keyword_table: term frequencies by keyword and document length, by segment index node id
+        """
+        node_ids = list(keyword_table.keys())
+        existing_node_ids = set()
+        for i in range(0, len(node_ids), POSTINGS_BATCH_SIZE):
+            rows = db.session.query(DatasetKeywordPosting.index_node_id).filter(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.index_node_id.in_(node_ids[i:i + POSTINGS_BATCH_SIZE])
+            ).distinct().all()
+            existing_node_ids.update(row.index_node_id for row in rows)
+
+        postings = [
+            {
+                'dataset_id': self.dataset.id,
+                'keyword': keyword,
+                'index_node_id': node_id,
+                'term_frequency': term_frequency,
+                'document_length': document_length
             }
-        }
-        self.dataset.dataset_keyword_table.keyword_table = json.dumps(keyword_table_dict, cls=SetEncoder)
+            for node_id, (term_frequencies, document_length) in keyword_table.items()
+            for keyword, term_frequency in term_frequencies.items() if len(keyword) <= MAX_KEYWORD_LENGTH
+        ]
+        self._insert_postings(postings)
+
+        new_nodes = [keyword_table[node_id] for node_id in node_ids if node_id not in existing_node_ids]
+        self._update_statistics(len(new_nodes), sum(document_length for _, document_length in new_nodes))
         db.session.commit()
 
-    def _get_dataset_keyword_table(self) -> Optional[dict]:
-        dataset_keyword_table = self.dataset.dataset_keyword_table
-        if dataset_keyword_table:
-            if dataset_keyword_table.keyword_table_dict:
-                return dataset_keyword_table.keyword_table_dict['__data__']['table']
-        else:
-            dataset_keyword_table = DatasetKeywordTable(
-                dataset_id=self.dataset.id,
-                keyword_table=json.dumps({
-                    '__type__': 'keyword_table',
-                    '__data__': {
-                        "index_id": self.dataset.id,
-                        "summary": None,
-                        "table": {}
-                    }
-                }, cls=SetEncoder)
+    def _insert_postings(self, postings: list[dict]) -> None:
+        for i in range(0, len(postings), POSTINGS_BATCH_SIZE):
+            db.session.execute(
+                insert(DatasetKeywordPosting).values(postings[i:i + POSTINGS_BATCH_SIZE])
+                .on_conflict_do_nothing(index_elements=['dataset_id', 'keyword', 'index_node_id'])
             )
-            db.session.add(dataset_keyword_table)
-            db.session.commit()
 
-        return {}
+    def _update_statistics(self, document_count: int, document_length: int) -> None:
+        """
+        Apply a delta to the dataset document count and total document length used by BM25.
+
+        :param document_count: documents added, negative when removed
+        :param document_length: tokens added, negative when removed
+        """
+        if not document_count and not document_length:
+            return
 
-    def _add_text_to_keyword_table(self, keyword_table: dict, id: str, keywords: list[str]) -> dict:
-        for keyword in keywords:
-            if keyword not in keyword_table:
-                keyword_table[keyword] = set()
-            keyword_table[keyword].add(id)
-        return keyword_table
-
-    def _delete_ids_from_keyword_table(self, keyword_table: dict, ids: list[str]) -> dict:
-        # get set of ids that correspond to node
-        node_idxs_to_delete = set(ids)
-
-        # delete node_idxs from keyword to node idxs mapping
-        keywords_to_delete = set()
-        for keyword, node_idxs in keyword_table.items():
-            if node_idxs_to_delete.intersection(node_idxs):
-                keyword_table[keyword] = node_idxs.difference(
-                    node_idxs_to_delete
+        statement = insert(DatasetKeywordStatistics).values(
+            dataset_id=self.dataset.id,
+            document_count=max(document_count, 0),
+            total_document_length=max(document_length, 0)
+        )
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['dataset_id'],
+            set_={
+                'document_count': func.greatest(DatasetKeywordStatistics.document_count + document_count, 0),
+                'total_document_length': func.greatest(
+                    DatasetKeywordStatistics.total_document_length + document_length, 0
+                )
+            }
+        ))
+
+    def _recalculate_statistics(self) -> None:
+        """
+        Set the dataset document count and total document length used by BM25 from the postings.
+        """
+        # concurrent deltas wait for the statistics row, so they apply on top of the recalculated values
+        db.session.query(DatasetKeywordStatistics.id).filter(
+            DatasetKeywordStatistics.dataset_id == self.dataset.id
+        ).with_for_update().first()
+
+        nodes = db.session.query(
+            DatasetKeywordPosting.index_node_id,
+            func.max(DatasetKeywordPosting.document_length).label('document_length')
+        ).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id
+        ).group_by(DatasetKeywordPosting.index_node_id).subquery()
+        document_count, total_document_length = db.session.query(
+            func.count(nodes.c.index_node_id),
+            func.coalesce(func.sum(nodes.c.document_length), 0)
+        ).one()
+
+        statement = insert(DatasetKeywordStatistics).values(
+            dataset_id=self.dataset.id,
+            document_count=document_count,
+            total_document_length=total_document_length
+        )
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['dataset_id'],
+            set_={
+                'document_count': statement.excluded.document_count,
+                'total_document_length': statement.excluded.total_document_length
+            }
+        ))
+
+    def migrate_legacy_keyword_table(self) -> int:
+        """
+        Move the keyword table of a dataset indexed before postings existed into postings.
+        Run by `flask migrate-keyword-postings`, the legacy table is locked so concurrent runs migrate it once.
+
+        :return: number of migrated segments
+        """
+        dataset_keyword_table = db.session.query(DatasetKeywordTable).filter(
+            DatasetKeywordTable.dataset_id == self.dataset.id
+        ).with_for_update().first()
+        if not dataset_keyword_table:
+            db.session.commit()
+            return 0
+
+        keyword_table_dict = dataset_keyword_table.keyword_table_dict
+        keyword_table = keyword_table_dict['__data__']['table'] if keyword_table_dict else {}
+
+        node_keywords = defaultdict(list)
+        for keyword, node_ids in keyword_table.items():
+            if len(keyword) <= MAX_KEYWORD_LENGTH:
+                for node_id in node_ids:
+                    node_keywords[node_id].append(keyword)
+
+        # legacy tables have no term frequencies or document lengths, count them in the segment content,
+        # segments deleted or disabled since are not migrated
+        migrated_count = 0
+        node_ids = list(node_keywords.keys())
+        for i in range(0, len(node_ids), POSTINGS_BATCH_SIZE):
+            segments = db.session.query(DocumentSegment.index_node_id, DocumentSegment.content).filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + POSTINGS_BATCH_SIZE]),
+                DocumentSegment.enabled == True,
+                DocumentSegment.status == 'completed'
+            ).all()
+
+            postings = []
+            for segment in segments:
+                term_frequencies, document_length = self._get_custom_keyword_terms(
+                    segment.content, node_keywords[segment.index_node_id]
                 )
-                if not keyword_table[keyword]:
-                    keywords_to_delete.add(keyword)
+                postings.extend({
+                    'dataset_id': self.dataset.id,
+                    'keyword': keyword,
+                    'index_node_id': segment.index_node_id,
+                    'term_frequency': term_frequency,
+                    'document_length': document_length
+                } for keyword, term_frequency in term_frequencies.items())
+            self._insert_postings(postings)
+            migrated_count += len(segments)
+
+        self._recalculate_statistics()
+        db.session.delete(dataset_keyword_table)
+        db.session.commit()
+
+        return migrated_count
 
-        for keyword in keywords_to_delete:
-            del keyword_table[keyword]
+    def _retrieve_ids_by_legacy_keyword_table(self, keywords: list[str], k: int) -> list[str]:
+        """
+        Match the keyword table of a dataset indexed before postings existed, until it is migrated.
+
+        :param keywords: query keywords
+        :param k: max ids
+        :return: segment index node ids in order of most matching keywords
+        """
+        # migrated datasets have no legacy table, check before loading the table itself
+        if not db.session.query(DatasetKeywordTable.id).filter(
+                DatasetKeywordTable.dataset_id == self.dataset.id
+        ).first():
+            return []
+
+        dataset_keyword_table = db.session.query(DatasetKeywordTable).filter(
+            DatasetKeywordTable.dataset_id == self.dataset.id
+        ).first()
+        keyword_table_dict = dataset_keyword_table.keyword_table_dict if dataset_keyword_table else None
+        if not keyword_table_dict:
+            return []
+
+        keyword_table = keyword_table_dict['__data__']['table']
+        chunk_indices_count = Counter()
+        for keyword in keywords:
+            chunk_indices_count.update(keyword_table.get(keyword, ()))
 
-        return keyword_table
+        return [node_id for node_id, _ in chunk_indices_count.most_common(k)]
 
-    def _retrieve_ids_by_query(self, keyword_table: dict, query: str, k: int = 4):
+    def _retrieve_ids_by_query(self, query: str, k: int = 4):
         keyword_table_handler = JiebaKeywordTableHandler()
-        keywords = keyword_table_handler.extract_keywords(query)
+        keywords = list(keyword_table_handler.extract_keywords(query))
+        if not keywords:
+            return []
+
+        # document frequencies are counted on the postings index, the postings themselves are scored
+        # and ranked in the database so only the top k segments are read
+        document_frequencies = dict(db.session.query(
+            DatasetKeywordPosting.keyword,
+            func.count(DatasetKeywordPosting.index_node_id)
+        ).filter(
+            DatasetKeywordPosting.dataset_id == self.dataset.id,
+            DatasetKeywordPosting.keyword.in_(keywords)
+        ).group_by(DatasetKeywordPosting.keyword).all())
+
+        sorted_chunk_indices = []
+        if document_frequencies:
+            statistics = db.session.query(DatasetKeywordStatistics).filter(
+                DatasetKeywordStatistics.dataset_id == self.dataset.id
+            ).first()
 
-        # go through text chunks in order of most matching keywords
-        chunk_indices_count: Dict[str, int] = defaultdict(int)
-        keywords = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
-        for keyword in keywords:
-            for node_id in keyword_table[keyword]:
-                chunk_indices_count[node_id] += 1
+            score = self._bm25_score_expression(document_frequencies, statistics).label('score')
+            sorted_chunk_indices = [node_id for node_id, _ in db.session.query(
+                DatasetKeywordPosting.index_node_id,
+                score
+            ).filter(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.keyword.in_(document_frequencies.keys())
+            ).group_by(DatasetKeywordPosting.index_node_id).order_by(score.desc()).limit(k).all()]
+
+        if len(sorted_chunk_indices) < k:
+            # segments of datasets not migrated by `flask migrate-keyword-postings` yet
+            sorted_chunk_indices.extend([
+                node_id for node_id in self._retrieve_ids_by_legacy_keyword_table(keywords, k)
+                if node_id not in sorted_chunk_indices
+            ])
+
+        return sorted_chunk_indices[:k]
+
+    @staticmethod
+    def _calculate_idfs(document_frequencies: dict[str, int], document_count: int) -> dict[str, float]:
+        """
+        Calculate the BM25 inverse document frequency of every keyword.
 
-        sorted_chunk_indices = sorted(
-            list(chunk_indices_count.keys()),
-            key=lambda x: chunk_indices_count[x],
-            reverse=True,
-        )
+        :param document_frequencies: segments containing each keyword
+        :param document_count: segments of the dataset
+        :return: idf by keyword
+        """
+        document_count = max([document_count, *document_frequencies.values()])
+
+        return {
+            keyword: math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            for keyword, document_frequency in document_frequencies.items()
+        }
+
+    def _bm25_score_expression(self, document_frequencies: dict[str, int],
+                               statistics: Optional[DatasetKeywordStatistics]) -> ColumnElement:
+        """
+        Build the SQL sum of the BM25 scores of the postings of a segment.
+
+        :param document_frequencies: segments containing each query keyword
+        :param statistics: dataset keyword statistics
+        :return: score expression, to be used grouped by segment index node id
+        """
+        idfs = self._calculate_idfs(document_frequencies, statistics.document_count if statistics else 0)
+        average_document_length = statistics.total_document_length / statistics.document_count \
+            if statistics and statistics.document_count else 0
+
+        term_frequency = cast(DatasetKeywordPosting.term_frequency, Float)
+        # postings of segments without content have no document length
+        length_norm = literal(1.0)
+        if average_document_length > 0:
+            length_norm = case(
+                (DatasetKeywordPosting.document_length > 0,
+                 1 - BM25_B + BM25_B * cast(DatasetKeywordPosting.document_length, Float) / average_document_length),
+                else_=1.0
+            )
 
-        return sorted_chunk_indices[: k]
+        idf = case(idfs, value=DatasetKeywordPosting.keyword, else_=0.0)
+
+        return func.sum(idf * term_frequency * (BM25_K1 + 1) / (term_frequency + BM25_K1 * length_norm))
 
     def _update_segment_keywords(self, dataset_id: str, node_id: str, keywords: List[str]):
         document_segment = db.session.query(DocumentSegment).filter(
@@ -243,32 +423,73 @@ class KeywordTableIndex(BaseIndex):
             document_segment.keywords = keywords
             db.session.commit()
 
+        return document_segment
+
+    def _batch_update_segment_keywords(self, dataset_id: str, keywords: dict[str, List[str]]) -> None:
+        """
+        Write the keywords of many segments with one bulk update per batch, committed by the caller.
+
+        :param dataset_id: dataset id
+        :param keywords: keywords by segment index node id
+        """
+        node_ids = list(keywords.keys())
+        for i in range(0, len(node_ids), POSTINGS_BATCH_SIZE):
+            segments = db.session.query(DocumentSegment.id, DocumentSegment.index_node_id).filter(
+                DocumentSegment.dataset_id == dataset_id,
+                DocumentSegment.index_node_id.in_(node_ids[i:i + POSTINGS_BATCH_SIZE])
+            ).all()
+
+            db.session.bulk_update_mappings(DocumentSegment, [
+                {'id': segment.id, 'keywords': keywords[segment.index_node_id]} for segment in segments
+            ])
+
+    def _get_custom_keyword_terms(self, content: Optional[str], keywords: List[str]) -> tuple[dict[str, int], int]:
+        """
+        Get term frequencies of user specified keywords in the segment content.
+
+        :param content: segment content
+        :param keywords: keywords
+        :return: term frequencies by keyword, document length
+        """
+        if not content:
+            return {keyword: 1 for keyword in keywords}, 0
+
+        term_frequencies, document_length = JiebaKeywordTableHandler().count_terms(content)
+        return {keyword: max(term_frequencies.get(keyword, 0), 1) for keyword in keywords}, document_length
+
     def create_segment_keywords(self, node_id: str, keywords: List[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        self._update_segment_keywords(self.dataset.id, node_id, keywords)
-        keyword_table = self._add_text_to_keyword_table(keyword_table, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        segment = self._update_segment_keywords(self.dataset.id, node_id, keywords)
+        self._add_postings({node_id: self._get_custom_keyword_terms(segment.content if segment else None, keywords)})
 
     def multi_create_segment_keywords(self, pre_segment_data_list: list):
         keyword_table_handler = JiebaKeywordTableHandler()
-        keyword_table = self._get_dataset_keyword_table()
+        keyword_table = {}
+        segments_without_keywords = []
         for pre_segment_data in pre_segment_data_list:
             segment = pre_segment_data['segment']
             if pre_segment_data['keywords']:
                 segment.keywords = pre_segment_data['keywords']
-                keyword_table = self._add_text_to_keyword_table(keyword_table, segment.index_node_id,
-                                                                pre_segment_data['keywords'])
+                keyword_table[segment.index_node_id] = self._get_custom_keyword_terms(segment.content,
+                                                                                      pre_segment_data['keywords'])
             else:
-                keywords = keyword_table_handler.extract_keywords(segment.content,
-                                                                  self._config.max_keywords_per_chunk)
-                segment.keywords = list(keywords)
-                keyword_table = self._add_text_to_keyword_table(keyword_table, segment.index_node_id, list(keywords))
-        self._save_dataset_keyword_table(keyword_table)
+                segments_without_keywords.append(segment)
+
+        keyword_terms = keyword_table_handler.batch_extract_keywords_with_term_frequencies(
+            [segment.content for segment in segments_without_keywords],
+            self._config.max_keywords_per_chunk,
+            self._config.max_workers
+        )
+        for segment, (term_frequencies, document_length) in zip(segments_without_keywords, keyword_terms):
+            segment.keywords = list(term_frequencies.keys())
+            keyword_table[segment.index_node_id] = (term_frequencies, document_length)
+        self._add_postings(keyword_table)
 
     def update_segment_keywords_index(self, node_id: str, keywords: List[str]):
-        keyword_table = self._get_dataset_keyword_table()
-        keyword_table = self._add_text_to_keyword_table(keyword_table, node_id, keywords)
-        self._save_dataset_keyword_table(keyword_table)
+        segment = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id,
+            DocumentSegment.index_node_id == node_id
+        ).first()
+        self._add_postings({node_id: self._get_custom_keyword_terms(segment.content if segment else None, keywords)})
 
 
 class KeywordTableRetriever(BaseRetriever, BaseModel):
@@ -294,10 +515,3 @@ class KeywordTableRetriever(BaseRetriever, BaseModel):
 
     async def aget_relevant_documents(self, query: str) -> List[Document]:
         raise NotImplementedError("KeywordTableRetriever does not support async")
-
-
-class SetEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, set):
-            return list(obj)
-        return super().default(obj)
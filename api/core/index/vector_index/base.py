@@ -1,7 +1,7 @@
 import json
 import logging
 from abc import abstractmethod
-from typing import Any, List, cast
+from typing import Any, Generator, List, cast
 
 from core.index.base import BaseIndex
 from extensions.ext_database import db
@@ -14,6 +14,8 @@ from models.dataset import DocumentSegment
 
 
 class BaseVectorIndex(BaseIndex):
+    # max node ids removed by a single delete request
+    DELETE_BATCH_SIZE = 1000
 
     def __init__(self, dataset: Dataset, embeddings: Embeddings):
         super().__init__(dataset)
@@ -113,8 +115,12 @@ class BaseVectorIndex(BaseIndex):
         vector_store = self._get_vector_store()
         vector_store = cast(self._get_vector_store_class(), vector_store)
 
-        for node_id in ids:
-            vector_store.del_text(node_id)
+        for batch_ids in self._batch_ids(ids):
+            vector_store.del_texts_by_ids(batch_ids)
+
+    def _batch_ids(self, ids: list[str]) -> Generator[list[str], None, None]:
+        for i in range(0, len(ids), self.DELETE_BATCH_SIZE):
+            yield ids[i:i + self.DELETE_BATCH_SIZE]
 
     def delete_by_group_id(self, group_id: str) -> None:
         vector_store = self._get_vector_store()
@@ -0,0 +1,131 @@
+import os
+from typing import Any, List, Optional, cast
+
+from core.index.base import BaseIndex
+from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.client_registry import vector_client_registry
+from core.vector_store.local_vector_store import LocalVectorStore
+from core.vector_store.vector.local import LocalVectorCollection
+from extensions.ext_database import db
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+from langchain.vectorstores import VectorStore
+from models.dataset import Dataset, DatasetCollectionBinding
+from pydantic import BaseModel, root_validator
+
+
+class LocalConfig(BaseModel):
+    path: str
+    root_path: Optional[str]
+
+    @root_validator()
+    def validate_config(cls, values: dict) -> dict:
+        if not values['path']:
+            raise ValueError("config LOCAL_VECTOR_STORE_PATH is required")
+        return values
+
+    def get_collection_path(self, collection_name: str) -> str:
+        path = self.path
+        if not os.path.isabs(path):
+            path = os.path.join(self.root_path, path)
+
+        return os.path.join(path, collection_name)
+
+
+class LocalVectorIndex(BaseVectorIndex):
+    def __init__(self, dataset: Dataset, config: LocalConfig, embeddings: Embeddings):
+        super().__init__(dataset, embeddings)
+        self._client_config = config
+
+    def get_type(self) -> str:
+        return 'local'
+
+    def get_index_name(self, dataset: Dataset) -> str:
+        if dataset.collection_binding_id:
+            dataset_collection_binding = db.session.query(DatasetCollectionBinding). \
+                filter(DatasetCollectionBinding.id == dataset.collection_binding_id). \
+                one_or_none()
+            if dataset_collection_binding:
+                return dataset_collection_binding.collection_name
+            else:
+                raise ValueError('Dataset Collection Bindings is not exist!')
+        else:
+            if self.dataset.index_struct_dict:
+                class_prefix: str = self.dataset.index_struct_dict['vector_store']['class_prefix']
+                return class_prefix
+
+            dataset_id = dataset.id
+            return "Vector_index_" + dataset_id.replace("-", "_") + '_Node'
+
+    def to_index_struct(self) -> dict:
+        return {
+            "type": self.get_type(),
+            "vector_store": {"class_prefix": self.get_index_name(self.dataset)}
+        }
+
+    def _get_collection(self, collection_name: str) -> LocalVectorCollection:
+        # the collection stays loaded in memory and is shared by the whole process
+        path = self._client_config.get_collection_path(collection_name)
+
+        return vector_client_registry.get_client(
+            key=vector_client_registry.build_key(self.get_type(), path),
+            factory=lambda: LocalVectorCollection(path),
+            owner=self
+        )
+
+    def create(self, texts: list[Document], **kwargs) -> BaseIndex:
+        return self.create_with_collection_name(texts, self.get_index_name(self.dataset), **kwargs)
+
+    def create_with_collection_name(self, texts: list[Document], collection_name: str, **kwargs) -> BaseIndex:
+        uuids = self._get_uuids(texts)
+        self._vector_store = LocalVectorStore.from_documents(
+            texts,
+            self._embeddings,
+            collection=self._get_collection(collection_name),
+            group_id=self.dataset.id,
+            uuids=uuids
+        )
+
+        return self
+
+    def _get_vector_store(self) -> VectorStore:
+        """Only for created index."""
+        if self._vector_store:
+            return self._vector_store
+
+        return LocalVectorStore(
+            collection=self._get_collection(self.get_index_name(self.dataset)),
+            embeddings=self._embeddings,
+            group_id=self.dataset.id
+        )
+
+    def _get_vector_store_class(self) -> type:
+        return LocalVectorStore
+
+    def delete_by_document_id(self, document_id: str):
+        vector_store = self._get_vector_store()
+        vector_store = cast(self._get_vector_store_class(), vector_store)
+
+        vector_store.del_texts_by_metadata_field('document_id', document_id)
+
+    def delete_by_metadata_field(self, key: str, value: str):
+        vector_store = self._get_vector_store()
+        vector_store = cast(self._get_vector_store_class(), vector_store)
+
+        vector_store.del_texts_by_metadata_field(key, value)
+
+    def delete_by_group_id(self, group_id: str) -> None:
+        vector_store = self._get_vector_store()
+        vector_store = cast(self._get_vector_store_class(), vector_store)
+
+        vector_store.delete_by_group_id(group_id)
+
+    def delete(self) -> None:
+        vector_store = self._get_vector_store()
+        vector_store = cast(self._get_vector_store_class(), vector_store)
+
+        vector_store.delete_by_group_id(self.dataset.id)
+
+    def search_by_full_text_index(self, query: str, **kwargs: Any) -> List[Document]:
+        # local vector index doesn't support full text search
+        return []
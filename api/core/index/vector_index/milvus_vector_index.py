@@ -133,10 +133,12 @@ class MilvusVectorIndex(BaseVectorIndex):
 
         vector_store = self._get_vector_store()
         vector_store = cast(self._get_vector_store_class(), vector_store)
-        ids = vector_store.get_ids_by_doc_ids(doc_ids)
-        vector_store.del_texts({
-            'filter': f' id in {ids}'
-        })
+        for batch_doc_ids in self._batch_ids(doc_ids):
+            ids = vector_store.get_ids_by_doc_ids(batch_doc_ids)
+            if ids:
+                vector_store.del_texts({
+                    'filter': f'id in {ids}'
+                })
 
     def delete_by_group_id(self, group_id: str) -> None:
 
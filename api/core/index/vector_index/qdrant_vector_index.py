@@ -4,6 +4,7 @@ from typing import Any, List, Optional, cast
 import qdrant_client
 from core.index.base import BaseIndex
 from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.client_registry import vector_client_registry
 from core.vector_store.qdrant_vector_store import QdrantVectorStore
 from extensions.ext_database import db
 from langchain.embeddings.base import Embeddings
@@ -11,6 +12,7 @@ from langchain.schema import BaseRetriever, Document
 from langchain.vectorstores import VectorStore
 from models.dataset import Dataset, DatasetCollectionBinding
 from pydantic import BaseModel
+from qdrant_client.http.exceptions import UnexpectedResponse
 from qdrant_client.http.models import HnswConfigDiff
 
 
@@ -36,6 +38,9 @@ class QdrantConfig(BaseModel):
                 'timeout': self.timeout
             }
 
+    def is_local(self) -> bool:
+        return bool(self.endpoint and self.endpoint.startswith('path:'))
+
 
 class QdrantVectorIndex(BaseVectorIndex):
     def __init__(self, dataset: Dataset, config: QdrantConfig, embeddings: Embeddings):
@@ -45,6 +50,37 @@ class QdrantVectorIndex(BaseVectorIndex):
     def get_type(self) -> str:
         return 'qdrant'
 
+    def _get_client(self) -> qdrant_client.QdrantClient:
+        params = self._client_config.to_qdrant_params()
+        key = vector_client_registry.build_key(self.get_type(), sorted(params.items()))
+
+        # local storage can only be opened once per process and needs no health check
+        health_check = None if self._client_config.is_local() else self._check_client_health
+
+        return vector_client_registry.get_client(
+            key=key,
+            factory=lambda: qdrant_client.QdrantClient(**params),
+            health_check=health_check,
+            close=self._close_client,
+            owner=self
+        )
+
+    @staticmethod
+    def _check_client_health(client: qdrant_client.QdrantClient) -> bool:
+        # liveness endpoint instead of listing every collection, servers before 1.5 have no such
+        # endpoint but any response means the connection is usable
+        try:
+            client.http.service_api.livez()
+        except UnexpectedResponse:
+            pass
+
+        return True
+
+    @staticmethod
+    def _close_client(client: qdrant_client.QdrantClient) -> None:
+        if hasattr(client, 'close'):
+            client.close()
+
     def get_index_name(self, dataset: Dataset) -> str:
         if dataset.collection_binding_id:
             dataset_collection_binding = db.session.query(DatasetCollectionBinding). \
@@ -80,6 +116,7 @@ class QdrantVectorIndex(BaseVectorIndex):
             group_payload_key='group_id',
             hnsw_config=HnswConfigDiff(m=0, payload_m=16, ef_construct=100, full_scan_threshold=10000,
                                        max_indexing_threads=0, on_disk=False),
+            client=self._get_client(),
             **self._client_config.to_qdrant_params()
         )
 
@@ -97,6 +134,7 @@ class QdrantVectorIndex(BaseVectorIndex):
             group_payload_key='group_id',
             hnsw_config=HnswConfigDiff(m=0, payload_m=16, ef_construct=100, full_scan_threshold=10000,
                                        max_indexing_threads=0, on_disk=False),
+            client=self._get_client(),
             **self._client_config.to_qdrant_params()
         )
 
@@ -106,13 +144,8 @@ class QdrantVectorIndex(BaseVectorIndex):
         """Only for created index."""
         if self._vector_store:
             return self._vector_store
-        attributes = ['doc_id', 'dataset_id', 'document_id']
-        client = qdrant_client.QdrantClient(
-            **self._client_config.to_qdrant_params()
-        )
-
         return QdrantVectorStore(
-            client=client,
+            client=self._get_client(),
             collection_name=self.get_index_name(self.dataset),
             embeddings=self._embeddings,
             content_payload_key='page_content',
@@ -161,12 +194,12 @@ class QdrantVectorIndex(BaseVectorIndex):
         vector_store = cast(self._get_vector_store_class(), vector_store)
 
         from qdrant_client.http import models
-        for node_id in ids:
+        for batch_ids in self._batch_ids(ids):
             vector_store.del_texts(models.Filter(
                 must=[
                     models.FieldCondition(
                         key="metadata.doc_id",
-                        match=models.MatchValue(value=node_id),
+                        match=models.MatchAny(any=batch_ids),
                     ),
                 ],
             ))
@@ -214,15 +247,11 @@ class QdrantVectorIndex(BaseVectorIndex):
         vector_store = cast(self._get_vector_store_class(), vector_store)
 
         from qdrant_client.http import models
-        return vector_store.similarity_search_by_bm25(models.Filter(
+        return vector_store.similarity_search_by_bm25(query, models.Filter(
             must=[
                 models.FieldCondition(
                     key="group_id",
                     match=models.MatchValue(value=self.dataset.id),
-                ),
-                models.FieldCondition(
-                    key="page_content",
-                    match=models.MatchText(text=query),
                 )
             ],
         ), kwargs.get('top_k', 2))
@@ -67,6 +67,17 @@ class VectorIndex:
                 ),
                 embeddings=embeddings
             )
+        elif vector_type == "local":
+            from core.index.vector_index.local_vector_index import LocalConfig, LocalVectorIndex
+
+            return LocalVectorIndex(
+                dataset=dataset,
+                config=LocalConfig(
+                    path=config.get('LOCAL_VECTOR_STORE_PATH'),
+                    root_path=current_app.root_path
+                ),
+                embeddings=embeddings
+            )
         else:
             raise ValueError(f"Vector store {config.get('VECTOR_STORE')} is not supported.")
 
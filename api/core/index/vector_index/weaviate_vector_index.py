@@ -4,6 +4,7 @@ import requests
 import weaviate
 from core.index.base import BaseIndex
 from core.index.vector_index.base import BaseVectorIndex
+from core.vector_store.client_registry import vector_client_registry
 from core.vector_store.weaviate_vector_store import WeaviateVectorStore
 from langchain.embeddings.base import Embeddings
 from langchain.schema import BaseRetriever, Document
@@ -32,6 +33,17 @@ class WeaviateVectorIndex(BaseVectorIndex):
         self._attributes = attributes
 
     def _init_client(self, config: WeaviateConfig) -> weaviate.Client:
+        key = vector_client_registry.build_key(self.get_type(), config.endpoint, config.api_key, config.batch_size)
+
+        return vector_client_registry.get_client(
+            key=key,
+            factory=lambda: self._create_client(config),
+            health_check=lambda client: client.is_ready(),
+            owner=self
+        )
+
+    @staticmethod
+    def _create_client(config: WeaviateConfig) -> weaviate.Client:
         auth_config = weaviate.auth.AuthApiKey(api_key=config.api_key)
 
         weaviate.connect.connection.has_grpc = False
@@ -5,13 +5,14 @@ import re
 import threading
 import time
 import uuid
-from typing import AbstractSet, Any, Collection, List, Literal, Optional, Type, Union, cast
+from typing import AbstractSet, Any, Collection, Iterable, Iterator, List, Literal, Optional, Type, Union, cast
 
 from core.data_loader.file_extractor import FileExtractor
 from core.data_loader.loader.notion import NotionLoader
 from core.docstore.dataset_docstore import DatasetDocumentStore
 from core.errors.error import ProviderTokenNotInitError
 from core.generator.llm_generator import LLMGenerator
+from core.index.base import BaseIndex
 from core.index.index import IndexBuilder
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.model_entities import ModelType, PriceType
@@ -34,6 +35,8 @@ from models.model import UploadFile
 from models.source import DataSourceBinding
 from sqlalchemy.orm.exc import ObjectDeletedError
 
+INDEXING_BATCH_SIZE = 500
+
 
 class IndexingRunner:
 
@@ -58,9 +61,6 @@ class IndexingRunner:
                     filter(DatasetProcessRule.id == dataset_document.dataset_process_rule_id). \
                     first()
 
-                # load file
-                text_docs = self._load_data(dataset_document, processing_rule.mode == 'automatic')
-
                 # get embedding model instance
                 embedding_model_instance = None
                 if dataset.indexing_technique == 'high_quality':
@@ -80,19 +80,31 @@ class IndexingRunner:
                 # get splitter
                 splitter = self._get_splitter(processing_rule, embedding_model_instance)
 
-                # split to documents
-                documents = self._step_split(
-                    text_docs=text_docs,
-                    splitter=splitter,
-                    dataset=dataset,
-                    dataset_document=dataset_document,
-                    processing_rule=processing_rule
-                )
-                self._build_index(
-                    dataset=dataset,
-                    dataset_document=dataset_document,
-                    documents=documents
-                )
+                if dataset_document.doc_form == 'qa_model':
+                    # qa documents are generated by the llm from all split documents
+                    text_docs = self._load_data(dataset_document, processing_rule.mode == 'automatic')
+
+                    # split to documents
+                    documents = self._step_split(
+                        text_docs=text_docs,
+                        splitter=splitter,
+                        dataset=dataset,
+                        dataset_document=dataset_document,
+                        processing_rule=processing_rule
+                    )
+                    self._build_index(
+                        dataset=dataset,
+                        dataset_document=dataset_document,
+                        documents=documents
+                    )
+                else:
+                    # load, split and index the file in bounded batches
+                    self._step_split_and_index(
+                        splitter=splitter,
+                        dataset=dataset,
+                        dataset_document=dataset_document,
+                        processing_rule=processing_rule
+                    )
             except DocumentIsPausedException:
                 raise DocumentIsPausedException('Document paused, document id: {}'.format(dataset_document.id))
             except ProviderTokenNotInitError as e:
@@ -126,6 +138,15 @@ class IndexingRunner:
                 document_id=dataset_document.id
             ).all()
 
+            # segments of a partly split document may already be indexed
+            index_node_ids = [document_segment.index_node_id for document_segment in document_segments]
+            if index_node_ids:
+                vector_index = IndexBuilder.get_index(dataset, 'high_quality')
+                if vector_index:
+                    vector_index.delete_by_document_id(dataset_document.id)
+
+                IndexBuilder.get_index(dataset, 'economy').delete_by_ids(index_node_ids)
+
             for document_segment in document_segments:
                 db.session.delete(document_segment)
             db.session.commit()
@@ -134,9 +155,6 @@ class IndexingRunner:
                 filter(DatasetProcessRule.id == dataset_document.dataset_process_rule_id). \
                 first()
 
-            # load file
-            text_docs = self._load_data(dataset_document, processing_rule.mode == 'automatic')
-
             # get embedding model instance
             embedding_model_instance = None
             if dataset.indexing_technique == 'high_quality':
@@ -156,21 +174,33 @@ class IndexingRunner:
             # get splitter
             splitter = self._get_splitter(processing_rule, embedding_model_instance)
 
-            # split to documents
-            documents = self._step_split(
-                text_docs=text_docs,
-                splitter=splitter,
-                dataset=dataset,
-                dataset_document=dataset_document,
-                processing_rule=processing_rule
-            )
+            if dataset_document.doc_form == 'qa_model':
+                # load file
+                text_docs = self._load_data(dataset_document, processing_rule.mode == 'automatic')
 
-            # build index
-            self._build_index(
-                dataset=dataset,
-                dataset_document=dataset_document,
-                documents=documents
-            )
+                # split to documents
+                documents = self._step_split(
+                    text_docs=text_docs,
+                    splitter=splitter,
+                    dataset=dataset,
+                    dataset_document=dataset_document,
+                    processing_rule=processing_rule
+                )
+
+                # build index
+                self._build_index(
+                    dataset=dataset,
+                    dataset_document=dataset_document,
+                    documents=documents
+                )
+            else:
+                # load, split and index the file again in bounded batches
+                self._step_split_and_index(
+                    splitter=splitter,
+                    dataset=dataset,
+                    dataset_document=dataset_document,
+                    processing_rule=processing_rule
+                )
         except DocumentIsPausedException:
             raise DocumentIsPausedException('Document paused, document id: {}'.format(dataset_document.id))
         except ProviderTokenNotInitError as e:
@@ -536,6 +566,44 @@ class IndexingRunner:
 
         return text_docs
 
+    def _load_data_lazily(self, dataset_document: DatasetDocument, automatic: bool = False) -> Iterator[Document]:
+        """
+        Load the text documents one by one while the file is parsed, as returned by the loader.
+        """
+        if dataset_document.data_source_type not in ["upload_file", "notion_import"]:
+            return
+
+        data_source_info = dataset_document.data_source_info_dict
+        text_docs = []
+        if dataset_document.data_source_type == 'upload_file':
+            if not data_source_info or 'upload_file_id' not in data_source_info:
+                raise ValueError("no upload file found")
+
+            file_detail = db.session.query(UploadFile). \
+                filter(UploadFile.id == data_source_info['upload_file_id']). \
+                one_or_none()
+
+            if file_detail:
+                text_docs = FileExtractor.lazy_load(file_detail, is_automatic=automatic)
+        elif dataset_document.data_source_type == 'notion_import':
+            loader = NotionLoader.from_document(dataset_document)
+            text_docs = loader.load()
+
+        yield from text_docs
+
+    def _prepare_text_docs(self, dataset_document: DatasetDocument, text_docs: Iterable[Document]) \
+            -> Iterator[Document]:
+        """
+        Remove invalid symbols of the loaded text documents and replace their doc id to the document model id.
+        """
+        for text_doc in text_docs:
+            # remove invalid symbol
+            text_doc.page_content = self.filter_string(text_doc.page_content)
+            text_doc.metadata['document_id'] = dataset_document.id
+            text_doc.metadata['dataset_id'] = dataset_document.dataset_id
+
+            yield text_doc
+
     def filter_string(self, text):
         text = re.sub(r'<\|', '<', text)
         text = re.sub(r'\|>', '>', text)
@@ -631,8 +699,30 @@ class IndexingRunner:
         """
         Split the text documents into nodes.
         """
-        all_documents = []
+        all_documents = list(self._split_to_documents_lazily(text_docs, splitter, processing_rule))
         all_qa_documents = []
+        # processing qa document
+        if document_form == 'qa_model':
+            for i in range(0, len(all_documents), 10):
+                threads = []
+                sub_documents = all_documents[i:i + 10]
+                for doc in sub_documents:
+                    document_format_thread = threading.Thread(target=self.format_qa_document, kwargs={
+                        'flask_app': current_app._get_current_object(),
+                        'tenant_id': tenant_id, 'document_node': doc, 'all_qa_documents': all_qa_documents,
+                        'document_language': document_language})
+                    threads.append(document_format_thread)
+                    document_format_thread.start()
+                for thread in threads:
+                    thread.join()
+            return all_qa_documents
+        return all_documents
+
+    def _split_to_documents_lazily(self, text_docs: Iterable[Document], splitter: TextSplitter,
+                                   processing_rule: DatasetProcessRule) -> Iterator[Document]:
+        """
+        Split the text documents into nodes, yielding the nodes of each text document as soon as it is split.
+        """
         for text_doc in text_docs:
             # document clean
             document_text = self._document_clean(text_doc.page_content, processing_rule)
@@ -640,7 +730,6 @@ class IndexingRunner:
 
             # parse document to nodes
             documents = splitter.split_documents([text_doc])
-            split_documents = []
             for document_node in documents:
 
                 if document_node.page_content.strip():
@@ -657,24 +746,7 @@ class IndexingRunner:
                     document_node.page_content = page_content
 
                     if document_node.page_content:
-                        split_documents.append(document_node)
-            all_documents.extend(split_documents)
-        # processing qa document
-        if document_form == 'qa_model':
-            for i in range(0, len(all_documents), 10):
-                threads = []
-                sub_documents = all_documents[i:i + 10]
-                for doc in sub_documents:
-                    document_format_thread = threading.Thread(target=self.format_qa_document, kwargs={
-                        'flask_app': current_app._get_current_object(),
-                        'tenant_id': tenant_id, 'document_node': doc, 'all_qa_documents': all_qa_documents,
-                        'document_language': document_language})
-                    threads.append(document_format_thread)
-                    document_format_thread.start()
-                for thread in threads:
-                    thread.join()
-            return all_qa_documents
-        return all_documents
+                        yield document_node
 
     def format_qa_document(self, flask_app: Flask, tenant_id: str, document_node, all_qa_documents, document_language):
         format_documents = []
@@ -791,58 +863,185 @@ class IndexingRunner:
         tokens = 0
         chunk_size = 100
 
-        embedding_model_type_instance = None
-        if embedding_model_instance:
-            embedding_model_type_instance = embedding_model_instance.model_type_instance
-            embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
-
         for i in range(0, len(documents), chunk_size):
             # check document is paused
             self._check_document_paused_status(dataset_document.id)
-            chunk_documents = documents[i:i + chunk_size]
-            if dataset.indexing_technique == 'high_quality' or embedding_model_type_instance:
-                tokens += sum(
-                    embedding_model_type_instance.get_num_tokens(
-                        embedding_model_instance.model,
-                        embedding_model_instance.credentials,
-                        [document.page_content]
-                    )
-                    for document in chunk_documents
-                )
+            tokens += self._index_documents(
+                dataset=dataset,
+                dataset_document=dataset_document,
+                documents=documents[i:i + chunk_size],
+                vector_index=vector_index,
+                keyword_table_index=keyword_table_index,
+                embedding_model_instance=embedding_model_instance
+            )
+
+        indexing_end_at = time.perf_counter()
+
+        # update document status to completed
+        self._update_document_index_status(
+            document_id=dataset_document.id,
+            after_indexing_status="completed",
+            extra_update_params={
+                DatasetDocument.tokens: tokens,
+                DatasetDocument.completed_at: datetime.datetime.utcnow(),
+                DatasetDocument.indexing_latency: indexing_end_at - indexing_start_at,
+            }
+        )
 
-            # save vector index
-            if vector_index:
-                vector_index.add_texts(chunk_documents)
+    def _step_split_and_index(self, splitter: TextSplitter, dataset: Dataset,
+                              dataset_document: DatasetDocument, processing_rule: DatasetProcessRule) -> None:
+        """
+        Load, split, save and index the document in bounded batches.
 
-            # save keyword index
-            keyword_table_index.add_texts(chunk_documents)
+        Text documents are loaded and split lazily, so the memory usage does not grow with the file size,
+        and the segments of each batch become searchable as soon as the batch is indexed.
 
-            document_ids = [document.metadata['doc_id'] for document in chunk_documents]
+        The document stays in splitting status until the whole file is split, so a document paused
+        or interrupted part way through is split again from the start when it is recovered.
+        """
+        self._update_document_index_status(
+            document_id=dataset_document.id,
+            after_indexing_status="splitting"
+        )
+
+        doc_store = DatasetDocumentStore(
+            dataset=dataset,
+            user_id=dataset_document.created_by,
+            document_id=dataset_document.id
+        )
+        vector_index = IndexBuilder.get_index(dataset, 'high_quality')
+        keyword_table_index = IndexBuilder.get_index(dataset, 'economy')
+        embedding_model_instance = None
+        if dataset.indexing_technique == 'high_quality':
+            embedding_model_instance = self.model_manager.get_model_instance(
+                tenant_id=dataset.tenant_id,
+                provider=dataset.embedding_model_provider,
+                model_type=ModelType.TEXT_EMBEDDING,
+                model=dataset.embedding_model
+            )
+
+        # words are counted in the loaded text, the stages complete when their stream is exhausted
+        word_count = 0
+        parsing_completed_at = None
+        splitting_completed_at = None
+
+        def count_words(text_docs: Iterable[Document]) -> Iterator[Document]:
+            nonlocal word_count, parsing_completed_at
+            for text_doc in text_docs:
+                word_count += len(text_doc.page_content)
+                yield text_doc
+
+            parsing_completed_at = datetime.datetime.utcnow()
+
+        def track_splitting(documents: Iterable[Document]) -> Iterator[Document]:
+            nonlocal splitting_completed_at
+            yield from documents
+
+            splitting_completed_at = datetime.datetime.utcnow()
+
+        text_docs = count_words(self._load_data_lazily(dataset_document, processing_rule.mode == 'automatic'))
+        documents = track_splitting(self._split_to_documents_lazily(
+            self._prepare_text_docs(dataset_document, text_docs), splitter, processing_rule
+        ))
+
+        indexing_start_at = time.perf_counter()
+        tokens = 0
+        for batch_documents in self._batch_documents(documents, INDEXING_BATCH_SIZE):
+            # check document is paused
+            self._check_document_paused_status(dataset_document.id)
+
+            # add document segments
+            doc_store.add_documents(batch_documents)
+
+            # update segment status to indexing
+            document_ids = [document.metadata['doc_id'] for document in batch_documents]
             db.session.query(DocumentSegment).filter(
                 DocumentSegment.document_id == dataset_document.id,
-                DocumentSegment.index_node_id.in_(document_ids),
-                DocumentSegment.status == "indexing"
+                DocumentSegment.index_node_id.in_(document_ids)
             ).update({
-                DocumentSegment.status: "completed",
-                DocumentSegment.enabled: True,
-                DocumentSegment.completed_at: datetime.datetime.utcnow()
+                DocumentSegment.status: "indexing",
+                DocumentSegment.indexing_at: datetime.datetime.utcnow()
             })
-
             db.session.commit()
 
+            tokens += self._index_documents(
+                dataset=dataset,
+                dataset_document=dataset_document,
+                documents=batch_documents,
+                vector_index=vector_index,
+                keyword_table_index=keyword_table_index,
+                embedding_model_instance=embedding_model_instance
+            )
+
         indexing_end_at = time.perf_counter()
 
         # update document status to completed
+        cur_time = datetime.datetime.utcnow()
         self._update_document_index_status(
             document_id=dataset_document.id,
             after_indexing_status="completed",
             extra_update_params={
+                DatasetDocument.word_count: word_count,
+                DatasetDocument.parsing_completed_at: parsing_completed_at or cur_time,
+                DatasetDocument.cleaning_completed_at: splitting_completed_at or cur_time,
+                DatasetDocument.splitting_completed_at: splitting_completed_at or cur_time,
                 DatasetDocument.tokens: tokens,
-                DatasetDocument.completed_at: datetime.datetime.utcnow(),
+                DatasetDocument.completed_at: cur_time,
                 DatasetDocument.indexing_latency: indexing_end_at - indexing_start_at,
             }
         )
 
+    @staticmethod
+    def _batch_documents(documents: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def _index_documents(self, dataset: Dataset, dataset_document: DatasetDocument, documents: List[Document],
+                         vector_index: Optional[BaseIndex], keyword_table_index: BaseIndex,
+                         embedding_model_instance: Optional[ModelInstance]) -> int:
+        """
+        Add the documents to the vector and keyword indexes and enable their segments.
+
+        :return: number of embedding tokens
+        """
+        tokens = 0
+        if embedding_model_instance:
+            embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_instance.model_type_instance)
+            tokens = sum(embedding_model_type_instance.get_num_tokens_batch(
+                embedding_model_instance.model,
+                embedding_model_instance.credentials,
+                [document.page_content for document in documents]
+            ))
+
+        # save vector index
+        if vector_index:
+            vector_index.add_texts(documents)
+
+        # save keyword index
+        keyword_table_index.add_texts(documents)
+
+        document_ids = [document.metadata['doc_id'] for document in documents]
+        db.session.query(DocumentSegment).filter(
+            DocumentSegment.document_id == dataset_document.id,
+            DocumentSegment.index_node_id.in_(document_ids),
+            DocumentSegment.status == "indexing"
+        ).update({
+            DocumentSegment.status: "completed",
+            DocumentSegment.enabled: True,
+            DocumentSegment.completed_at: datetime.datetime.utcnow()
+        })
+
+        db.session.commit()
+
+        return tokens
+
     def _check_document_paused_status(self, document_id: str):
         indexing_cache_key = 'document_{}_is_paused'.format(document_id)
         result = redis_client.get(indexing_cache_key)
@@ -1,10 +1,15 @@
+import json
+import logging
+
 from core.file.message_file_parser import MessageFileParser
 from core.model_manager import ModelInstance
 from core.model_runtime.entities.message_entities import (AssistantPromptMessage, PromptMessage, PromptMessageRole,
                                                           TextPromptMessageContent, UserPromptMessage)
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.model_providers import model_provider_factory
+from core.model_runtime.model_providers.__base.large_language_model import LargeLanguageModel
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from models.model import Conversation, Message
 
 
@@ -12,6 +17,8 @@ class TokenBufferMemory:
     def __init__(self, conversation: Conversation, model_instance: ModelInstance) -> None:
         self.conversation = conversation
         self.model_instance = model_instance
+        # message limit -> history prompt messages and their tokens, loaded once per turn
+        self._histories: dict[int, tuple[list[PromptMessage], list[int]]] = {}
 
     def get_history_prompt_messages(self, max_token_limit: int = 2000,
                                     message_limit: int = 10) -> list[PromptMessage]:
@@ -20,6 +27,30 @@ class TokenBufferMemory:
         :param max_token_limit: max token limit
         :param message_limit: message limit
         """
+        if message_limit not in self._histories:
+            self._histories[message_limit] = self._load_history_prompt_messages(message_limit)
+
+        prompt_messages, prompt_message_tokens = self._histories[message_limit]
+        prompt_messages = list(prompt_messages)
+        prompt_message_tokens = list(prompt_message_tokens)
+
+        # prune the chat message if it exceeds the max token limit
+        curr_message_tokens = sum(prompt_message_tokens)
+
+        if curr_message_tokens > max_token_limit:
+            pruned_memory = []
+            while curr_message_tokens > max_token_limit and prompt_messages:
+                pruned_memory.append(prompt_messages.pop(0))
+                curr_message_tokens -= prompt_message_tokens.pop(0)
+
+        return prompt_messages
+
+    def _load_history_prompt_messages(self, message_limit: int) -> tuple[list[PromptMessage], list[int]]:
+        """
+        Load history prompt messages and count their tokens.
+        :param message_limit: message limit
+        :return: prompt messages and tokens of every prompt message
+        """
         app_record = self.conversation.app
 
         # fetch limited messages, and return reversed
@@ -53,29 +84,61 @@ class TokenBufferMemory:
             prompt_messages.append(AssistantPromptMessage(content=message.answer))
 
         if not prompt_messages:
-            return []
+            return [], []
 
-        # prune the chat message if it exceeds the max token limit
         provider_instance = model_provider_factory.get_provider_instance(self.model_instance.provider)
         model_type_instance = provider_instance.get_model_instance(ModelType.LLM)
 
-        curr_message_tokens = model_type_instance.get_num_tokens(
-            self.model_instance.model,
-            self.model_instance.credentials,
-            prompt_messages
-        )
+        prompt_message_tokens = self._get_prompt_message_tokens(model_type_instance, messages, prompt_messages)
 
-        if curr_message_tokens > max_token_limit:
-            pruned_memory = []
-            while curr_message_tokens > max_token_limit and prompt_messages:
-                pruned_memory.append(prompt_messages.pop(0))
-                curr_message_tokens = model_type_instance.get_num_tokens(
+        return prompt_messages, prompt_message_tokens
+
+    def _get_prompt_message_tokens(self, model_type_instance: LargeLanguageModel,
+                                   messages: list[Message],
+                                   prompt_messages: list[PromptMessage]) -> list[int]:
+        """
+        Get tokens of every history prompt message, each message is counted once and cached by message id.
+        Counting messages one by one includes the per-request overhead in every count, which errs on the side
+        of pruning.
+
+        :param model_type_instance: llm model type instance
+        :param messages: history messages
+        :param prompt_messages: user and assistant prompt message of every history message
+        :return: tokens of every prompt message
+        """
+        cache_keys = [
+            f'message_tokens:{self.model_instance.provider}:{self.model_instance.model}:{message.id}'
+            for message in messages
+        ]
+
+        try:
+            cached_message_tokens = redis_client.mget(cache_keys)
+        except Exception:
+            logging.exception('Failed to get message tokens from redis')
+            cached_message_tokens = [None] * len(cache_keys)
+
+        prompt_message_tokens = []
+        for i, (cache_key, cached_tokens) in enumerate(zip(cache_keys, cached_message_tokens)):
+            if cached_tokens:
+                prompt_message_tokens.extend(json.loads(cached_tokens))
+                continue
+
+            message_tokens = [
+                model_type_instance.get_num_tokens(
                     self.model_instance.model,
                     self.model_instance.credentials,
-                    prompt_messages
+                    [prompt_message]
                 )
+                for prompt_message in prompt_messages[i * 2:i * 2 + 2]
+            ]
+            prompt_message_tokens.extend(message_tokens)
 
-        return prompt_messages
+            try:
+                redis_client.setex(cache_key, 86400, json.dumps(message_tokens))
+            except Exception:
+                logging.exception('Failed to set message tokens to redis')
+
+        return prompt_message_tokens
 
     def get_history_prompt_text(self, human_prefix: str = "Human",
                                 ai_prefix: str = "Assistant",
@@ -129,6 +129,8 @@ class ModelPropertyKey(Enum):
     WORD_LIMIT = "word_limit"
     AUDOI_TYPE = "audio_type"
     MAX_WORKERS = "max_workers"
+    RPM = "rpm"
+    TPM = "tpm"
 
 
 class ProviderModel(BaseModel):
@@ -1,6 +1,6 @@
 import time
 from abc import abstractmethod
-from typing import Optional
+from typing import Any, Optional
 
 from core.model_runtime.entities.model_entities import ModelPropertyKey, ModelType
 from core.model_runtime.entities.text_embedding_entities import TextEmbeddingResult
@@ -59,6 +59,29 @@ class TextEmbeddingModel(AIModel):
         """
         raise NotImplementedError
 
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each of the given texts,
+        models with a batched tokenizer should override it
+
+        :param model: model name
+        :param credentials: model credentials
+        :param texts: texts to embed
+        :return: number of tokens of each text
+        """
+        return [self.get_num_tokens(model, credentials, [text]) for text in texts]
+
+    def get_tokenizer(self, model: str, credentials: dict) -> Optional[Any]:
+        """
+        Get the tiktoken encoding that counts tokens the same way as get_num_tokens,
+        models whose tokenizer is not a tiktoken encoding return None
+
+        :param model: model name
+        :param credentials: model credentials
+        :return: tiktoken encoding
+        """
+        return None
+
     def _get_context_size(self, model: str, credentials: dict) -> int:
         """
         Get context size for given embedding model
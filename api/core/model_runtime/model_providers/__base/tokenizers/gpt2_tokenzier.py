@@ -1,11 +1,69 @@
+import json
+from functools import lru_cache
 from os.path import abspath, dirname, join
-from threading import Lock
 from typing import Any
 
-from transformers import GPT2Tokenizer as TransformerGPT2Tokenizer
+import tiktoken
+
+# same pre-tokenization pattern as the original gpt2 tokenizer
+GPT2_PATTERN = r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"""
+GPT2_END_OF_TEXT = '<|endoftext|>'
+
+# texts longer than this are not memoized, to keep the memo's memory footprint bounded
+MEMO_MAX_TEXT_LENGTH = 16384
+MEMO_MAX_SIZE = 4096
+BATCH_NUM_THREADS = 8
+
+
+def _bytes_to_unicode() -> dict[int, str]:
+    """
+    Mapping between utf-8 bytes and the printable unicode characters used in the gpt2 vocab.
+    """
+    bs = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) \
+        + list(range(ord("®"), ord("ÿ") + 1))
+    cs = bs[:]
+    n = 0
+    for b in range(2 ** 8):
+        if b not in bs:
+            bs.append(b)
+            cs.append(2 ** 8 + n)
+            n += 1
+
+    return dict(zip(bs, [chr(c) for c in cs]))
+
+
+def _load_encoding() -> tiktoken.Encoding:
+    """
+    Build a BPE encoding from the gpt2 vocab cached in the project, so it works offline.
+    In the gpt2 vocab the token ids are the merge ranks.
+    """
+    gpt2_tokenizer_path = join(dirname(abspath(__file__)), 'gpt2')
+    with open(join(gpt2_tokenizer_path, 'vocab.json'), encoding='utf-8') as f:
+        vocab = json.load(f)
+
+    byte_decoder = {c: b for b, c in _bytes_to_unicode().items()}
+    special_tokens = {GPT2_END_OF_TEXT: vocab.pop(GPT2_END_OF_TEXT)}
+    mergeable_ranks = {
+        bytes(byte_decoder[c] for c in token): rank
+        for token, rank in vocab.items()
+    }
+
+    return tiktoken.Encoding(
+        name='gpt2_local',
+        pat_str=GPT2_PATTERN,
+        mergeable_ranks=mergeable_ranks,
+        special_tokens=special_tokens
+    )
+
+
+# load the vocab once at import time, the encoding is thread-safe and needs no lock
+_encoding = _load_encoding()
+
+
+@lru_cache(maxsize=MEMO_MAX_SIZE)
+def _get_num_tokens_memoized(text: str) -> int:
+    return len(_encoding.encode(text, allowed_special='all'))
 
-_tokenizer = None
-_lock = Lock()
 
 class GPT2Tokenizer:
     @staticmethod
@@ -13,21 +71,23 @@ class GPT2Tokenizer:
         """
             use gpt2 tokenizer to get num tokens
         """
-        _tokenizer = GPT2Tokenizer.get_encoder()
-        tokens = _tokenizer.encode(text, verbose=False)
-        return len(tokens)
-    
+        if len(text) <= MEMO_MAX_TEXT_LENGTH:
+            return _get_num_tokens_memoized(text)
+
+        return len(_encoding.encode(text, allowed_special='all'))
+
     @staticmethod
     def get_num_tokens(text: str) -> int:
         return GPT2Tokenizer._get_num_tokens_by_gpt2(text)
-    
+
+    @staticmethod
+    def get_num_tokens_batch(texts: list[str]) -> list[int]:
+        """
+            get num tokens of each text, texts are encoded in parallel
+        """
+        batch = _encoding.encode_batch(texts, num_threads=BATCH_NUM_THREADS, allowed_special='all')
+        return [len(tokens) for tokens in batch]
+
     @staticmethod
     def get_encoder() -> Any:
-        global _tokenizer, _lock
-        with _lock:
-            if _tokenizer is None:
-                base_path = abspath(__file__)
-                gpt2_tokenizer_path = join(dirname(base_path), 'gpt2')
-                _tokenizer = TransformerGPT2Tokenizer.from_pretrained(gpt2_tokenizer_path)
-
-            return _tokenizer
\ No newline at end of file
+        return _encoding
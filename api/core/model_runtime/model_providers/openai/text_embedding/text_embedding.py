@@ -137,6 +137,35 @@ class OpenAITextEmbeddingModel(_CommonOpenAI, TextEmbeddingModel):
 
         return total_num_tokens
 
+    def get_num_tokens_batch(self, model: str, credentials: dict, texts: list[str]) -> list[int]:
+        """
+        Get number of tokens of each of the given texts, texts are encoded in parallel
+
+        :param model: model name
+        :param credentials: model credentials
+        :param texts: texts to embed
+        :return: number of tokens of each text
+        """
+        if len(texts) == 0:
+            return []
+
+        enc = self.get_tokenizer(model, credentials)
+
+        return [len(tokenized_text) for tokenized_text in enc.encode_batch(texts)]
+
+    def get_tokenizer(self, model: str, credentials: dict) -> tiktoken.Encoding:
+        """
+        Get the tiktoken encoding of the model
+
+        :param model: model name
+        :param credentials: model credentials
+        :return: tiktoken encoding
+        """
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+
     def validate_credentials(self, model: str, credentials: dict) -> None:
         """
         Validate model credentials
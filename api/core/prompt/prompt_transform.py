@@ -1,3 +1,4 @@
+import copy
 import enum
 import json
 import os
@@ -54,6 +55,39 @@ class ModelMode(enum.Enum):
 
 
 class PromptTransform:
+    """
+    Organize prompt messages of a turn.
+
+    The parsed templates and the token counts of prompt messages are memoized by the instance,
+    so reuse one instance for all the prompts of a turn to compute each of them only once.
+    """
+    # prompt name -> prompt rules read from the generate prompts files
+    _prompt_rules: dict[str, dict] = {}
+
+    def __init__(self) -> None:
+        self._prompt_templates: dict[str, PromptTemplateParser] = {}
+        self._num_tokens: dict[tuple, int] = {}
+
+    def get_num_tokens(self, prompt_messages: list[PromptMessage], model_config: ModelConfigEntity) -> int:
+        """
+        Get the number of tokens of the prompt messages, counted once for the same prompt messages.
+        :param prompt_messages: prompt messages
+        :param model_config: model config entity
+        :return:
+        """
+        key = (model_config.provider, model_config.model, tuple(m.json() for m in prompt_messages))
+        if key not in self._num_tokens:
+            model_type_instance = model_config.provider_model_bundle.model_type_instance
+            model_type_instance = cast(LargeLanguageModel, model_type_instance)
+
+            self._num_tokens[key] = model_type_instance.get_num_tokens(
+                model_config.model,
+                model_config.credentials,
+                prompt_messages
+            )
+
+        return self._num_tokens[key]
+
     def get_prompt(self,
                    app_mode: str,
                    prompt_template_entity: PromptTemplateEntity,
@@ -202,15 +236,24 @@ class PromptTransform:
             return 'baichuan_chat'
 
     def _read_prompt_rules_from_file(self, prompt_name: str) -> dict:
-        # Get the absolute path of the subdirectory
-        prompt_path = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)),
-            'generate_prompts')
+        if prompt_name not in PromptTransform._prompt_rules:
+            # Get the absolute path of the subdirectory
+            prompt_path = os.path.join(
+                os.path.dirname(os.path.realpath(__file__)),
+                'generate_prompts')
+
+            json_file_path = os.path.join(prompt_path, f'{prompt_name}.json')
+            # Open the JSON file and read its content
+            with open(json_file_path, 'r', encoding='utf-8') as json_file:
+                PromptTransform._prompt_rules[prompt_name] = json.load(json_file)
 
-        json_file_path = os.path.join(prompt_path, f'{prompt_name}.json')
-        # Open the JSON file and read its content
-        with open(json_file_path, 'r', encoding='utf-8') as json_file:
-            return json.load(json_file)
+        return copy.deepcopy(PromptTransform._prompt_rules[prompt_name])
+
+    def _get_prompt_template(self, template: str) -> PromptTemplateParser:
+        if template not in self._prompt_templates:
+            self._prompt_templates[template] = PromptTemplateParser(template=template)
+
+        return self._prompt_templates[template]
 
     def _get_simple_chat_app_chat_model_prompt_messages(self, prompt_rules: dict,
                                                         pre_prompt: str,
@@ -224,14 +267,14 @@ class PromptTransform:
 
         context_prompt_content = ''
         if context and 'context_prompt' in prompt_rules:
-            prompt_template = PromptTemplateParser(template=prompt_rules['context_prompt'])
+            prompt_template = self._get_prompt_template(prompt_rules['context_prompt'])
             context_prompt_content = prompt_template.format(
                 {'context': context}
             )
 
         pre_prompt_content = ''
         if pre_prompt:
-            prompt_template = PromptTemplateParser(template=pre_prompt)
+            prompt_template = self._get_prompt_template(pre_prompt)
             prompt_inputs = {k: inputs[k] for k in prompt_template.variable_keys if k in inputs}
             pre_prompt_content = prompt_template.format(
                 prompt_inputs
@@ -276,14 +319,14 @@ class PromptTransform:
                                            model_config: ModelConfigEntity) -> List[PromptMessage]:
         context_prompt_content = ''
         if context and 'context_prompt' in prompt_rules:
-            prompt_template = PromptTemplateParser(template=prompt_rules['context_prompt'])
+            prompt_template = self._get_prompt_template(prompt_rules['context_prompt'])
             context_prompt_content = prompt_template.format(
                 {'context': context}
             )
 
         pre_prompt_content = ''
         if pre_prompt:
-            prompt_template = PromptTemplateParser(template=pre_prompt)
+            prompt_template = self._get_prompt_template(pre_prompt)
             prompt_inputs = {k: inputs[k] for k in prompt_template.variable_keys if k in inputs}
             pre_prompt_content = prompt_template.format(
                 prompt_inputs
@@ -317,7 +360,7 @@ class PromptTransform:
                 ai_prefix=prompt_rules['human_prefix'] if 'human_prefix' in prompt_rules else 'Human',
                 human_prefix=prompt_rules['assistant_prefix'] if 'assistant_prefix' in prompt_rules else 'Assistant'
             )
-            prompt_template = PromptTemplateParser(template=prompt_rules['histories_prompt'])
+            prompt_template = self._get_prompt_template(prompt_rules['histories_prompt'])
             histories_prompt_content = prompt_template.format({'histories': histories})
 
             prompt = ''
@@ -329,7 +372,7 @@ class PromptTransform:
                 elif order == 'histories_prompt':
                     prompt += histories_prompt_content
 
-        prompt_template = PromptTemplateParser(template=query_prompt)
+        prompt_template = self._get_prompt_template(query_prompt)
         query_prompt_content = prompt_template.format({'query': query})
 
         prompt += query_prompt_content
@@ -410,14 +453,7 @@ class PromptTransform:
 
         model_context_tokens = model_config.model_schema.model_properties.get(ModelPropertyKey.CONTEXT_SIZE)
         if model_context_tokens:
-            model_type_instance = model_config.provider_model_bundle.model_type_instance
-            model_type_instance = cast(LargeLanguageModel, model_type_instance)
-
-            curr_message_tokens = model_type_instance.get_num_tokens(
-                model_config.model,
-                model_config.credentials,
-                prompt_messages
-            )
+            curr_message_tokens = self.get_num_tokens(prompt_messages, model_config)
 
             max_tokens = 0
             for parameter_rule in model_config.model_schema.parameter_rules:
@@ -453,7 +489,7 @@ class PromptTransform:
 
         prompt_messages = []
 
-        prompt_template = PromptTemplateParser(template=raw_prompt)
+        prompt_template = self._get_prompt_template(raw_prompt)
         prompt_inputs = {k: inputs[k] for k in prompt_template.variable_keys if k in inputs}
 
         self._set_context_variable(context, prompt_template, prompt_inputs)
@@ -497,7 +533,7 @@ class PromptTransform:
         for prompt_item in raw_prompt_list:
             raw_prompt = prompt_item.text
 
-            prompt_template = PromptTemplateParser(template=raw_prompt)
+            prompt_template = self._get_prompt_template(raw_prompt)
             prompt_inputs = {k: inputs[k] for k in prompt_template.variable_keys if k in inputs}
 
             self._set_context_variable(context, prompt_template, prompt_inputs)
@@ -532,7 +568,7 @@ class PromptTransform:
 
         prompt_messages = []
 
-        prompt_template = PromptTemplateParser(template=raw_prompt)
+        prompt_template = self._get_prompt_template(raw_prompt)
         prompt_inputs = {k: inputs[k] for k in prompt_template.variable_keys if k in inputs}
 
         self._set_context_variable(context, prompt_template, prompt_inputs)
@@ -555,7 +591,7 @@ class PromptTransform:
         for prompt_item in raw_prompt_list:
             raw_prompt = prompt_item.text
 
-            prompt_template = PromptTemplateParser(template=raw_prompt)
+            prompt_template = self._get_prompt_template(raw_prompt)
             prompt_inputs = {k: inputs[k] for k in prompt_template.variable_keys if k in inputs}
 
             self._set_context_variable(context, prompt_template, prompt_inputs)
@@ -8,7 +8,8 @@ from core.entities.provider_configuration import ProviderConfiguration, Provider
 from core.entities.provider_entities import (CustomConfiguration, CustomModelConfiguration, CustomProviderConfiguration,
                                              QuotaConfiguration, SystemConfiguration)
 from core.helper import encrypter
-from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
+from core.helper.model_provider_cache import (ProviderConfigurationsCache, ProviderCredentialsCache,
+                                              ProviderCredentialsCacheType)
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.entities.provider_entities import (ConfigurateMethod, CredentialFormSchema, FormType,
                                                            ProviderEntity)
@@ -65,6 +66,30 @@ class ProviderManager:
         :param tenant_id:
         :return:
         """
+        provider_configurations_cache = ProviderConfigurationsCache(tenant_id)
+
+        # Get cached provider configurations
+        cached_provider_configurations = provider_configurations_cache.get()
+        if cached_provider_configurations:
+            return cached_provider_configurations
+
+        # read the version before building, so an invalidation during the build is not overwritten
+        version = provider_configurations_cache.get_version()
+
+        provider_configurations = self._build_configurations(tenant_id)
+
+        # cache provider configurations
+        provider_configurations_cache.set(provider_configurations, version)
+
+        return provider_configurations
+
+    def _build_configurations(self, tenant_id: str) -> ProviderConfigurations:
+        """
+        Build model provider configurations from the provider records of the workspace.
+
+        :param tenant_id: workspace id
+        :return:
+        """
         # Get all provider records of the workspace
         provider_name_to_provider_records_dict = self._get_all_providers(tenant_id)
 
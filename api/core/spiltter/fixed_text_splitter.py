@@ -1,20 +1,83 @@
 """Functionality for splitting text."""
 from __future__ import annotations
 
-from typing import Any, List, Optional, cast
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Tuple, cast
 
+import regex
 from core.model_manager import ModelInstance
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
 from langchain.text_splitter import (TS, AbstractSet, Collection, Literal, RecursiveCharacterTextSplitter,
                                      TokenTextSplitter, Type, Union)
 
+logger = logging.getLogger(__name__)
+
+Span = Tuple[int, int]
+
+
+@lru_cache(maxsize=8)
+def _get_pre_tokenize_pattern(pattern: str) -> regex.Pattern:
+    return regex.compile(pattern)
+
+
+class SpanLengths:
+    """
+    Lengths of the spans of a text.
+
+    With an encoder a span is pre-tokenized in place by the pattern of the encoder, which gives the same pieces
+    as pre-tokenizing the text of the span, and each distinct piece is encoded only once, so the lengths of
+    the pieces and merged chunks of the text are the same as encoding them again, without running the BPE
+    over every piece on every level of the split. Without an encoder, or with special tokens in the text,
+    spans are measured by the length function.
+    """
+
+    def __init__(self, text: str, encoder: Optional[Any], length_function: Callable[[str], int]):
+        self._text = text
+        self._length_function = length_function
+        self._encoder = None
+        self._lengths: dict[Span, int] = {}
+        self._piece_lengths: dict[str, int] = {}
+
+        # special tokens are split out before pre-tokenization, leave them to the length function
+        if encoder and not any(token in text for token in encoder.special_tokens_set):
+            self._encoder = encoder
+            self._pattern = _get_pre_tokenize_pattern(encoder._pat_str)
+
+    def get(self, start: int, end: int) -> int:
+        if start >= end:
+            return 0
+
+        if (start, end) not in self._lengths:
+            if self._encoder is None:
+                self._lengths[(start, end)] = self._length_function(self._text[start:end])
+            else:
+                self._lengths[(start, end)] = sum(
+                    self._get_piece_length(match.group()) for match in self._pattern.finditer(self._text, start, end)
+                )
+
+        return self._lengths[(start, end)]
+
+    def _get_piece_length(self, piece: str) -> int:
+        if piece not in self._piece_lengths:
+            self._piece_lengths[piece] = len(self._encoder.encode_ordinary(piece))
+
+        return self._piece_lengths[piece]
+
 
 class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
     """
         This class is used to implement from_gpt2_encoder, to prevent using of tiktoken
     """
 
+    def __init__(self, encoder: Optional[Any] = None, **kwargs: Any):
+        """Create a new TextSplitter."""
+        super().__init__(**kwargs)
+        self._encoder = encoder
+        self._separator_lengths = {}
+
     @classmethod
     def from_encoder(
             cls: Type[TS],
@@ -45,9 +108,130 @@ class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
                 "disallowed_special": disallowed_special,
             }
             kwargs = {**kwargs, **extra_kwargs}
+        else:
+            # the encoder must count the same as the length function,
+            # models without a tiktoken encoding are measured by the length function
+            encoder = GPT2Tokenizer.get_encoder()
+            if embedding_model_instance:
+                embedding_model_type_instance = embedding_model_instance.model_type_instance
+                embedding_model_type_instance = cast(TextEmbeddingModel, embedding_model_type_instance)
+                encoder = embedding_model_type_instance.get_tokenizer(
+                    model=embedding_model_instance.model,
+                    credentials=embedding_model_instance.credentials
+                )
+            kwargs = {**kwargs, "encoder": encoder}
 
         return cls(length_function=_token_encoder, **kwargs)
 
+    def split_text(self, text: str) -> List[str]:
+        span_lengths = SpanLengths(text, self._encoder, self._length_function)
+        return self._split_text_spans(text, (0, len(text)), self._separators, span_lengths)
+
+    def _split_text_spans(self, text: str, span: Span, separators: List[str],
+                          span_lengths: SpanLengths) -> List[str]:
+        """Split the span of text and return chunks, same as `_split_text` on the text of the span."""
+        start, end = span
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = separators[-1]
+        new_separators = []
+        for i, _s in enumerate(separators):
+            if _s == "":
+                separator = _s
+                break
+            if re.compile(_s).search(text, start, end):
+                separator = _s
+                new_separators = separators[i + 1:]
+                break
+
+        splits = self._split_span_with_regex(text, span, separator, self._keep_separator)
+        # Now go merging things, recursively splitting longer texts.
+        _good_splits = []
+        _separator = "" if self._keep_separator else separator
+        for s in splits:
+            if span_lengths.get(*s) < self._chunk_size:
+                _good_splits.append(s)
+            else:
+                if _good_splits:
+                    merged_text = self._merge_spans(text, _good_splits, _separator, span_lengths)
+                    final_chunks.extend(merged_text)
+                    _good_splits = []
+                if not new_separators:
+                    final_chunks.append(text[s[0]:s[1]])
+                else:
+                    other_info = self._split_text_spans(text, s, new_separators, span_lengths)
+                    final_chunks.extend(other_info)
+        if _good_splits:
+            merged_text = self._merge_spans(text, _good_splits, _separator, span_lengths)
+            final_chunks.extend(merged_text)
+        return final_chunks
+
+    @staticmethod
+    def _split_span_with_regex(text: str, span: Span, separator: str, keep_separator: bool) -> List[Span]:
+        """Split the span of text by the separator pattern, the separator is kept at the start of the next split."""
+        start, end = span
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+
+        splits = []
+        split_start = start
+        for match in re.compile(separator).finditer(text, start, end):
+            splits.append((split_start, match.start()))
+            split_start = match.start() if keep_separator else match.end()
+        splits.append((split_start, end))
+
+        return [s for s in splits if s[0] < s[1]]
+
+    def _merge_spans(self, text: str, splits: List[Span], separator: str, span_lengths: SpanLengths) -> List[str]:
+        """Combine the splits into chunks up to chunk size, same as `_merge_splits`."""
+        separator_len = self._get_separator_length(separator)
+
+        docs = []
+        current_doc: List[Span] = []
+        total = 0
+        for d in splits:
+            _len = span_lengths.get(*d)
+            if (
+                total + _len + (separator_len if len(current_doc) > 0 else 0)
+                > self._chunk_size
+            ):
+                if total > self._chunk_size:
+                    logger.warning(
+                        f"Created a chunk of size {total}, "
+                        f"which is longer than the specified {self._chunk_size}"
+                    )
+                if len(current_doc) > 0:
+                    doc = self._join_spans(text, current_doc, separator)
+                    if doc is not None:
+                        docs.append(doc)
+                    # Keep on popping if:
+                    # - we have a larger chunk than in the chunk overlap
+                    # - or if we still have any chunks and the length is long
+                    while total > self._chunk_overlap or (
+                        total + _len + (separator_len if len(current_doc) > 0 else 0)
+                        > self._chunk_size
+                        and total > 0
+                    ):
+                        total -= span_lengths.get(*current_doc[0]) + (
+                            separator_len if len(current_doc) > 1 else 0
+                        )
+                        current_doc = current_doc[1:]
+            current_doc.append(d)
+            total += _len + (separator_len if len(current_doc) > 1 else 0)
+        doc = self._join_spans(text, current_doc, separator)
+        if doc is not None:
+            docs.append(doc)
+        return docs
+
+    def _join_spans(self, text: str, spans: List[Span], separator: str) -> Optional[str]:
+        return self._join_docs([text[start:end] for start, end in spans], separator)
+
+    def _get_separator_length(self, separator: str) -> int:
+        if separator not in self._separator_lengths:
+            self._separator_lengths[separator] = self._length_function(separator)
+
+        return self._separator_lengths[separator]
+
 
 class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter):
     def __init__(self, fixed_separator: str = "\n\n", separators: Optional[List[str]] = None, **kwargs: Any):
@@ -58,22 +242,29 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
 
     def split_text(self, text: str) -> List[str]:
         """Split incoming text and return chunks."""
+        span_lengths = SpanLengths(text, self._encoder, self._length_function)
         if self._fixed_separator:
-            chunks = text.split(self._fixed_separator)
+            chunks = self._split_span(text, (0, len(text)), self._fixed_separator)
         else:
-            chunks = list(text)
+            chunks = self._split_span(text, (0, len(text)), "")
 
         final_chunks = []
         for chunk in chunks:
-            if self._length_function(chunk) > self._chunk_size:
-                final_chunks.extend(self.recursive_split_text(chunk))
+            if span_lengths.get(*chunk) > self._chunk_size:
+                final_chunks.extend(self._recursive_split_text_span(text, chunk, span_lengths))
             else:
-                final_chunks.append(chunk)
+                final_chunks.append(text[chunk[0]:chunk[1]])
 
         return final_chunks
 
     def recursive_split_text(self, text: str) -> List[str]:
         """Split incoming text and return chunks."""
+        span_lengths = SpanLengths(text, self._encoder, self._length_function)
+        return self._recursive_split_text_span(text, (0, len(text)), span_lengths)
+
+    def _recursive_split_text_span(self, text: str, span: Span, span_lengths: SpanLengths) -> List[str]:
+        """Split the span of text and return chunks, same as `recursive_split_text` on the text of the span."""
+        start, end = span
         final_chunks = []
         # Get appropriate separator to use
         separator = self._separators[-1]
@@ -81,27 +272,43 @@ class FixedRecursiveCharacterTextSplitter(EnhanceRecursiveCharacterTextSplitter)
             if _s == "":
                 separator = _s
                 break
-            if _s in text:
+            if text.find(_s, start, end) != -1:
                 separator = _s
                 break
         # Now that we have the separator, split the text
-        if separator:
-            splits = text.split(separator)
-        else:
-            splits = list(text)
+        splits = self._split_span(text, span, separator)
         # Now go merging things, recursively splitting longer texts.
         _good_splits = []
         for s in splits:
-            if self._length_function(s) < self._chunk_size:
+            if span_lengths.get(*s) < self._chunk_size:
                 _good_splits.append(s)
             else:
                 if _good_splits:
-                    merged_text = self._merge_splits(_good_splits, separator)
+                    merged_text = self._merge_spans(text, _good_splits, separator, span_lengths)
                     final_chunks.extend(merged_text)
                     _good_splits = []
-                other_info = self.recursive_split_text(s)
+                other_info = self._recursive_split_text_span(text, s, span_lengths)
                 final_chunks.extend(other_info)
         if _good_splits:
-            merged_text = self._merge_splits(_good_splits, separator)
+            merged_text = self._merge_spans(text, _good_splits, separator, span_lengths)
             final_chunks.extend(merged_text)
         return final_chunks
+
+    @staticmethod
+    def _split_span(text: str, span: Span, separator: str) -> List[Span]:
+        """Split the span of text like `str.split`, or into characters without separator."""
+        start, end = span
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+
+        splits = []
+        split_start = start
+        while True:
+            index = text.find(separator, split_start, end)
+            if index == -1:
+                break
+            splits.append((split_start, index))
+            split_start = index + len(separator)
+        splits.append((split_start, end))
+
+        return splits
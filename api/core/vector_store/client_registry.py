@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _ClientEntry:
+    def __init__(self, client: Any, close: Optional[Callable[[Any], None]]):
+        self.client = client
+        self.close = close
+        self.last_used_at = time.monotonic()
+        self.last_checked_at = self.last_used_at
+        # number of owners still holding the client
+        self.leases = 0
+        self.removed = False
+
+
+class VectorClientRegistry:
+    """
+    Process-wide registry of long-lived vector database clients.
+
+    Clients are keyed by backend, endpoint and credentials, so that every vector index
+    and every retrieval thread talking to the same endpoint shares one client and its
+    underlying HTTP/gRPC connections.
+    A client is leased to the owner it was got for until the owner is garbage collected, and is
+    never closed while leased. Clients not leased and idle for longer than `IDLE_TIMEOUT` are closed,
+    and a client is health checked at most once every `HEALTH_CHECK_INTERVAL` seconds and replaced
+    if the check fails, the unhealthy client is closed once its last lease is released.
+    """
+    IDLE_TIMEOUT = 600
+    HEALTH_CHECK_INTERVAL = 30
+
+    def __init__(self):
+        self._clients: dict[str, _ClientEntry] = {}
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build_key(backend: str, *parts: Any) -> str:
+        """
+        Build a registry key, secrets in parts are hashed instead of kept in plain text.
+        """
+        digest = hashlib.sha256(repr(parts).encode()).hexdigest()
+        return f'{backend}:{digest}'
+
+    def get_client(self, key: str, factory: Callable[[], Any],
+                   health_check: Optional[Callable[[Any], bool]] = None,
+                   close: Optional[Callable[[Any], None]] = None, owner: Optional[Any] = None) -> Any:
+        """
+        Get the client of key, create it by factory if not exists or unhealthy.
+
+        :param key: registry key, see `build_key`
+        :param factory: create a new client
+        :param health_check: return whether the client is still usable
+        :param close: release the resources of a client when it is evicted
+        :param owner: object holding the client, the client is not closed until it is garbage collected
+        :return: client
+        """
+        self._evict_idle_clients()
+
+        with self._get_key_lock(key):
+            entry = self._clients.get(key)
+            now = time.monotonic()
+
+            if entry and health_check and now - entry.last_checked_at > self.HEALTH_CHECK_INTERVAL:
+                if self._is_healthy(entry, health_check):
+                    entry.last_checked_at = now
+                else:
+                    logger.warning(f"Vector client {key} is unhealthy, reconnecting.")
+                    self._remove(key, entry)
+                    entry = None
+
+            if not entry:
+                entry = _ClientEntry(factory(), close)
+                with self._lock:
+                    self._clients[key] = entry
+
+            entry.last_used_at = now
+            if owner is not None:
+                with self._lock:
+                    entry.leases += 1
+                weakref.finalize(owner, self._release, key, entry)
+
+            return entry.client
+
+    def remove_client(self, key: str) -> None:
+        """
+        Close and remove the client of key, e.g. after a connection error.
+        """
+        with self._get_key_lock(key):
+            entry = self._clients.get(key)
+            if entry:
+                self._remove(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._clients.items())
+
+        for key, entry in entries:
+            self._remove(key, entry)
+
+    def _get_key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+
+            return self._key_locks[key]
+
+    def _evict_idle_clients(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            idle_entries = [(key, entry) for key, entry in self._clients.items()
+                            if not entry.leases and now - entry.last_used_at > self.IDLE_TIMEOUT]
+
+        for key, entry in idle_entries:
+            logger.debug(f"Vector client {key} is idle, closing.")
+            self._remove(key, entry)
+
+    def _release(self, key: str, entry: _ClientEntry) -> None:
+        with self._lock:
+            entry.leases -= 1
+            entry.last_used_at = time.monotonic()
+            if not entry.removed or entry.leases:
+                return
+
+        self._close(key, entry)
+
+    def _remove(self, key: str, entry: _ClientEntry) -> None:
+        with self._lock:
+            if self._clients.get(key) is not entry:
+                return
+
+            del self._clients[key]
+            entry.removed = True
+            if entry.leases:
+                # closed by the release of the last lease
+                return
+
+        self._close(key, entry)
+
+    @staticmethod
+    def _close(key: str, entry: _ClientEntry) -> None:
+        if entry.close:
+            try:
+                entry.close(entry.client)
+            except Exception:
+                logger.exception(f"Failed to close vector client {key}.")
+
+    @staticmethod
+    def _is_healthy(entry: _ClientEntry, health_check: Callable[[Any], bool]) -> bool:
+        try:
+            return bool(health_check(entry.client))
+        except Exception:
+            return False
+
+
+vector_client_registry = VectorClientRegistry()
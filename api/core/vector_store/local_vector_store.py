@@ -0,0 +1,25 @@
+from core.vector_store.vector.local import Local
+
+
+class LocalVectorStore(Local):
+    def del_texts_by_ids(self, ids: list[str]) -> None:
+        self._collection.delete(ids)
+
+    def del_texts_by_metadata_field(self, key: str, value: str) -> None:
+        ids = self._collection.get_ids_by_metadata_field(key, value)
+        if ids:
+            self._collection.delete(ids)
+
+    def del_text(self, uuid: str) -> None:
+        self._collection.delete([uuid])
+
+    def text_exists(self, uuid: str) -> bool:
+        return self._collection.exists(uuid)
+
+    def delete_by_group_id(self, group_id: str) -> None:
+        ids = self._collection.get_ids_by_group_id(group_id)
+        if ids:
+            self._collection.delete(ids)
+
+    def delete(self) -> None:
+        self._collection.drop()
@@ -1,12 +1,36 @@
-from typing import Any, cast
+import heapq
+import math
+import threading
+from collections import Counter
+from typing import Any, Iterable, List, Optional, cast
 
+from cachetools import TTLCache
+from core.index.keyword_table_index.jieba_keyword_table_handler import SUB_TOKEN_PATTERN, JiebaKeywordTableHandler
+from core.index.keyword_table_index.keyword_table_index import BM25_B, BM25_K1
+from core.index.keyword_table_index.stopwords import STOPWORDS
 from core.vector_store.vector.qdrant import Qdrant
 from langchain.schema import Document
-from qdrant_client.http.models import Filter, FilterSelector, PointIdsList
+from qdrant_client.http.models import (Condition, FieldCondition, Filter, FilterSelector, IsEmptyCondition, MatchText,
+                                       MatchValue, PayloadField, PayloadSchemaType, PointIdsList, Record)
 from qdrant_client.local.qdrant_local import QdrantLocal
 
+# upper bound of the candidate points scored by a full text search
+MAX_BM25_CANDIDATES = 1000
+BM25_SCROLL_BATCH_SIZE = 256
+
+# collections whose sparse term payload index is known to exist in this process
+_sparse_terms_indexed_collections = set()
+
+# estimated point counts of BM25 corpus statistics by (collection name, filter)
+CORPUS_STATISTICS_TTL = 300
+_corpus_statistics = TTLCache(maxsize=10000, ttl=CORPUS_STATISTICS_TTL)
+_corpus_statistics_lock = threading.Lock()
+
 
 class QdrantVectorStore(Qdrant):
+    SPARSE_TERM_FREQUENCIES_KEY = 'sparse_term_frequencies'
+    SPARSE_DOCUMENT_LENGTH_KEY = 'sparse_document_length'
+
     def del_texts(self, filter: Filter):
         if not filter:
             raise ValueError('filter must not be empty')
@@ -50,6 +74,205 @@ class QdrantVectorStore(Qdrant):
 
         self.client.delete_collection(collection_name=self.collection_name)
 
+    def similarity_search_by_bm25(self, query: str, filter: Optional[Filter] = None, k: int = 4) -> List[Document]:
+        """
+        Return the k points ranked best by BM25 for the query, with the score in the metadata.
+
+        Points are retrieved through the sparse term index kept in their payload, rarest query terms
+        first, and never with their vectors. Corpus statistics come from estimated counts on the sparse
+        term index, cached for a few minutes, the average document length is taken over the scored candidates.
+        Points indexed before the sparse term index existed are matched in the full text payload index
+        and their terms are counted on the fly.
+
+        :param query: query text
+        :param filter: filter of the points to search in, e.g. by group id
+        :param k: number of documents to return
+        :return: documents ranked by score
+        """
+        self._reload_if_needed()
+        self._create_sparse_terms_index_if_needed()
+
+        query_terms = list(self._count_sparse_terms(query)[0])
+        if not query_terms:
+            return []
+
+        document_frequencies = Counter()
+        for term in query_terms:
+            document_frequencies[term] = self._count_points(self._extend_filter(filter, FieldCondition(
+                key=self.SPARSE_TERMS_KEY,
+                match=MatchValue(value=term)
+            )))
+
+        # points without sparse terms, indexed before the sparse term index existed
+        sparse_documents = []
+        for record in self._scroll(self._extend_filter(
+                filter,
+                FieldCondition(key=self.content_payload_key, match=MatchText(text=query)),
+                IsEmptyCondition(is_empty=PayloadField(key=self.SPARSE_TERMS_KEY))
+        ), MAX_BM25_CANDIDATES):
+            term_frequencies, document_length = self._count_sparse_terms(
+                record.payload.get(self.content_payload_key) or ''
+            )
+            sparse_documents.append((record, term_frequencies, document_length))
+            document_frequencies.update(term for term in query_terms if term in term_frequencies)
+
+        # estimated frequencies may miss points added since, so every term is looked up
+        matched_terms = sorted(query_terms, key=document_frequencies.__getitem__)
+
+        candidates = {}
+        for term in matched_terms:
+            if len(candidates) >= MAX_BM25_CANDIDATES:
+                break
+
+            for record in self._scroll(self._extend_filter(filter, FieldCondition(
+                key=self.SPARSE_TERMS_KEY,
+                match=MatchValue(value=term)
+            )), MAX_BM25_CANDIDATES - len(candidates)):
+                candidates[record.id] = record
+
+        sparse_documents.extend(
+            (record,
+             record.payload.get(self.SPARSE_TERM_FREQUENCIES_KEY) or {},
+             record.payload.get(self.SPARSE_DOCUMENT_LENGTH_KEY) or 0)
+            for record in candidates.values()
+        )
+
+        document_count = max(self._count_points(filter), len(sparse_documents))
+
+        return self._rank_by_bm25(sparse_documents, matched_terms, document_frequencies, document_count, k)
+
+    def _count_points(self, filter: Optional[Filter]) -> int:
+        """
+        Estimate the points matching the filter, cached for `CORPUS_STATISTICS_TTL` seconds per process.
+        BM25 only needs corpus statistics roughly, exact counts would cost more than the search itself.
+        """
+        key = (self.collection_name, filter.json() if filter else '')
+        with _corpus_statistics_lock:
+            count = _corpus_statistics.get(key)
+        if count is not None:
+            return count
+
+        count = self.client.count(self.collection_name, count_filter=filter, exact=False).count
+        with _corpus_statistics_lock:
+            _corpus_statistics[key] = count
+
+        return count
+
+    def _create_sparse_terms_index_if_needed(self) -> None:
+        """
+        Create the sparse term payload index of collections created before it existed, checked once per process.
+        """
+        if self.collection_name in _sparse_terms_indexed_collections:
+            return
+
+        collection_info = self.client.get_collection(collection_name=self.collection_name)
+        if self.SPARSE_TERMS_KEY not in (collection_info.payload_schema or {}):
+            self.client.create_payload_index(self.collection_name, self.SPARSE_TERMS_KEY,
+                                             field_schema=PayloadSchemaType.KEYWORD)
+
+        _sparse_terms_indexed_collections.add(self.collection_name)
+
+    def _rank_by_bm25(self, sparse_documents: list[tuple[Record, dict, int]], query_terms: list[str],
+                      document_frequencies: dict[str, int], document_count: int, k: int) -> List[Document]:
+        if not sparse_documents:
+            return []
+
+        average_document_length = sum(length for _, _, length in sparse_documents) / len(sparse_documents) or 1
+        idfs = {
+            term: math.log(1 + (document_count - document_frequencies.get(term, 0) + 0.5)
+                           / (document_frequencies.get(term, 0) + 0.5))
+            for term in query_terms
+        }
+
+        scored_records = []
+        for record, term_frequencies, document_length in sparse_documents:
+            length_norm = 1 - BM25_B + BM25_B * document_length / average_document_length
+            score = 0.0
+            for term, idf in idfs.items():
+                term_frequency = term_frequencies.get(term, 0)
+                if term_frequency:
+                    score += idf * term_frequency * (BM25_K1 + 1) / (term_frequency + BM25_K1 * length_norm)
+
+            if score > 0:
+                scored_records.append((score, record))
+
+        documents = []
+        for score, record in heapq.nlargest(k, scored_records, key=lambda item: item[0]):
+            document = self._document_from_scored_point(record, self.content_payload_key, self.metadata_payload_key)
+            document.metadata['score'] = score
+            documents.append(document)
+
+        return documents
+
+    def _scroll(self, filter: Filter, limit: int) -> Iterable[Record]:
+        """Scroll the payload of at most limit points matching the filter, without vectors."""
+        offset = None
+        while limit > 0:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=filter,
+                limit=min(limit, BM25_SCROLL_BATCH_SIZE),
+                offset=offset,
+                with_payload=[
+                    self.content_payload_key,
+                    self.metadata_payload_key,
+                    self.SPARSE_TERM_FREQUENCIES_KEY,
+                    self.SPARSE_DOCUMENT_LENGTH_KEY
+                ],
+                with_vectors=False
+            )
+            yield from records
+            limit -= len(records)
+
+            if offset is None or not records:
+                break
+
+    @staticmethod
+    def _extend_filter(filter: Optional[Filter], *conditions: Condition) -> Filter:
+        if not filter:
+            return Filter(must=list(conditions))
+
+        return Filter(
+            must=list(filter.must or []) + list(conditions),
+            should=filter.should,
+            must_not=filter.must_not
+        )
+
+    @classmethod
+    def _count_sparse_terms(cls, text: str) -> tuple[Counter, int]:
+        """
+        Count the sparse index terms of the text, lowercased JIEBA tokens without stopwords and punctuation.
+        """
+        term_frequencies, document_length = JiebaKeywordTableHandler().count_terms(text.lower())
+
+        return Counter({
+            term: frequency for term, frequency in term_frequencies.items()
+            if term not in STOPWORDS and SUB_TOKEN_PATTERN.search(term)
+        }), document_length
+
+    @classmethod
+    def _build_payloads(
+            cls,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]],
+            content_payload_key: str,
+            metadata_payload_key: str,
+            group_id: str,
+            group_payload_key: str
+    ) -> List[dict]:
+        payloads = super()._build_payloads(
+            texts, metadatas, content_payload_key, metadata_payload_key, group_id, group_payload_key
+        )
+
+        # maintain the sparse term index of every point along with its vector
+        for payload in payloads:
+            term_frequencies, document_length = cls._count_sparse_terms(payload[content_payload_key])
+            payload[cls.SPARSE_TERMS_KEY] = list(term_frequencies.keys())
+            payload[cls.SPARSE_TERM_FREQUENCIES_KEY] = dict(term_frequencies)
+            payload[cls.SPARSE_DOCUMENT_LENGTH_KEY] = document_length
+
+        return payloads
+
     @classmethod
     def _document_from_scored_point(
             cls,
@@ -0,0 +1,483 @@
+"""Embedded vector store keeping normalized float32 vectors in memory-mapped NumPy segments."""
+from __future__ import annotations
+
+import fcntl
+import heapq
+import json
+import mmap
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain.embeddings.base import Embeddings
+from langchain.vectorstores.base import VectorStore
+
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.lock'
+# compact a collection into a single segment once it has more segments than this
+MAX_SEGMENTS = 32
+# compact a collection once more rows are deleted than alive, small collections are left as is
+MIN_COMPACT_DELETED_ROWS = 1000
+
+
+class _Segment:
+    """
+    An immutable batch of rows: a float32 matrix of normalized vectors and a jsonl file of row records.
+    Both files are memory-mapped, only ids, group ids and metadata of the rows are kept in memory.
+    The mappings stay readable after a compaction removed the files.
+    """
+
+    def __init__(self, path: str, seq: int):
+        self.seq = seq
+        self.records_path = os.path.join(path, f'segment_{seq:08d}.jsonl')
+        self.vectors = np.load(os.path.join(path, f'segment_{seq:08d}.npy'), mmap_mode='r')
+        self.ids = []
+        self.metadatas = []
+        self.offsets = []
+
+        with open(self.records_path, 'rb') as f:
+            self.records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        group_ids = []
+        for offset, line in self._iter_lines():
+            record = json.loads(line)
+            self.ids.append(record['id'])
+            group_ids.append(record['group_id'])
+            self.metadatas.append(record['metadata'])
+            self.offsets.append(offset)
+
+        self.group_ids = np.array(group_ids, dtype=object)
+        self.alive = np.ones(len(self.ids), dtype=bool)
+
+    @staticmethod
+    def write(path: str, seq: int, ids: list[str], vectors: np.ndarray, group_ids: list[Optional[str]],
+              texts: list[str], metadatas: list[dict]) -> None:
+        records_path = os.path.join(path, f'segment_{seq:08d}.jsonl')
+        vectors_path = os.path.join(path, f'segment_{seq:08d}.npy')
+
+        with open(records_path + '.tmp', 'w', encoding='utf-8') as f:
+            for id, group_id, text, metadata in zip(ids, group_ids, texts, metadatas):
+                f.write(json.dumps({
+                    'id': id,
+                    'group_id': group_id,
+                    'text': text,
+                    'metadata': metadata
+                }, ensure_ascii=False) + '\n')
+
+        with open(vectors_path + '.tmp', 'wb') as f:
+            np.save(f, vectors)
+
+        os.replace(records_path + '.tmp', records_path)
+        os.replace(vectors_path + '.tmp', vectors_path)
+
+    def read_records(self) -> Iterable[dict]:
+        for _, line in self._iter_lines():
+            yield json.loads(line)
+
+    def read_text(self, row: int) -> str:
+        offset = self.offsets[row]
+        return json.loads(self.records[offset:self.records.find(b'\n', offset) + 1])['text']
+
+    def _iter_lines(self) -> Iterable[tuple[int, bytes]]:
+        # slices only, the mapping is shared by concurrent readers
+        offset = 0
+        while offset < len(self.records):
+            end = self.records.find(b'\n', offset) + 1 or len(self.records)
+            yield offset, self.records[offset:end]
+            offset = end
+
+    def remove_files(self) -> None:
+        for path in [self.records_path, self.records_path[:-len('.jsonl')] + '.npy']:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class LocalVectorCollection:
+    """
+    A collection of vectors stored on local disk, made of append-only segments and a tombstone log.
+
+    Every write creates a new segment or appends deleted ids to the tombstone log, then commits by
+    replacing the manifest. Readers only stat the manifest and the tombstone log, and load what was
+    written since, so the collection stays loaded across searches and across processes.
+    Writes are serialized between processes by a file lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dimension: Optional[int] = None
+        self._lock = threading.RLock()
+        self._segments: list[_Segment] = []
+        self._locations: dict[str, tuple[_Segment, int]] = {}
+        self._manifest_version = None
+        self._tombstones_file = None
+        self._tombstones_offset = 0
+
+    def add(self, ids: list[str], vectors: list[list[float]], group_ids: list[Optional[str]],
+            texts: list[str], metadatas: list[dict]) -> None:
+        if not ids:
+            return
+
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32))
+
+        with self._lock, self._file_lock(exclusive=True):
+            self._load()
+            manifest = self._read_manifest() or {
+                'dimension': vectors.shape[1],
+                'segments': [],
+                'next_segment': 1,
+                'tombstones': 'tombstones_00000000.jsonl'
+            }
+
+            if manifest['dimension'] != vectors.shape[1]:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match "
+                                 f"the collection dimension {manifest['dimension']}.")
+
+            seq = manifest['next_segment']
+            _Segment.write(self.path, seq, ids, vectors, group_ids, texts, metadatas)
+            manifest['segments'].append(seq)
+            manifest['next_segment'] = seq + 1
+            self._write_manifest(manifest)
+            self._load()
+
+            if len(self._segments) > MAX_SEGMENTS:
+                self._compact()
+
+    def delete(self, ids: list[str]) -> None:
+        with self._lock, self._file_lock(exclusive=True):
+            self._load()
+            ids = [id for id in ids if id in self._locations]
+            if not ids:
+                return
+
+            # rows of these ids in this segment or before are deleted
+            tombstone = {'ids': ids, 'segment': self._segments[-1].seq}
+            with open(os.path.join(self.path, self._tombstones_file), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(tombstone) + '\n')
+            self._load()
+
+            deleted_rows = sum(len(segment.ids) for segment in self._segments) - len(self._locations)
+            if deleted_rows > max(len(self._locations), MIN_COMPACT_DELETED_ROWS):
+                self._compact()
+
+    def drop(self) -> None:
+        with self._lock:
+            if os.path.exists(self.path):
+                shutil.rmtree(self.path)
+            self._reset()
+
+    def exists(self, id: str) -> bool:
+        self.refresh()
+        return id in self._locations
+
+    def get_ids_by_metadata_field(self, key: str, value: Any) -> list[str]:
+        self.refresh()
+        with self._lock:
+            return [id for id, (segment, row) in self._locations.items()
+                    if segment.metadatas[row].get(key) == value]
+
+    def get_ids_by_group_id(self, group_id: str) -> list[str]:
+        self.refresh()
+        with self._lock:
+            return [id for id, (segment, row) in self._locations.items()
+                    if segment.group_ids[row] == group_id]
+
+    def search(self, vector: list[float], k: int, group_ids: Optional[list[str]] = None,
+               score_threshold: Optional[float] = None) -> list[tuple[str, str, dict, float]]:
+        """
+        Top k rows by cosine similarity to the vector.
+
+        :param vector: query vector
+        :param k: number of rows to return
+        :param group_ids: only search rows of these groups
+        :param score_threshold: only return rows scored at least this
+        :return: id, text, metadata and score of every row, best first
+        """
+        self.refresh()
+
+        with self._lock:
+            segments = list(self._segments)
+            dimension = self.dimension
+
+        if not segments or k <= 0:
+            return []
+
+        query = self._normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        if query.shape[0] != dimension:
+            raise ValueError(f"Vector dimension {query.shape[0]} does not match the collection dimension {dimension}.")
+
+        candidates = []
+        for segment in segments:
+            mask = segment.alive
+            if group_ids is not None:
+                mask = mask & np.isin(segment.group_ids, group_ids)
+
+            scores = segment.vectors @ query
+            if score_threshold is not None:
+                mask = mask & (scores >= score_threshold)
+
+            rows = np.flatnonzero(mask)
+            if len(rows) > k:
+                rows = rows[np.argpartition(scores[rows], -k)[-k:]]
+
+            candidates.extend((float(scores[row]), segment, row) for row in rows)
+
+        return [
+            (segment.ids[row], segment.read_text(row), segment.metadatas[row], score)
+            for score, segment, row in heapq.nlargest(k, candidates, key=lambda item: item[0])
+        ]
+
+    def refresh(self) -> None:
+        """
+        Load the segments and tombstones written since the last refresh, by this or other processes.
+        """
+        with self._lock:
+            if self._manifest_version == self._get_manifest_version() \
+                    and self._tombstones_offset == self._get_tombstones_size():
+                return
+
+            with self._file_lock(exclusive=False):
+                self._load()
+
+    def _load(self) -> None:
+        manifest_version = self._get_manifest_version()
+        manifest = self._read_manifest()
+        if not manifest:
+            self._reset()
+            self._manifest_version = manifest_version
+            return
+
+        loaded_seqs = [segment.seq for segment in self._segments]
+        if manifest['tombstones'] != self._tombstones_file \
+                or manifest['segments'][:len(loaded_seqs)] != loaded_seqs:
+            # the collection was compacted
+            self._reset()
+            loaded_seqs = []
+
+        self.dimension = manifest['dimension']
+        self._tombstones_file = manifest['tombstones']
+
+        for seq in manifest['segments'][len(loaded_seqs):]:
+            segment = _Segment(self.path, seq)
+            for row, id in enumerate(segment.ids):
+                self._remove_location(id)
+                self._locations[id] = (segment, row)
+            self._segments.append(segment)
+
+        self._load_tombstones()
+        self._manifest_version = manifest_version
+
+    def _load_tombstones(self) -> None:
+        tombstones_path = os.path.join(self.path, self._tombstones_file)
+        if not os.path.exists(tombstones_path):
+            return
+
+        last_seq = self._segments[-1].seq if self._segments else 0
+        with open(tombstones_path, 'rb') as f:
+            f.seek(self._tombstones_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # partially written
+                    break
+
+                tombstone = json.loads(line)
+                if tombstone['segment'] > last_seq:
+                    # refers to a segment committed after the manifest was read
+                    break
+
+                for id in tombstone['ids']:
+                    location = self._locations.get(id)
+                    if location and location[0].seq <= tombstone['segment']:
+                        self._remove_location(id)
+
+                self._tombstones_offset += len(line)
+
+    def _compact(self) -> None:
+        """Rewrite the alive rows into a single segment, and start a new tombstone log."""
+        manifest = self._read_manifest()
+        seq = manifest['next_segment']
+
+        ids, vectors, group_ids, texts, metadatas = [], [], [], [], []
+        for segment in self._segments:
+            if not segment.alive.any():
+                continue
+
+            vectors.append(np.asarray(segment.vectors[segment.alive]))
+            for row, record in enumerate(segment.read_records()):
+                if segment.alive[row]:
+                    ids.append(record['id'])
+                    group_ids.append(record['group_id'])
+                    texts.append(record['text'])
+                    metadatas.append(record['metadata'])
+
+        if ids:
+            _Segment.write(self.path, seq, ids, np.concatenate(vectors), group_ids, texts, metadatas)
+
+        old_segments = self._segments
+        old_tombstones_path = os.path.join(self.path, self._tombstones_file)
+        self._write_manifest({
+            'dimension': manifest['dimension'],
+            'segments': [seq] if ids else [],
+            'next_segment': seq + 1,
+            'tombstones': f'tombstones_{seq:08d}.jsonl'
+        })
+
+        # files stay readable by other processes which still have them mapped
+        for segment in old_segments:
+            segment.remove_files()
+        if os.path.exists(old_tombstones_path):
+            os.remove(old_tombstones_path)
+
+        self._load()
+
+    def _remove_location(self, id: str) -> None:
+        location = self._locations.pop(id, None)
+        if location:
+            segment, row = location
+            segment.alive[row] = False
+
+    def _reset(self) -> None:
+        self.dimension = None
+        self._segments = []
+        self._locations = {}
+        self._manifest_version = None
+        self._tombstones_file = None
+        self._tombstones_offset = 0
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.path, MANIFEST_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest: dict) -> None:
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    def _get_manifest_version(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.path, MANIFEST_FILE))
+        except FileNotFoundError:
+            return None
+
+        # the manifest is replaced on every commit, so a new inode means a new version
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _get_tombstones_size(self) -> int:
+        if not self._tombstones_file:
+            return 0
+
+        try:
+            return os.path.getsize(os.path.join(self.path, self._tombstones_file))
+        except FileNotFoundError:
+            return 0
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+
+class Local(VectorStore):
+    """Wrapper around a local vector collection, rows are scoped to a group like a dataset."""
+
+    def __init__(self, collection: LocalVectorCollection, embeddings: Embeddings, group_id: Optional[str] = None):
+        self._collection = collection
+        self._embeddings = embeddings
+        self._group_id = group_id
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings
+
+    def add_texts(
+            self,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]] = None,
+            ids: Optional[List[str]] = None,
+            **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+
+        ids = ids or kwargs.get('uuids') or [uuid4().hex for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        embeddings = self._embeddings.embed_documents(texts)
+
+        self._collection.add(ids, embeddings, [self._group_id] * len(texts), texts, metadatas)
+
+        return ids
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_with_score(
+            self,
+            query: str,
+            k: int = 4,
+            filter: Optional[dict] = None,
+            score_threshold: Optional[float] = None,
+            **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        embedding = self._embeddings.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, filter, score_threshold)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score_by_vector(
+            self,
+            embedding: List[float],
+            k: int = 4,
+            filter: Optional[dict] = None,
+            score_threshold: Optional[float] = None,
+            **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        group_ids = (filter or {}).get('group_id')
+        if isinstance(group_ids, str):
+            group_ids = [group_ids]
+
+        results = self._collection.search(embedding, k, group_ids, score_threshold)
+
+        return [(Document(page_content=text, metadata=metadata), score) for _, text, metadata, score in results]
+
+    def _similarity_search_with_relevance_scores(self, query: str, k: int = 4, **kwargs: Any) \
+            -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score(query, k, **kwargs)
+
+    @classmethod
+    def from_texts(
+            cls,
+            texts: List[str],
+            embedding: Embeddings,
+            metadatas: Optional[List[dict]] = None,
+            collection: Optional[LocalVectorCollection] = None,
+            group_id: Optional[str] = None,
+            **kwargs: Any,
+    ) -> Local:
+        if collection is None:
+            raise ValueError('collection must be specified')
+
+        local = cls(collection, embedding, group_id)
+        local.add_texts(texts, metadatas, **kwargs)
+
+        return local
@@ -6,6 +6,7 @@ from typing import Any, Iterable, List, Optional, Sequence, Tuple, Union
 from uuid import uuid4
 
 import numpy as np
+from core.embedding.embedding_codec import to_float_list
 from langchain.docstore.document import Document
 from langchain.embeddings.base import Embeddings
 from langchain.vectorstores.base import VectorStore
@@ -170,6 +171,22 @@ class Milvus(VectorStore):
         return self.embedding_func
 
     def _create_connection_alias(self, connection_args: dict) -> str:
+        """Get the connection to the Milvus server, shared by the whole process."""
+        from core.vector_store.client_registry import vector_client_registry
+        from pymilvus import connections
+
+        key = vector_client_registry.build_key('milvus', sorted(connection_args.items()))
+
+        return vector_client_registry.get_client(
+            key=key,
+            factory=lambda: self._connect(connection_args),
+            health_check=connections.has_connection,
+            close=connections.disconnect,
+            owner=self
+        )
+
+    @staticmethod
+    def _connect(connection_args: dict) -> str:
         """Create the connection to the Milvus server."""
         from pymilvus import MilvusException, connections
 
@@ -418,7 +435,7 @@ class Milvus(VectorStore):
         try:
             embeddings = self.embedding_func.embed_documents(texts)
         except NotImplementedError:
-            embeddings = [self.embedding_func.embed_query(x) for x in texts]
+            embeddings = [to_float_list(self.embedding_func.embed_query(x)) for x in texts]
 
         if len(embeddings) == 0:
             logger.debug("Nothing to insert, skipping.")
@@ -565,7 +582,7 @@ class Milvus(VectorStore):
             return []
 
         # Embed the query text.
-        embedding = self.embedding_func.embed_query(query)
+        embedding = to_float_list(self.embedding_func.embed_query(query))
 
         res = self.similarity_search_with_score_by_vector(
             embedding=embedding, k=k, param=param, expr=expr, timeout=timeout, **kwargs
@@ -691,7 +708,7 @@ class Milvus(VectorStore):
             logger.debug("No existing collection to search.")
             return []
 
-        embedding = self.embedding_func.embed_query(query)
+        embedding = to_float_list(self.embedding_func.embed_query(query))
 
         return self.max_marginal_relevance_search_by_vector(
             embedding=embedding,
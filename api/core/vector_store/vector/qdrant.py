@@ -10,6 +10,7 @@ from operator import itemgetter
 from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, Iterable, List, Optional, Sequence, Tuple, Type, Union
 
 import numpy as np
+from core.embedding.embedding_codec import to_float_list
 from langchain.docstore.document import Document
 from langchain.embeddings.base import Embeddings
 from langchain.vectorstores import VectorStore
@@ -72,6 +73,7 @@ class Qdrant(VectorStore):
     CONTENT_KEY = "page_content"
     METADATA_KEY = "metadata"
     GROUP_KEY = "group_id"
+    SPARSE_TERMS_KEY = "sparse_terms"
     VECTOR_NAME = None
 
     def __init__(
@@ -194,6 +196,9 @@ class Qdrant(VectorStore):
             )
             self.client.create_payload_index(self.collection_name, self.content_payload_key,
                                              field_schema=text_index_params)
+            # create sparse term index for bm25 full text search
+            self.client.create_payload_index(self.collection_name, self.SPARSE_TERMS_KEY,
+                                             field_schema=PayloadSchemaType.KEYWORD)
         return added_ids
 
     @sync_call_fallback
@@ -410,7 +415,7 @@ class Qdrant(VectorStore):
             List of documents most similar to the query text and distance for each.
         """
         return await self.asimilarity_search_with_score_by_vector(
-            self._embed_query(query),
+            self._embed_query(query, as_list=True),
             k,
             filter=filter,
             search_params=search_params,
@@ -612,39 +617,6 @@ class Qdrant(VectorStore):
             for result in results
         ]
 
-    def similarity_search_by_bm25(
-        self,
-        filter: Optional[MetadataFilter] = None,
-        k: int = 4
-    ) -> List[Document]:
-        """Return docs most similar by bm25.
-
-        Args:
-            embedding: Embedding vector to look up documents similar to.
-            k: Number of Documents to return. Defaults to 4.
-            filter: Filter by metadata. Defaults to None.
-            search_params: Additional search params
-        Returns:
-            List of documents most similar to the query text and distance for each.
-        """
-        response = self.client.scroll(
-            collection_name=self.collection_name,
-            scroll_filter=filter,
-            limit=k,
-            with_payload=True,
-            with_vectors=True
-
-        )
-        results = response[0]
-        documents = []
-        for result in results:
-            if result:
-                documents.append(self._document_from_scored_point(
-                        result, self.content_payload_key, self.metadata_payload_key
-                    ))
-
-        return documents
-
     @sync_call_fallback
     async def asimilarity_search_with_score_by_vector(
         self,
@@ -790,7 +762,7 @@ class Qdrant(VectorStore):
         Returns:
             List of Documents selected by maximal marginal relevance.
         """
-        query_embedding = self._embed_query(query)
+        query_embedding = self._embed_query(query, as_list=True)
         return await self.amax_marginal_relevance_search_by_vector(
             query_embedding, k, fetch_k, lambda_mult, **kwargs
         )
@@ -1387,6 +1359,7 @@ class Qdrant(VectorStore):
         quantization_config: Optional[common_types.QuantizationConfig] = None,
         init_from: Optional[common_types.InitFrom] = None,
         force_recreate: bool = False,
+        client: Optional[Any] = None,
         **kwargs: Any,
     ) -> Qdrant:
         try:
@@ -1406,20 +1379,22 @@ class Qdrant(VectorStore):
         collection_name = collection_name or uuid.uuid4().hex
         distance_func = distance_func.upper()
         is_new_collection = False
-        client = qdrant_client.QdrantClient(
-            location=location,
-            url=url,
-            port=port,
-            grpc_port=grpc_port,
-            prefer_grpc=prefer_grpc,
-            https=https,
-            api_key=api_key,
-            prefix=prefix,
-            timeout=timeout,
-            host=host,
-            path=path,
-            **kwargs,
-        )
+        # reuse the given client, e.g. a long-lived one from the client registry
+        if client is None:
+            client = qdrant_client.QdrantClient(
+                location=location,
+                url=url,
+                port=port,
+                grpc_port=grpc_port,
+                prefer_grpc=prefer_grpc,
+                https=https,
+                api_key=api_key,
+                prefix=prefix,
+                timeout=timeout,
+                host=host,
+                path=path,
+                **kwargs,
+            )
         all_collection_name = []
         collections_response = client.get_collections()
         collection_list = collections_response.collections
@@ -1667,16 +1642,17 @@ class Qdrant(VectorStore):
             ]
         )
 
-    def _embed_query(self, query: str) -> List[float]:
+    def _embed_query(self, query: str, as_list: bool = False) -> Union[np.ndarray, List[float]]:
         """Embed query text.
 
         Used to provide backward compatibility with `embedding_function` argument.
 
         Args:
             query: Query text.
+            as_list: Return a list, for the gRPC client.
 
         Returns:
-            List of floats representing the query embedding.
+            The query embedding, qdrant-client takes numpy arrays for unnamed vectors.
         """
         if self.embeddings is not None:
             embedding = self.embeddings.embed_query(query)
@@ -1685,7 +1661,11 @@ class Qdrant(VectorStore):
                 embedding = self._embeddings_function(query)
             else:
                 raise ValueError("Neither of embeddings or embedding_function is set")
-        return embedding.tolist() if hasattr(embedding, "tolist") else embedding
+
+        if as_list or self.vector_name is not None:
+            return to_float_list(embedding)
+
+        return embedding
 
     def _embed_texts(self, texts: Iterable[str]) -> List[List[float]]:
         """Embed search texts.
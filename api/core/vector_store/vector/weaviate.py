@@ -2,10 +2,13 @@
 from __future__ import annotations
 
 import datetime
+import threading
 from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
 from uuid import uuid4
+from weakref import WeakKeyDictionary
 
 import numpy as np
+from core.embedding.embedding_codec import to_float_list
 from langchain.docstore.document import Document
 from langchain.embeddings.base import Embeddings
 from langchain.utils import get_from_dict_or_env
@@ -13,6 +16,21 @@ from langchain.vectorstores.base import VectorStore
 from langchain.vectorstores.utils import maximal_marginal_relevance
 
 
+# clients are shared across threads, while the batch of a client is stateful
+_batch_locks: WeakKeyDictionary = WeakKeyDictionary()
+_batch_locks_lock = threading.Lock()
+
+
+def _get_batch_lock(client: Any) -> threading.Lock:
+    with _batch_locks_lock:
+        lock = _batch_locks.get(client)
+        if lock is None:
+            lock = threading.Lock()
+            _batch_locks[client] = lock
+
+        return lock
+
+
 def _default_schema(index_name: str) -> Dict:
     return {
         "class": index_name,
@@ -144,7 +162,7 @@ class Weaviate(VectorStore):
                 texts = list(texts)
             embeddings = self._embedding.embed_documents(texts)
 
-        with self._client.batch as batch:
+        with _get_batch_lock(self._client), self._client.batch as batch:
             for i, text in enumerate(texts):
                 data_properties = {self._text_key: text}
                 if metadatas is not None:
@@ -190,7 +208,7 @@ class Weaviate(VectorStore):
                     "_embedding cannot be None for similarity_search when "
                     "_by_text=False"
                 )
-            embedding = self._embedding.embed_query(query)
+            embedding = to_float_list(self._embedding.embed_query(query))
             return self.similarity_search_by_vector(embedding, k, **kwargs)
 
     def similarity_search_by_text(
@@ -297,7 +315,7 @@ class Weaviate(VectorStore):
             List of Documents selected by maximal marginal relevance.
         """
         if self._embedding is not None:
-            embedding = self._embedding.embed_query(query)
+            embedding = to_float_list(self._embedding.embed_query(query))
         else:
             raise ValueError(
                 "max_marginal_relevance_search requires a suitable Embeddings object"
@@ -374,7 +392,7 @@ class Weaviate(VectorStore):
             content["certainty"] = kwargs.get("search_distance")
         query_obj = self._client.query.get(self._index_name, self._query_attrs)
 
-        embedded_query = self._embedding.embed_query(query)
+        embedded_query = to_float_list(self._embedding.embed_query(query))
         if not self._by_text:
             vector = {"vector": embedded_query}
             result = (
@@ -445,7 +463,7 @@ class Weaviate(VectorStore):
         if not client.schema.contains(schema):
             client.schema.create_class(schema)
 
-        with client.batch as batch:
+        with _get_batch_lock(client), client.batch as batch:
             for i, text in enumerate(texts):
                 data_properties = {
                     text_key: text,
@@ -12,6 +12,16 @@ class WeaviateVectorStore(Weaviate):
             output='minimal'
         )
 
+    def del_texts_by_ids(self, uuids: list[str]) -> None:
+        self.del_texts({
+            "operator": "Or",
+            "operands": [{
+                "path": ["id"],
+                "operator": "Equal",
+                "valueText": uuid
+            } for uuid in uuids]
+        })
+
     def del_text(self, uuid: str) -> None:
         self._client.data_object.delete(
             uuid,
@@ -1,8 +1,11 @@
+import logging
+
 from core.entities.application_entities import ApplicationGenerateEntity
 from core.entities.provider_entities import QuotaUnit
+from core.helper.model_provider_cache import ProviderConfigurationsCache
+from core.helper.provider_usage_buffer import ProviderUsageBuffer
 from events.message_event import message_was_created
-from extensions.ext_database import db
-from models.provider import Provider, ProviderType
+from models.provider import ProviderType
 
 
 @message_was_created.connect
@@ -20,9 +23,11 @@ def handle(sender, **kwargs):
     system_configuration = provider_configuration.system_configuration
 
     quota_unit = None
+    current_quota_configuration = None
     for quota_configuration in system_configuration.quota_configurations:
         if quota_configuration.quota_type == system_configuration.current_quota_type:
             quota_unit = quota_configuration.quota_unit
+            current_quota_configuration = quota_configuration
 
             if quota_configuration.quota_limit == -1:
                 return
@@ -42,11 +47,27 @@ def handle(sender, **kwargs):
             used_quota = 1
 
     if used_quota is not None:
-        db.session.query(Provider).filter(
-            Provider.tenant_id == application_generate_entity.tenant_id,
-            Provider.provider_name == model_config.provider,
-            Provider.provider_type == ProviderType.SYSTEM.value,
-            Provider.quota_type == system_configuration.current_quota_type.value,
-            Provider.quota_limit > Provider.quota_used
-        ).update({'quota_used': Provider.quota_used + used_quota})
-        db.session.commit()
+        # written with the used quota of other messages every few seconds
+        ProviderUsageBuffer.add_used_quota(
+            tenant_id=application_generate_entity.tenant_id,
+            provider_name=model_config.provider,
+            quota_type=system_configuration.current_quota_type.value,
+            used_quota=used_quota
+        )
+
+        # account the quota used since the cached provider configurations were built,
+        # and drop them once the quota is used up
+        quota_used_since_cached = ProviderConfigurationsCache(application_generate_entity.tenant_id).add_used_quota(
+            provider_name=model_config.provider,
+            quota_type=system_configuration.current_quota_type.value,
+            used_quota=used_quota
+        )
+        if current_quota_configuration.quota_used + quota_used_since_cached >= current_quota_configuration.quota_limit:
+            # write the buffered quota before the provider configurations are rebuilt from the records,
+            # the message is already saved, so a failed write is left to the next periodic flush
+            try:
+                ProviderUsageBuffer.flush()
+            except Exception:
+                logging.exception('Failed to write provider usage')
+
+            ProviderConfigurationsCache(application_generate_entity.tenant_id).delete()
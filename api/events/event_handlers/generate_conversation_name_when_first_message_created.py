@@ -1,6 +1,5 @@
-from core.generator.llm_generator import LLMGenerator
 from events.message_event import message_was_created
-from extensions.ext_database import db
+from tasks.generate_conversation_name_task import generate_conversation_name_task
 
 
 @message_was_created.connect
@@ -16,15 +15,5 @@ def handle(sender, **kwargs):
 
     if auto_generate_conversation_name and is_first_message:
         if conversation.mode == 'chat':
-            app_model = conversation.app
-            if not app_model:
-                return
-
-            # generate conversation name
-            try:
-                name = LLMGenerator.generate_conversation_name(app_model.tenant_id, message.query)
-                conversation.name = name
-            except:
-                pass
-
-            db.session.commit()
+            # the llm call to generate the name is made by the worker, off the response
+            generate_conversation_name_task.delay(conversation.id, message.query)
@@ -119,6 +119,21 @@ class Storage:
 
             shutil.copyfile(filename, target_filepath)
 
+    def upload(self, filename, source_filepath):
+        if self.storage_type == 's3':
+            with closing(self.client) as client:
+                client.upload_file(source_filepath, self.bucket_name, filename)
+        else:
+            if not self.folder or self.folder.endswith('/'):
+                filename = self.folder + filename
+            else:
+                filename = self.folder + '/' + filename
+
+            folder = os.path.dirname(filename)
+            os.makedirs(folder, exist_ok=True)
+
+            shutil.copyfile(source_filepath, filename)
+
     def exists(self, filename):
         if self.storage_type == 's3':
             with closing(self.client) as client:
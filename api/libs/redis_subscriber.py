@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class RedisSubscriber:
+    """
+    Process-wide redis pub/sub subscriber, one connection and one daemon thread serve every channel.
+
+    Every channel registers a message callback, called with the data of each message published to it,
+    and a resync callback, called once the channel is subscribed, after connecting and after every reconnect,
+    to catch up on messages missed while not subscribed. Until then `is_subscribed` is false, and callers
+    must not rely on the messages of the channel.
+    """
+    # seconds to wait for a message before newly registered channels are subscribed
+    POLL_INTERVAL = 1.0
+
+    # channel -> (message callback, resync callback)
+    _handlers: dict[str, tuple[Callable[[bytes], None], Callable[[], None]]] = {}
+    _subscribed_channels: set[str] = set()
+    _lock = threading.Lock()
+    _listener: Optional[threading.Thread] = None
+
+    @classmethod
+    def subscribe(cls, channel: str, on_message: Callable[[bytes], None], on_resync: Callable[[], None]) -> None:
+        """
+        Register the callbacks of a channel once and make sure the listener is running.
+
+        :param channel: channel name
+        :param on_message: called with the data of every message of the channel
+        :param on_resync: called whenever the channel is (re)subscribed
+        :return:
+        """
+        if channel in cls._handlers and cls._listener and cls._listener.is_alive():
+            return
+
+        with cls._lock:
+            cls._handlers.setdefault(channel, (on_message, on_resync))
+
+            if cls._listener and cls._listener.is_alive():
+                return
+
+            cls._listener = threading.Thread(target=cls._listen, daemon=True)
+            cls._listener.start()
+
+    @classmethod
+    def is_subscribed(cls, channel: str) -> bool:
+        """
+        Check if the messages of the channel are currently delivered.
+
+        :param channel: channel name
+        :return:
+        """
+        with cls._lock:
+            return channel in cls._subscribed_channels
+
+    @classmethod
+    def _listen(cls) -> None:
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                while True:
+                    with cls._lock:
+                        new_channels = [channel for channel in cls._handlers if channel not in cls._subscribed_channels]
+
+                    for channel in new_channels:
+                        pubsub.subscribe(channel)
+                        # messages may have been missed while not subscribed
+                        cls._handlers[channel][1]()
+                        with cls._lock:
+                            cls._subscribed_channels.add(channel)
+
+                    message = pubsub.get_message(timeout=cls.POLL_INTERVAL)
+                    if not message or message.get('type') != 'message':
+                        continue
+
+                    channel = message['channel']
+                    channel = channel.decode('utf-8') if isinstance(channel, bytes) else channel
+                    handlers = cls._handlers.get(channel)
+                    if not handlers:
+                        continue
+
+                    try:
+                        handlers[0](message['data'])
+                    except Exception:
+                        logger.exception(f'Failed to handle message of redis channel {channel}')
+            except Exception:
+                logger.exception('Redis subscriber disconnected')
+            finally:
+                with cls._lock:
+                    cls._subscribed_channels.clear()
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+            time.sleep(1)
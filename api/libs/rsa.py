@@ -1,12 +1,25 @@
 # -*- coding:utf-8 -*-
 import hashlib
+import logging
+import threading
 
 import libs.gmpy2_pkcs10aep_cipher as gmpy2_pkcs10aep_cipher
+from cachetools import TTLCache
 from Crypto.Cipher import AES
 from Crypto.PublicKey import RSA
 from Crypto.Random import get_random_bytes
 from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
+from libs.redis_subscriber import RedisSubscriber
+
+logger = logging.getLogger(__name__)
+
+# parsed private keys and ciphers by tenant id, so a key is not fetched and imported on every decrypt.
+# a key pair reset is published to all processes, the cache is only used while subscribed,
+# and never kept longer than the redis copy of the private key
+_decrypt_decoding_cache = TTLCache(maxsize=1024, ttl=120)
+_decrypt_decoding_cache_lock = threading.Lock()
+_decrypt_decoding_invalidated_channel = 'tenant_privkey_invalidated'
 
 
 def generate_key_pair(tenant_id):
@@ -20,6 +33,13 @@ def generate_key_pair(tenant_id):
 
     storage.save(filepath, pem_private)
 
+    redis_client.delete(_get_private_key_cache_key(filepath))
+    invalidate_decrypt_decoding(tenant_id)
+    try:
+        redis_client.publish(_decrypt_decoding_invalidated_channel, tenant_id)
+    except Exception:
+        logger.exception('Failed to publish private key invalidation')
+
     return pem_public.decode()
 
 
@@ -45,10 +65,22 @@ def encrypt(text, public_key):
     return prefix_hybrid + encrypted_data
 
 
+def _get_private_key_cache_key(filepath):
+    return 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+
+
 def get_decrypt_decoding(tenant_id):
+    _ensure_decrypt_decoding_subscriber()
+
+    subscribed = RedisSubscriber.is_subscribed(_decrypt_decoding_invalidated_channel)
+    with _decrypt_decoding_cache_lock:
+        decrypt_decoding = _decrypt_decoding_cache.get(tenant_id) if subscribed else None
+    if decrypt_decoding:
+        return decrypt_decoding
+
     filepath = "privkeys/{tenant_id}".format(tenant_id=tenant_id) + "/private.pem"
 
-    cache_key = 'tenant_privkey:{hash}'.format(hash=hashlib.sha3_256(filepath.encode()).hexdigest())
+    cache_key = _get_private_key_cache_key(filepath)
     private_key = redis_client.get(cache_key)
     if not private_key:
         try:
@@ -61,9 +93,32 @@ def get_decrypt_decoding(tenant_id):
     rsa_key = RSA.import_key(private_key)
     cipher_rsa = gmpy2_pkcs10aep_cipher.new(rsa_key)
 
+    with _decrypt_decoding_cache_lock:
+        _decrypt_decoding_cache[tenant_id] = (rsa_key, cipher_rsa)
+
     return rsa_key, cipher_rsa
 
 
+def invalidate_decrypt_decoding(tenant_id):
+    with _decrypt_decoding_cache_lock:
+        _decrypt_decoding_cache.pop(tenant_id, None)
+
+
+def _ensure_decrypt_decoding_subscriber():
+    RedisSubscriber.subscribe(_decrypt_decoding_invalidated_channel,
+                              _on_decrypt_decoding_invalidated, _on_decrypt_decoding_resync)
+
+
+def _on_decrypt_decoding_invalidated(tenant_id):
+    invalidate_decrypt_decoding(tenant_id.decode() if isinstance(tenant_id, bytes) else tenant_id)
+
+
+def _on_decrypt_decoding_resync():
+    # invalidations may have been missed while not subscribed
+    with _decrypt_decoding_cache_lock:
+        _decrypt_decoding_cache.clear()
+
+
 def decrypt_token_with_decoding(encrypted_text, rsa_key, cipher_rsa):
     if encrypted_text.startswith(prefix_hybrid):
         encrypted_text = encrypted_text[len(prefix_hybrid):]
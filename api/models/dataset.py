@@ -443,11 +443,39 @@ class DatasetKeywordTable(db.Model):
         return json.loads(self.keyword_table, cls=SetDecoder) if self.keyword_table else None
 
 
+class DatasetKeywordPosting(db.Model):
+    __tablename__ = 'dataset_keyword_postings'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_posting_pkey'),
+        db.UniqueConstraint('dataset_id', 'keyword', 'index_node_id', name='dataset_keyword_posting_keyword_idx'),
+        db.Index('dataset_keyword_posting_node_idx', 'dataset_id', 'index_node_id'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False)
+    keyword = db.Column(db.String(255), nullable=False)
+    index_node_id = db.Column(db.String(255), nullable=False)
+    term_frequency = db.Column(db.Integer, nullable=False, server_default=db.text('1'))
+    document_length = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+
+
+class DatasetKeywordStatistics(db.Model):
+    __tablename__ = 'dataset_keyword_statistics'
+    __table_args__ = (
+        db.PrimaryKeyConstraint('id', name='dataset_keyword_statistics_pkey'),
+    )
+
+    id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
+    dataset_id = db.Column(UUID, nullable=False, unique=True)
+    document_count = db.Column(db.Integer, nullable=False, server_default=db.text('0'))
+    total_document_length = db.Column(db.BigInteger, nullable=False, server_default=db.text('0'))
+
+
 class Embedding(db.Model):
     __tablename__ = 'embeddings'
     __table_args__ = (
         db.PrimaryKeyConstraint('id', name='embedding_pkey'),
-        db.UniqueConstraint('model_name', 'hash', name='embedding_hash_idx')
+        db.UniqueConstraint('model_name', 'hash', 'provider_name', name='embedding_hash_idx')
     )
 
     id = db.Column(UUID, primary_key=True, server_default=db.text('uuid_generate_v4()'))
@@ -456,6 +484,8 @@ class Embedding(db.Model):
     hash = db.Column(db.String(64), nullable=False)
     embedding = db.Column(db.LargeBinary, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.text('CURRENT_TIMESTAMP(0)'))
+    provider_name = db.Column(db.String(40), nullable=False,
+                              server_default=db.text("''::character varying"))
 
     def set_embedding(self, embedding_data: list[float]):
         self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
@@ -1,5 +1,5 @@
 import json
-from typing import Any, Generator, Union
+from typing import Any, Generator, Optional, Union
 
 from core.application_manager import ApplicationManager
 from core.entities.application_entities import InvokeFrom
@@ -9,6 +9,7 @@ from models.model import Account, App, AppModelConfig, Conversation, EndUser, Me
 from services.app_model_config_service import AppModelConfigService
 from services.errors.app import MoreLikeThisDisabledError
 from services.errors.app_model_config import AppModelConfigBrokenError
+from services.errors.completion import CompletionTaskNotExistsError
 from services.errors.conversation import ConversationCompletedError, ConversationNotExistsError
 from services.errors.message import MessageNotExistsError
 from sqlalchemy import and_
@@ -211,6 +212,25 @@ class CompletionService:
             }
         )
 
+    @classmethod
+    def resume_stream(cls, task_id: str, user: Union[Account, EndUser], invoke_from: InvokeFrom,
+                      last_event_id: Optional[str] = None) -> Generator:
+        if not user:
+            raise ValueError('user cannot be None')
+
+        application_manager = ApplicationManager()
+        response = application_manager.resume_stream(
+            task_id=task_id,
+            user=user,
+            invoke_from=invoke_from,
+            last_event_id=last_event_id
+        )
+
+        if response is None:
+            raise CompletionTaskNotExistsError()
+
+        return response
+
     @classmethod
     def get_cleaned_inputs(cls, user_inputs: dict, app_model_config: AppModelConfig):
         if user_inputs is None:
@@ -3,3 +3,7 @@ from services.errors.base import BaseServiceError
 
 class CompletionStoppedError(BaseServiceError):
     pass
+
+
+class CompletionTaskNotExistsError(BaseServiceError):
+    pass
@@ -0,0 +1,42 @@
+import logging
+import time
+
+import click
+from celery import shared_task
+from core.generator.llm_generator import LLMGenerator
+from extensions.ext_database import db
+from models.model import Conversation
+
+
+@shared_task(queue='generation')
+def generate_conversation_name_task(conversation_id: str, query: str):
+    """
+    Async generate the name of a conversation from its first query,
+    the name is not set yet when the response of the first message ends
+    :param conversation_id:
+    :param query:
+
+    Usage: generate_conversation_name_task.delay(conversation_id, query)
+    """
+    logging.info(click.style('Start generate conversation name: {}'.format(conversation_id), fg='green'))
+    start_at = time.perf_counter()
+
+    conversation = db.session.query(Conversation).filter(Conversation.id == conversation_id).first()
+    if not conversation:
+        return
+
+    app_model = conversation.app
+    if not app_model:
+        return
+
+    try:
+        name = LLMGenerator.generate_conversation_name(app_model.tenant_id, query)
+        conversation.name = name
+        db.session.commit()
+    except Exception:
+        logging.exception("generate conversation name failed")
+        return
+
+    end_at = time.perf_counter()
+    logging.info(click.style('Conversation name generated: {} latency: {}'.format(conversation_id, end_at - start_at),
+                             fg='green'))
@@ -0,0 +1,152 @@
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+from core.app_runner import generate_task_pipeline
+from core.app_runner.generate_task_pipeline import GenerateTaskPipeline
+from core.entities.queue_entities import QueueAgentMessageEvent, QueueMessageEvent, QueuePingEvent
+from core.model_runtime.entities.llm_entities import LLMResultChunk, LLMResultChunkDelta
+from core.model_runtime.entities.message_entities import AssistantPromptMessage
+from flask import Flask
+
+TEXTS = ['', 'Hello', ' world', '"quoted"', 'back\\slash', 'tab\tnew\nline\r', '\x00\x1f', '你好', '🙂', ' ',
+         '"answer": ""']
+
+
+class FakeQueueManager:
+    def __init__(self, messages: list):
+        self._messages = messages
+
+    def listen(self, idle_interval: Optional[float] = None):
+        for message in self._messages:
+            if message is None and not idle_interval:
+                continue
+
+            yield message
+
+
+def _message(text: str, agent: bool = False) -> SimpleNamespace:
+    chunk = LLMResultChunk(
+        model='model',
+        prompt_messages=[],
+        delta=LLMResultChunkDelta(index=0, message=AssistantPromptMessage(content=text))
+    )
+    event = QueueAgentMessageEvent(chunk=chunk) if agent else QueueMessageEvent(chunk=chunk)
+    return SimpleNamespace(event=event)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def _create_pipeline(messages: list, mode: str = 'chat') -> GenerateTaskPipeline:
+    application_generate_entity = SimpleNamespace(
+        task_id='task',
+        app_orchestration_config_entity=SimpleNamespace(
+            model_config=SimpleNamespace(model='model'),
+            sensitive_word_avoidance=None
+        )
+    )
+
+    return GenerateTaskPipeline(
+        application_generate_entity=application_generate_entity,
+        queue_manager=FakeQueueManager(messages),
+        conversation=SimpleNamespace(id='conversation', mode=mode),
+        message=SimpleNamespace(id='message', created_at=datetime(2024, 1, 1))
+    )
+
+
+def _chunk_frame(pipeline: GenerateTaskPipeline, text: str, agent: bool = False) -> str:
+    # the frame as encoded before chunk frames were built from a cached prefix and suffix
+    return pipeline._yield_response(pipeline._handle_chunk(text, agent=agent))
+
+
+@pytest.mark.parametrize('mode', ['chat', 'completion'])
+@pytest.mark.parametrize('agent', [False, True])
+def test_chunk_frames_are_byte_identical(app, mode, agent):
+    pipeline = _create_pipeline([], mode=mode)
+
+    for text in TEXTS:
+        assert pipeline._yield_chunk(text, agent=agent).encode() == _chunk_frame(pipeline, text, agent).encode()
+
+
+def test_one_frame_per_chunk_without_coalescing(app):
+    messages = [_message('Hello'), _message(' "world"', agent=True), None, SimpleNamespace(event=QueuePingEvent())]
+    pipeline = _create_pipeline(messages)
+
+    assert list(pipeline.process(stream=True)) == [
+        _chunk_frame(pipeline, 'Hello'),
+        _chunk_frame(pipeline, ' "world"', agent=True),
+        'event: ping\n\n'
+    ]
+    assert pipeline._task_state.llm_result.message.content == 'Hello "world"'
+
+
+def test_coalesce_chunks(app):
+    app.config['SSE_CHUNK_FLUSH_INTERVAL'] = 60
+    app.config['SSE_CHUNK_FLUSH_SIZE'] = 1024
+    messages = [
+        _message('Hel'), _message('lo'),
+        # agent messages are not merged with messages
+        _message(' wo', agent=True), _message('rld', agent=True),
+        # other events flush the buffered text first
+        SimpleNamespace(event=QueuePingEvent()),
+        _message('!')
+    ]
+    pipeline = _create_pipeline(messages)
+
+    assert list(pipeline.process(stream=True)) == [
+        _chunk_frame(pipeline, 'Hello'),
+        _chunk_frame(pipeline, ' world', agent=True),
+        'event: ping\n\n',
+        _chunk_frame(pipeline, '!')
+    ]
+
+
+def test_coalesce_chunks_up_to_flush_size(app):
+    app.config['SSE_CHUNK_FLUSH_INTERVAL'] = 60
+    app.config['SSE_CHUNK_FLUSH_SIZE'] = 4
+    pipeline = _create_pipeline([_message(text) for text in ['ab', 'cd', 'e', 'fgh', 'i']])
+
+    assert list(pipeline.process(stream=True)) == [
+        _chunk_frame(pipeline, 'abcd'),
+        _chunk_frame(pipeline, 'efgh'),
+        _chunk_frame(pipeline, 'i')
+    ]
+
+
+def test_coalesce_chunks_flush_after_interval(app, monkeypatch):
+    app.config['SSE_CHUNK_FLUSH_INTERVAL'] = 1
+    app.config['SSE_CHUNK_FLUSH_SIZE'] = 1024
+    now = [0.0]
+    monkeypatch.setattr(generate_task_pipeline.time, 'perf_counter', lambda: now[0])
+
+    def _advance(seconds: float) -> None:
+        now[0] += seconds
+
+    class ClockQueueManager(FakeQueueManager):
+        def listen(self, idle_interval: Optional[float] = None):
+            assert idle_interval == 1
+            yield _message('a')
+            _advance(0.5)
+            yield _message('b')
+            # idle before the interval passed, keep buffering
+            yield None
+            _advance(0.5)
+            # idle after the interval passed
+            yield None
+            yield _message('c')
+            _advance(1)
+            yield _message('d')
+
+    pipeline = _create_pipeline([])
+    pipeline._queue_manager = ClockQueueManager([])
+
+    assert list(pipeline.process(stream=True)) == [
+        _chunk_frame(pipeline, 'ab'),
+        _chunk_frame(pipeline, 'cd')
+    ]
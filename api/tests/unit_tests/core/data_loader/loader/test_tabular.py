@@ -0,0 +1,165 @@
+import pandas as pd
+import pytest
+from core.data_loader.loader import csv_loader, excel
+from core.data_loader.loader.csv_loader import CSVLoader
+from core.data_loader.loader.excel import ExcelLoader
+from core.data_loader.loader.tabular import ROW_SEPARATOR, TabularRowGrouper, format_rows
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+from openpyxl import Workbook
+
+
+def test_format_rows():
+    frame = pd.DataFrame([['a', '1'], ['', '2']], columns=['name', 'age'])
+
+    assert format_rows(frame, ': ', '\n') == ['name: a\nage: 1', 'name: \nage: 2']
+    assert format_rows(frame, ':', '', pair_suffix=';', skip_empty_values=True) == ['name:a;age:1;', 'age:2;']
+    assert format_rows(frame.iloc[0:0], ': ', '\n') == []
+
+
+def test_row_grouper_keeps_one_document_per_row():
+    row_grouper = TabularRowGrouper(0, metadata={'source': 'file'})
+
+    documents = list(row_grouper.add_rows(['a', 'b'], [1, 2], [{'sheet': 'x'}, {'sheet': 'y'}]))
+    documents.extend(row_grouper.flush())
+
+    assert [document.page_content for document in documents] == ['a', 'b']
+    assert [document.metadata for document in documents] == [
+        {'source': 'file', 'sheet': 'x', 'row': 1, 'row_count': 1},
+        {'source': 'file', 'sheet': 'y', 'row': 2, 'row_count': 1}
+    ]
+
+
+def test_row_grouper_groups_rows_within_budget():
+    texts = ['alpha beta gamma', 'delta epsilon', 'zeta', 'eta theta iota kappa', 'lambda']
+    max_tokens = GPT2Tokenizer.get_num_tokens(ROW_SEPARATOR.join(texts[:2]))
+    row_grouper = TabularRowGrouper(max_tokens, metadata={})
+
+    # rows are added across blocks, a document may span them
+    documents = list(row_grouper.add_rows(texts[:3], [0, 1, 2]))
+    documents.extend(row_grouper.add_rows(texts[3:], [3, 4]))
+    documents.extend(row_grouper.flush())
+
+    for document in documents:
+        assert GPT2Tokenizer.get_num_tokens(document.page_content) <= max_tokens \
+               or document.metadata['row_count'] == 1
+    assert ROW_SEPARATOR.join(document.page_content for document in documents) == ROW_SEPARATOR.join(texts)
+    assert documents[0].page_content == ROW_SEPARATOR.join(texts[:2])
+    assert documents[0].metadata == {'row': 0, 'row_count': 2}
+    assert sum(document.metadata['row_count'] for document in documents) == len(texts)
+    assert [document.metadata['row'] for document in documents] == sorted(
+        document.metadata['row'] for document in documents
+    )
+
+
+def test_row_grouper_keeps_long_row_on_its_own():
+    row_grouper = TabularRowGrouper(3, metadata={})
+
+    documents = list(row_grouper.add_rows(['a', 'a very long row of many tokens', 'b'], [0, 1, 2]))
+    documents.extend(row_grouper.flush())
+
+    assert [document.page_content for document in documents] == ['a', 'a very long row of many tokens', 'b']
+
+
+def test_csv_loader(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_loader, 'ROWS_PER_BLOCK', 2)
+    file_path = tmp_path / 'data.csv'
+    file_path.write_text(' question , answer\nq1, a1 \nq2,a2\nq3,\n', encoding='utf-8')
+
+    documents = CSVLoader(str(file_path), source_column=' answer').load()
+
+    # same format and metadata as reading the rows one by one
+    assert [document.page_content for document in documents] == [
+        'question: q1\nanswer: a1',
+        'question: q2\nanswer: a2',
+        'question: q3\nanswer: '
+    ]
+    assert [document.metadata for document in documents] == [
+        {'source': ' a1 ', 'row': 0, 'row_count': 1},
+        {'source': 'a2', 'row': 1, 'row_count': 1},
+        {'source': '', 'row': 2, 'row_count': 1}
+    ]
+
+
+def test_csv_loader_groups_rows(tmp_path):
+    file_path = tmp_path / 'data.csv'
+    file_path.write_text('question,answer\n' + ''.join(f'q{i},a{i}\n' for i in range(10)), encoding='utf-8')
+
+    documents = CSVLoader(str(file_path), max_tokens=1000).load()
+
+    assert len(documents) == 1
+    assert documents[0].page_content == ROW_SEPARATOR.join(f'question: q{i}\nanswer: a{i}' for i in range(10))
+    assert documents[0].metadata == {'source': '', 'row': 0, 'row_count': 10}
+
+
+def test_csv_loader_detects_encoding(tmp_path):
+    file_path = tmp_path / 'data.csv'
+    file_path.write_bytes('问题,答案\n你好,世界\n'.encode('gb18030'))
+
+    documents = CSVLoader(str(file_path), encoding='utf-8').load()
+
+    assert [document.page_content for document in documents] == ['问题: 你好\n答案: 世界']
+
+
+def test_csv_loader_empty_file_and_missing_source_column(tmp_path):
+    empty_file_path = tmp_path / 'empty.csv'
+    empty_file_path.write_text('', encoding='utf-8')
+    assert CSVLoader(str(empty_file_path)).load() == []
+
+    file_path = tmp_path / 'data.csv'
+    file_path.write_text('question,answer\nq1,a1\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        CSVLoader(str(file_path), source_column='missing').load()
+
+
+def test_excel_loader(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel, 'ROWS_PER_BLOCK', 2)
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'faq'
+    sheet.append([None, None])
+    sheet.append(['question', 'answer', None])
+    sheet.append(['q1', 'a1', 'dropped'])
+    sheet.append([None, None, None])
+    sheet.append(['q2', None])
+    sheet.append(['q3', 3])
+    other_sheet = workbook.create_sheet('other')
+    other_sheet.append(['name'])
+    other_sheet.append(['x'])
+    file_path = str(tmp_path / 'data.xlsx')
+    workbook.save(file_path)
+
+    documents = ExcelLoader(file_path).load()
+
+    # every sheet has its own header, empty cells and cells without a column name are left out
+    assert [document.page_content for document in documents] == [
+        'question:q1;answer:a1;',
+        'question:q2;',
+        'question:q3;answer:3;',
+        'name:x;'
+    ]
+    assert [document.metadata for document in documents] == [
+        {'source': file_path, 'sheet': 'faq', 'row': 3, 'row_count': 1},
+        {'source': file_path, 'sheet': 'faq', 'row': 5, 'row_count': 1},
+        {'source': file_path, 'sheet': 'faq', 'row': 6, 'row_count': 1},
+        {'source': file_path, 'sheet': 'other', 'row': 2, 'row_count': 1}
+    ]
+
+
+def test_excel_loader_groups_rows_per_sheet(tmp_path):
+    workbook = Workbook()
+    workbook.active.append(['question'])
+    workbook.active.append(['q1'])
+    workbook.active.append(['q2'])
+    other_sheet = workbook.create_sheet('other')
+    other_sheet.append(['name'])
+    other_sheet.append(['x'])
+    file_path = str(tmp_path / 'data.xlsx')
+    workbook.save(file_path)
+
+    documents = ExcelLoader(file_path, max_tokens=1000).load()
+
+    assert [document.page_content for document in documents] == [
+        'question:q1;' + ROW_SEPARATOR + 'question:q2;',
+        'name:x;'
+    ]
+    assert [document.metadata['row_count'] for document in documents] == [2, 1]
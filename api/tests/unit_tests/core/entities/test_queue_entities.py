@@ -0,0 +1,100 @@
+import queue
+from typing import Any, Optional
+
+import pytest
+from core.application_queue_manager import ApplicationQueueManager, PublishFrom
+from core.entities.queue_entities import (AppQueueEvent, QueueErrorEvent, QueueEvent, QueueMessageEndEvent,
+                                          QueueMessageEvent, QueueMessageReplaceEvent, QueueRetrieverResourcesEvent,
+                                          QueueStopEvent)
+from models.account import Account
+from pydantic import BaseModel
+
+
+class _Node(BaseModel):
+    name: str
+    children: list['_Node'] = []
+
+
+_Node.update_forward_refs()
+
+
+class _Leaf(BaseModel):
+    name: str
+    scores: list[float]
+
+
+class _Payload(BaseModel):
+    leaf: _Leaf
+    extra: dict
+
+
+def test_unchecked_fields_of_queue_events():
+    # fully typed fields, including nested pydantic models, are checked once by type
+    assert QueueMessageEvent.unchecked_fields == ()
+    assert QueueMessageEndEvent.unchecked_fields == ()
+    assert QueueMessageReplaceEvent.unchecked_fields == ()
+    assert QueueStopEvent.unchecked_fields == ()
+
+    # fields that can hold anything are left to publish
+    assert QueueErrorEvent.unchecked_fields == ('error',)
+    assert QueueRetrieverResourcesEvent.unchecked_fields == ('retriever_resources',)
+
+
+def test_unchecked_fields_of_custom_events():
+    class CheckedEvent(AppQueueEvent):
+        event = QueueEvent.PING
+        text: Optional[str]
+        texts: list[str]
+        scores: dict[str, float]
+        leaf: _Leaf
+
+    class UncheckedEvent(AppQueueEvent):
+        event = QueueEvent.PING
+        text: str
+        value: Any
+        values: list
+        nested: list[dict[str, Any]]
+        payload: _Payload
+        # forward references are not resolved, so their values are checked on publish
+        node: _Node
+
+    assert CheckedEvent.unchecked_fields == ()
+    assert UncheckedEvent.unchecked_fields == ('value', 'values', 'nested', 'payload', 'node')
+
+
+def test_sqlalchemy_model_field_is_rejected_on_definition():
+    with pytest.raises(TypeError):
+        class ModelEvent(AppQueueEvent):
+            event = QueueEvent.PING
+            account: Optional[Account]
+
+            class Config:
+                arbitrary_types_allowed = True
+
+
+def _create_queue_manager() -> ApplicationQueueManager:
+    # without registering the task in redis
+    queue_manager = ApplicationQueueManager.__new__(ApplicationQueueManager)
+    queue_manager._task_id = 'task'
+    queue_manager._conversation_id = 'conversation'
+    queue_manager._message_id = 'message'
+    queue_manager._app_mode = 'chat'
+    queue_manager._q = queue.Queue()
+    return queue_manager
+
+
+def test_publish_checks_values_of_unchecked_fields():
+    queue_manager = _create_queue_manager()
+
+    queue_manager.publish(QueueRetrieverResourcesEvent(retriever_resources=[{'score': 1.0}]), PublishFrom.TASK_PIPELINE)
+    assert queue_manager._q.get_nowait().event.retriever_resources == [{'score': 1.0}]
+
+    with pytest.raises(TypeError):
+        queue_manager.publish(
+            QueueRetrieverResourcesEvent(retriever_resources=[{'account': Account(name='name')}]),
+            PublishFrom.TASK_PIPELINE
+        )
+    with pytest.raises(TypeError):
+        queue_manager.publish(QueueErrorEvent(error=Account(name='name')), PublishFrom.TASK_PIPELINE)
+
+    assert queue_manager._q.empty()
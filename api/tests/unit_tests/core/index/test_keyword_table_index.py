@@ -0,0 +1,161 @@
+import json
+import math
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from core.index.keyword_table_index.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.index.keyword_table_index.keyword_table_index import BM25_B, BM25_K1, KeywordTableIndex
+from extensions.ext_database import db
+from flask import Flask
+from models.dataset import DatasetKeywordPosting, DatasetKeywordStatistics, DatasetKeywordTable
+from sqlalchemy import text
+
+DATASET_ID = str(uuid.uuid4())
+
+
+@pytest.fixture
+def keyword_table_index(monkeypatch):
+    # the read path of the postings only, writes use postgres upserts
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.session.execute(text(
+            'CREATE TABLE dataset_keyword_postings (id VARCHAR PRIMARY KEY, dataset_id VARCHAR, keyword VARCHAR, '
+            'index_node_id VARCHAR, term_frequency INTEGER, document_length INTEGER)'
+        ))
+        db.session.execute(text(
+            'CREATE TABLE dataset_keyword_statistics (id VARCHAR PRIMARY KEY, dataset_id VARCHAR, '
+            'document_count INTEGER, total_document_length BIGINT)'
+        ))
+        db.session.execute(text(
+            'CREATE TABLE dataset_keyword_tables (id VARCHAR PRIMARY KEY, dataset_id VARCHAR, keyword_table TEXT)'
+        ))
+
+        monkeypatch.setattr(JiebaKeywordTableHandler, 'extract_keywords',
+                            lambda self, text, max_keywords_per_chunk=10: set(text.split()))
+
+        yield KeywordTableIndex(SimpleNamespace(id=DATASET_ID))
+
+        db.session.remove()
+
+
+def _add_postings(postings: dict[str, tuple[dict[str, int], int]], dataset_id: str = DATASET_ID):
+    for node_id, (term_frequencies, document_length) in postings.items():
+        for keyword, term_frequency in term_frequencies.items():
+            db.session.add(DatasetKeywordPosting(
+                id=str(uuid.uuid4()),
+                dataset_id=dataset_id,
+                keyword=keyword,
+                index_node_id=node_id,
+                term_frequency=term_frequency,
+                document_length=document_length
+            ))
+
+    db.session.add(DatasetKeywordStatistics(
+        id=str(uuid.uuid4()),
+        dataset_id=dataset_id,
+        document_count=len(postings),
+        total_document_length=sum(document_length for _, document_length in postings.values())
+    ))
+    db.session.commit()
+
+
+def _bm25(postings: dict[str, tuple[dict[str, int], int]], keywords: list[str]) -> dict[str, float]:
+    document_count = len(postings)
+    average_document_length = sum(length for _, length in postings.values()) / document_count
+
+    scores = {}
+    for node_id, (term_frequencies, document_length) in postings.items():
+        score = 0.0
+        for keyword in keywords:
+            term_frequency = term_frequencies.get(keyword, 0)
+            if not term_frequency:
+                continue
+
+            document_frequency = sum(1 for frequencies, _ in postings.values() if keyword in frequencies)
+            idf = math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            length_norm = 1 - BM25_B + BM25_B * document_length / average_document_length
+            score += idf * term_frequency * (BM25_K1 + 1) / (term_frequency + BM25_K1 * length_norm)
+
+        if score:
+            scores[node_id] = score
+
+    return scores
+
+
+def test_calculate_idfs():
+    idfs = KeywordTableIndex._calculate_idfs({'rare': 1, 'common': 9}, 10)
+
+    assert idfs['rare'] == pytest.approx(math.log(1 + 9.5 / 1.5))
+    assert idfs['common'] == pytest.approx(math.log(1 + 1.5 / 9.5))
+
+    # the document count is never below a document frequency
+    assert KeywordTableIndex._calculate_idfs({'term': 5}, 0)['term'] == pytest.approx(math.log(1 + 0.5 / 5.5))
+
+
+def test_retrieve_ranks_like_bm25(keyword_table_index):
+    postings = {
+        'node_1': ({'apple': 3, 'banana': 1}, 20),
+        'node_2': ({'apple': 1}, 5),
+        'node_3': ({'banana': 2, 'cherry': 1}, 10),
+        'node_4': ({'cherry': 4}, 40),
+        'node_5': ({'durian': 1}, 8),
+    }
+    _add_postings(postings)
+
+    scores = _bm25(postings, ['apple', 'cherry'])
+    expected = sorted(scores, key=scores.__getitem__, reverse=True)
+
+    assert keyword_table_index._retrieve_ids_by_query('apple cherry', k=10) == expected
+    assert keyword_table_index._retrieve_ids_by_query('apple cherry', k=2) == expected[:2]
+
+
+def test_retrieve_prefers_rare_keywords_and_short_segments(keyword_table_index):
+    _add_postings({
+        'common_short': ({'common': 1}, 5),
+        'common_long': ({'common': 1}, 50),
+        'rare': ({'rare': 1, 'common': 1}, 50),
+        'other': ({'common': 1}, 10),
+    })
+
+    assert keyword_table_index._retrieve_ids_by_query('rare common', k=4)[0] == 'rare'
+    assert keyword_table_index._retrieve_ids_by_query('common', k=4).index('common_short') \
+        < keyword_table_index._retrieve_ids_by_query('common', k=4).index('common_long')
+
+
+def test_retrieve_only_reads_the_dataset(keyword_table_index):
+    _add_postings({'node_1': ({'apple': 1}, 5)})
+    _add_postings({'node_2': ({'apple': 1}, 5)}, dataset_id=str(uuid.uuid4()))
+
+    assert keyword_table_index._retrieve_ids_by_query('apple', k=4) == ['node_1']
+    assert keyword_table_index._retrieve_ids_by_query('unknown', k=4) == []
+
+
+def test_retrieve_merges_legacy_keyword_table(keyword_table_index):
+    _add_postings({'node_1': ({'apple': 1}, 5)})
+    db.session.add(DatasetKeywordTable(
+        id=str(uuid.uuid4()),
+        dataset_id=DATASET_ID,
+        keyword_table=json.dumps({'__type__': 'keyword_table', '__data__': {
+            'index_id': DATASET_ID, 'summary': None,
+            'table': {'apple': ['legacy_1', 'legacy_2'], 'banana': ['legacy_2']}
+        }})
+    ))
+    db.session.commit()
+
+    assert keyword_table_index._retrieve_ids_by_query('apple banana', k=3) == ['node_1', 'legacy_2', 'legacy_1']
+    assert keyword_table_index._retrieve_ids_by_query('apple', k=1) == ['node_1']
+
+
+def test_extract_keywords_with_term_frequencies():
+    content = 'vector search engine, vector index and vector database'
+    term_frequencies, document_length = JiebaKeywordTableHandler().extract_keywords_with_term_frequencies(
+        content, max_keywords_per_chunk=3
+    )
+
+    assert term_frequencies['vector'] == 3
+    assert all(frequency >= 1 for frequency in term_frequencies.values())
+    assert document_length == sum(JiebaKeywordTableHandler().count_terms(content)[0].values())
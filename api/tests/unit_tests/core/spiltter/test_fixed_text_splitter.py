@@ -0,0 +1,131 @@
+import random
+from typing import List
+
+import pytest
+from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
+from core.spiltter.fixed_text_splitter import (EnhanceRecursiveCharacterTextSplitter,
+                                               FixedRecursiveCharacterTextSplitter, SpanLengths)
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+
+class ReferenceFixedRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
+    """The splitter re-tokenizing every piece, as before splitting on spans."""
+
+    def __init__(self, fixed_separator: str = "\n\n", separators: List[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._fixed_separator = fixed_separator
+        self._separators = separators or ["\n\n", "\n", " ", ""]
+
+    def split_text(self, text: str) -> List[str]:
+        chunks = text.split(self._fixed_separator) if self._fixed_separator else list(text)
+
+        final_chunks = []
+        for chunk in chunks:
+            if self._length_function(chunk) > self._chunk_size:
+                final_chunks.extend(self.recursive_split_text(chunk))
+            else:
+                final_chunks.append(chunk)
+
+        return final_chunks
+
+    def recursive_split_text(self, text: str) -> List[str]:
+        final_chunks = []
+        separator = self._separators[-1]
+        for _s in self._separators:
+            if _s == "" or _s in text:
+                separator = _s
+                break
+
+        splits = text.split(separator) if separator else list(text)
+        _good_splits = []
+        for s in splits:
+            if self._length_function(s) < self._chunk_size:
+                _good_splits.append(s)
+            else:
+                if _good_splits:
+                    final_chunks.extend(self._merge_splits(_good_splits, separator))
+                    _good_splits = []
+                final_chunks.extend(self.recursive_split_text(s))
+        if _good_splits:
+            final_chunks.extend(self._merge_splits(_good_splits, separator))
+        return final_chunks
+
+
+WORDS = ['data', 'retrieval', 'index', 'segment', 'tokenizer', 'a', 'of', 'the', 'vector', 'embedding']
+
+
+def _random_text(seed: int, paragraphs: int = 20) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(paragraphs):
+        for _ in range(rng.randint(1, 4)):
+            lines.append(' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 40))) + '.')
+        lines.append('')
+
+    return '\n'.join(lines)
+
+
+def _token_length(text: str) -> int:
+    return GPT2Tokenizer.get_num_tokens(text) if text else 0
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('chunk_size,chunk_overlap', [(20, 0), (50, 10), (200, 40)])
+@pytest.mark.parametrize('fixed_separator', ['\n\n', '\n', ''])
+def test_fixed_splitter_matches_reference_with_length_function(seed, chunk_size, chunk_overlap, fixed_separator):
+    text = _random_text(seed)
+    kwargs = dict(fixed_separator=fixed_separator, chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                  length_function=len)
+
+    splitter = FixedRecursiveCharacterTextSplitter(**kwargs)
+    reference = ReferenceFixedRecursiveCharacterTextSplitter(**kwargs)
+
+    assert splitter.split_text(text) == reference.split_text(text)
+    assert splitter.recursive_split_text(text) == reference.recursive_split_text(text)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('chunk_size,chunk_overlap', [(20, 0), (50, 10), (200, 40)])
+def test_fixed_splitter_matches_reference_with_encoder(seed, chunk_size, chunk_overlap):
+    # double spaces are pre-tokenized differently inside and at the end of a piece
+    text = _random_text(seed).replace('a ', 'a  ')
+
+    splitter = FixedRecursiveCharacterTextSplitter(encoder=GPT2Tokenizer.get_encoder(), chunk_size=chunk_size,
+                                                   chunk_overlap=chunk_overlap, length_function=_token_length)
+    reference = ReferenceFixedRecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                                             length_function=_token_length)
+
+    assert splitter.split_text(text) == reference.split_text(text)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('keep_separator', [True, False])
+def test_enhance_splitter_matches_reference(seed, keep_separator):
+    text = _random_text(seed)
+    kwargs = dict(chunk_size=50, chunk_overlap=10, keep_separator=keep_separator, length_function=_token_length)
+
+    splitter = EnhanceRecursiveCharacterTextSplitter(encoder=GPT2Tokenizer.get_encoder(), **kwargs)
+    reference = RecursiveCharacterTextSplitter(**kwargs)
+
+    assert splitter.split_text(text) == reference.split_text(text)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_span_lengths_match_encoding_the_span(seed):
+    rng = random.Random(seed)
+    pieces = ['data', 'a', ' ', '  ', '\n', '\n\n', '1', '234', '.', ',', '你好', '🙂', "'s", '\t', 'é', '-']
+    text = ''.join(rng.choice(pieces) for _ in range(200))
+    span_lengths = SpanLengths(text, GPT2Tokenizer.get_encoder(), _token_length)
+
+    for _ in range(200):
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, len(text))
+        assert span_lengths.get(start, end) == _token_length(text[start:end])
+
+
+def test_span_lengths_fall_back_to_length_function():
+    # special tokens are left to the length function
+    text = 'abc <|endoftext|> def'
+    span_lengths = SpanLengths(text, GPT2Tokenizer.get_encoder(), len)
+
+    assert span_lengths.get(2, 6) == 4
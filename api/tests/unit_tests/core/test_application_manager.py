@@ -0,0 +1,64 @@
+import json
+from types import SimpleNamespace
+
+from core.application_manager import ApplicationManager
+from core.generation_event_bus import InProcessGenerationEventBus
+from core.model_runtime.errors.invoke import InvokeRateLimitError
+from extensions.ext_database import db
+from flask import Flask
+
+
+def _parse_stream_event(data: str) -> dict:
+    assert data.startswith('data: ') and data.endswith('\n\n')
+    return json.loads(data[len('data: '):])
+
+
+def test_error_to_stream_event():
+    application_manager = ApplicationManager()
+
+    assert _parse_stream_event(application_manager._error_to_stream_event('task', 'message', ValueError('bad'))) == {
+        'event': 'error', 'task_id': 'task', 'message_id': 'message',
+        'code': 'invalid_param', 'message': 'bad', 'status': 400
+    }
+    assert _parse_stream_event(
+        application_manager._error_to_stream_event('task', 'message', InvokeRateLimitError('rate limited'))
+    ) == {
+        'event': 'error', 'task_id': 'task', 'message_id': 'message',
+        'code': 'completion_request_error', 'message': 'rate limited', 'status': 400
+    }
+    # internal errors are not exposed
+    assert _parse_stream_event(
+        application_manager._error_to_stream_event('task', 'message', RuntimeError('secret'))
+    ) == {
+        'event': 'error', 'task_id': 'task', 'message_id': 'message',
+        'code': 'internal_server_error', 'message': 'Internal Server Error, please contact support.', 'status': 500
+    }
+
+
+def test_stream_worker_publishes_error_before_end(monkeypatch):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    application_manager = ApplicationManager()
+
+    def _get_conversation(conversation_id):
+        raise RuntimeError('database is gone')
+
+    monkeypatch.setattr(application_manager, '_get_conversation', _get_conversation)
+    event_bus = InProcessGenerationEventBus()
+    monkeypatch.setattr(event_bus, '_ensure_sweeper', lambda: None)
+    event_bus.start('task')
+
+    application_manager._stream_worker(
+        flask_app=app,
+        application_generate_entity=SimpleNamespace(task_id='task'),
+        queue_manager=None,
+        event_bus=event_bus,
+        conversation_id='conversation',
+        message_id='message'
+    )
+
+    events = list(event_bus.subscribe('task'))
+    assert len(events) == 1
+    assert _parse_stream_event(events[0][1])['code'] == 'internal_server_error'
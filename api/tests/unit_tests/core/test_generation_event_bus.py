@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+from core.generation_event_bus import (InProcessGenerationEventBus, RedisStreamGenerationEventBus,
+                                       get_generation_event_bus)
+from flask import Flask
+
+
+@pytest.fixture
+def event_bus(monkeypatch):
+    event_bus = InProcessGenerationEventBus()
+    # no sweeper thread, expired tasks are removed explicitly
+    monkeypatch.setattr(event_bus, '_ensure_sweeper', lambda: None)
+    return event_bus
+
+
+def test_subscribe_from_start_and_resume(event_bus):
+    event_bus.start('task')
+    event_ids = [event_bus.publish('task', data) for data in ['a', 'b', 'c']]
+    event_bus.end('task')
+
+    assert event_ids == ['1', '2', '3']
+    assert list(event_bus.subscribe('task')) == [('1', 'a'), ('2', 'b'), ('3', 'c')]
+    assert list(event_bus.subscribe('task', last_event_id='2')) == [('3', 'c')]
+    assert list(event_bus.subscribe('task', last_event_id='3')) == []
+    # invalid event ids start from the first event
+    assert list(event_bus.subscribe('task', last_event_id='x')) == [('1', 'a'), ('2', 'b'), ('3', 'c')]
+
+
+def test_subscribe_unknown_task(event_bus):
+    assert not event_bus.exists('unknown')
+    assert not event_bus.is_resumable('unknown')
+    assert list(event_bus.subscribe('unknown')) == []
+
+
+def test_subscribe_waits_for_events(event_bus):
+    event_bus.start('task')
+    event_bus.publish('task', 'a')
+
+    events = []
+    subscriber = threading.Thread(target=lambda: events.extend(event_bus.subscribe('task', last_event_id='1')))
+    subscriber.start()
+
+    event_bus.publish('task', 'b')
+    event_bus.publish('task', 'c')
+    event_bus.end('task')
+    subscriber.join(timeout=5)
+
+    assert not subscriber.is_alive()
+    assert events == [('2', 'b'), ('3', 'c')]
+
+
+def test_subscribe_stops_without_events(event_bus, monkeypatch):
+    monkeypatch.setattr(event_bus, 'LISTEN_TIMEOUT', 0.01)
+    event_bus.start('task')
+    event_bus.publish('task', 'a')
+
+    assert list(event_bus.subscribe('task')) == [('1', 'a')]
+
+
+def test_trim_to_max_task_size(event_bus, monkeypatch):
+    monkeypatch.setattr(event_bus, 'MAX_TASK_SIZE', 5)
+    event_bus.start('task')
+    for data in ['aa', 'bb', 'cc']:
+        event_bus.publish('task', data)
+
+    # the oldest event is dropped, event ids keep counting from the first event
+    assert event_bus.is_resumable('task', '1')
+    assert not event_bus.is_resumable('task')
+    assert list(event_bus.subscribe('task')) == []
+
+    # an event larger than the limit is kept on its own
+    assert event_bus.publish('task', 'dddddd') == '4'
+    event_bus.end('task')
+
+    assert not event_bus.is_resumable('task', '2')
+    assert event_bus.is_resumable('task', '3')
+    assert list(event_bus.subscribe('task', last_event_id='3')) == [('4', 'dddddd')]
+
+
+def test_subscriber_stops_when_events_are_dropped_before_read(event_bus, monkeypatch):
+    monkeypatch.setattr(event_bus, 'MAX_TASK_SIZE', 2)
+    event_bus.start('task')
+    event_bus.publish('task', 'a')
+
+    events = event_bus.subscribe('task')
+    assert next(events) == ('1', 'a')
+
+    event_bus.publish('task', 'b')
+    event_bus.publish('task', 'c')
+    event_bus.publish('task', 'd')
+
+    assert list(events) == []
+
+
+def test_remove_expired_tasks(event_bus, monkeypatch):
+    event_bus.start('ended')
+    event_bus.end('ended')
+    event_bus.start('running')
+
+    event_bus._remove_expired_tasks()
+    assert event_bus.exists('ended') and event_bus.exists('running')
+
+    monkeypatch.setattr(event_bus, 'RETENTION', -1)
+    event_bus._remove_expired_tasks()
+    assert not event_bus.exists('ended') and event_bus.exists('running')
+
+    monkeypatch.setattr(event_bus, 'LISTEN_TIMEOUT', -1)
+    event_bus._remove_expired_tasks()
+    assert not event_bus.exists('running')
+
+
+def test_get_generation_event_bus():
+    app = Flask(__name__)
+
+    with app.app_context():
+        app.config['GENERATION_EVENT_BUS_TYPE'] = 'memory'
+        assert isinstance(get_generation_event_bus(), InProcessGenerationEventBus)
+
+        app.config['GENERATION_EVENT_BUS_TYPE'] = 'redis'
+        assert isinstance(get_generation_event_bus(), RedisStreamGenerationEventBus)
+
+        app.config['GENERATION_EVENT_BUS_TYPE'] = 'unknown'
+        with pytest.raises(ValueError):
+            get_generation_event_bus()
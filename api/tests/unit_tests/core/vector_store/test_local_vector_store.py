@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from core.vector_store.vector import local
+from core.vector_store.vector.local import LocalVectorCollection
+
+
+def _add(collection: LocalVectorCollection, ids: list[str], vectors: list[list[float]], group_id: str = 'dataset'):
+    collection.add(
+        ids=ids,
+        vectors=vectors,
+        group_ids=[group_id] * len(ids),
+        texts=[f'text of {id}' for id in ids],
+        metadatas=[{'doc_id': id} for id in ids]
+    )
+
+
+def test_search_ranks_by_cosine_similarity(tmp_path):
+    collection = LocalVectorCollection(str(tmp_path))
+    _add(collection, ['a', 'b', 'c'], [[1, 0], [0.6, 0.8], [0, 1]])
+
+    results = collection.search([1, 0], k=2)
+
+    assert [id for id, _, _, _ in results] == ['a', 'b']
+    assert results[0][1] == 'text of a'
+    assert results[0][2] == {'doc_id': 'a'}
+    assert results[0][3] == pytest.approx(1.0)
+    assert results[1][3] == pytest.approx(0.6)
+
+
+def test_search_filters_by_group_and_score_threshold(tmp_path):
+    collection = LocalVectorCollection(str(tmp_path))
+    _add(collection, ['a', 'b'], [[1, 0], [0.6, 0.8]], group_id='dataset_1')
+    _add(collection, ['c'], [[1, 0]], group_id='dataset_2')
+
+    assert [id for id, _, _, _ in collection.search([1, 0], k=4, group_ids=['dataset_1'])] == ['a', 'b']
+    assert [id for id, _, _, _ in collection.search([1, 0], k=4, group_ids=['dataset_1'], score_threshold=0.9)] == ['a']
+
+
+def test_rejects_vectors_of_another_dimension(tmp_path):
+    collection = LocalVectorCollection(str(tmp_path))
+    _add(collection, ['a'], [[1, 0]])
+
+    with pytest.raises(ValueError):
+        _add(collection, ['b'], [[1, 0, 0]])
+
+    with pytest.raises(ValueError):
+        collection.search([1, 0, 0], k=1)
+
+
+def test_delete_and_overwrite(tmp_path):
+    collection = LocalVectorCollection(str(tmp_path))
+    _add(collection, ['a', 'b'], [[1, 0], [0, 1]])
+
+    collection.delete(['a'])
+    assert not collection.exists('a')
+    assert [id for id, _, _, _ in collection.search([1, 0], k=4)] == ['b']
+
+    # a row added again with the same id replaces the earlier one
+    _add(collection, ['b'], [[1, 0]])
+    results = collection.search([1, 0], k=4)
+    assert [id for id, _, _, _ in results] == ['b']
+    assert results[0][3] == pytest.approx(1.0)
+
+
+def test_get_ids_by_group_id_and_metadata_field(tmp_path):
+    collection = LocalVectorCollection(str(tmp_path))
+    _add(collection, ['a', 'b'], [[1, 0], [0, 1]], group_id='dataset_1')
+    _add(collection, ['c'], [[1, 0]], group_id='dataset_2')
+
+    assert sorted(collection.get_ids_by_group_id('dataset_1')) == ['a', 'b']
+    assert collection.get_ids_by_metadata_field('doc_id', 'c') == ['c']
+
+
+def test_other_instances_see_writes(tmp_path):
+    writer = LocalVectorCollection(str(tmp_path))
+    reader = LocalVectorCollection(str(tmp_path))
+    _add(writer, ['a'], [[1, 0]])
+
+    assert reader.exists('a')
+
+    _add(writer, ['b'], [[0, 1]])
+    writer.delete(['a'])
+
+    assert not reader.exists('a')
+    assert [id for id, _, _, _ in reader.search([0, 1], k=4)] == ['b']
+
+
+def test_compaction_keeps_alive_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(local, 'MAX_SEGMENTS', 3)
+    collection = LocalVectorCollection(str(tmp_path))
+    for i in range(4):
+        _add(collection, [f'id_{i}'], [[1, i]])
+    collection.delete(['id_0'])
+
+    reader = LocalVectorCollection(str(tmp_path))
+    assert len(collection._segments) <= 2
+    assert sorted(id for id, _, _, _ in reader.search([1, 0], k=10)) == ['id_1', 'id_2', 'id_3']
+
+
+def test_search_survives_compaction_by_another_instance(tmp_path, monkeypatch):
+    monkeypatch.setattr(local, 'MAX_SEGMENTS', 2)
+    reader = LocalVectorCollection(str(tmp_path))
+    writer = LocalVectorCollection(str(tmp_path))
+    _add(writer, ['a'], [[1, 0]])
+    reader.refresh()
+    segment = reader._segments[0]
+
+    # the writer compacts and removes the files of the segment the reader has mapped
+    _add(writer, ['b'], [[0, 1]])
+    _add(writer, ['c'], [[0, 1]])
+
+    assert segment.read_text(0) == 'text of a'
+    assert np.allclose(segment.vectors[0], [1, 0])
+    assert sorted(id for id, _, _, _ in reader.search([1, 0], k=10)) == ['a', 'b', 'c']
+
+
+def test_drop(tmp_path):
+    path = tmp_path / 'collection'
+    collection = LocalVectorCollection(str(path))
+    _add(collection, ['a'], [[1, 0]])
+
+    collection.drop()
+
+    assert not path.exists()
+    assert collection.search([1, 0], k=1) == []